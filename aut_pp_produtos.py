@@ -1,8 +1,10 @@
 import time
 import os
 import glob
+import json
 import argparse
 from datetime import datetime
+from urllib.parse import urlparse
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
@@ -11,16 +13,70 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 from utils import carregar_config 
+from monitor_download import MonitorInotify, inotify_disponivel, csv_recente
+from download_http import (
+    ColetorEventosCDP, INTERVALO_EVENTOS, PADRAO_URL_EXPORTACAO, criar_sessao_http, baixar_em_stream
+)
+import metricas
+
+ARQUIVO_CACHE_CHROMEDRIVER = "chromedriver_cache.json"
+PERFIL_CHROME_PADRAO = "perfil_chrome"
+TIMEOUT_EXPORTACAO_PADRAO = 3900  # 65 minutos
+LOCATOR_BOTAO_EXPORTAR = (By.XPATH, "//button[contains(., 'Exportar') and .//i[contains(@class, 'icon-lx-file-csv')]]")
+
+
+def resolver_chromedriver(navegador_config):
+    """
+    Caminho do chromedriver, na ordem: caminho fixo do config, cache local
+    (modo warm start, sem acessar a rede) ou download pelo webdriver-manager.
+    'chromedriver_versao' fixa a versão baixada.
+    """
+    caminho_fixo = navegador_config.get("chromedriver_path")
+    if caminho_fixo:
+        print(f"[Sistema] Usando chromedriver fixo: {caminho_fixo}")
+        return caminho_fixo
+
+    versao = navegador_config.get("chromedriver_versao")
+    usar_cache = navegador_config.get("warm_start", False)
+    if usar_cache and os.path.exists(ARQUIVO_CACHE_CHROMEDRIVER):
+        try:
+            with open(ARQUIVO_CACHE_CHROMEDRIVER, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            if os.path.exists(cache.get("caminho", "")) and (not versao or cache.get("versao") == versao):
+                print(f"[Sistema] Usando chromedriver em cache: {cache['caminho']}")
+                return cache["caminho"]
+        except (OSError, ValueError) as e:
+            print(f"[Sistema] Aviso: cache do chromedriver inválido ({e}).")
+
+    gerenciador = ChromeDriverManager(driver_version=versao) if versao else ChromeDriverManager()
+    caminho = gerenciador.install()
+    if usar_cache:
+        with open(ARQUIVO_CACHE_CHROMEDRIVER, 'w', encoding='utf-8') as f:
+            json.dump({"caminho": caminho, "versao": versao}, f)
+    return caminho
+
 
 class PlugPharmaAutomator:
     
     # --- 3. ALTERADO ---
     # Adicionado 'dev_mode=False'
-    def __init__(self, login_config, dev_mode=False): 
+    # 'navegador_config': seção 'navegador' do config.json (download direto, warm start)
+    # 'pasta_downloads' / 'nome_arquivo': pasta e nome final do CSV (uma pasta por base no modo multi-base)
+    @metricas.medir("inicializacao_navegador")
+    def __init__(self, login_config, dev_mode=False, navegador_config=None, pasta_downloads=None, nome_arquivo=None): 
+        self.inicio_automacao = time.time()
         self.config = login_config
+        self.navegador_config = navegador_config or {}
+        self.download_direto = self.navegador_config.get("download_direto", False)
+        self.warm_start = self.navegador_config.get("warm_start", False)
+        # Espera máxima pelo arquivo exportado (processamento do servidor e download)
+        self.timeout_exportacao = int(
+            self.navegador_config.get("timeout_exportacao_segundos", TIMEOUT_EXPORTACAO_PADRAO)
+        )
         
         # Define o caminho absoluto para a pasta 'downloads' dentro do projeto
-        self.pasta_downloads = os.path.join(os.getcwd(), "downloads")
+        self.pasta_downloads = os.path.abspath(pasta_downloads or os.path.join(os.getcwd(), "downloads"))
+        self.nome_arquivo = nome_arquivo
         
         # Cria a pasta 'downloads' se ela não existir
         if not os.path.exists(self.pasta_downloads):
@@ -42,27 +98,50 @@ class PlugPharmaAutomator:
             options.add_argument("--disable-gpu")
             options.add_argument("--no-sandbox")
         # --- FIM DA LÓGICA ---
+
+        # Eventos do DevTools (rede/download) ficam disponíveis no log 'performance':
+        # usados para detectar o fim da exportação e, no download direto, a URL do arquivo
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+        if self.warm_start:
+            # Perfil persistente: mantém os cookies da sessão entre execuções
+            perfil_dir = os.path.abspath(self.navegador_config.get("perfil_dir", PERFIL_CHROME_PADRAO))
+            print(f"[Sistema] WARM START: usando o perfil persistente {perfil_dir}")
+            options.add_argument(f"--user-data-dir={perfil_dir}")
             
-        self.service = Service(ChromeDriverManager().install())
+        self.service = Service(resolver_chromedriver(self.navegador_config))
         self.driver = webdriver.Chrome(service=self.service, options=options)
         
         # Espera padrão (curta) para elementos da UI
         self.wait = WebDriverWait(self.driver, 20) 
-        # Espera longa para processamento de servidor e downloads
-        self.wait_long = WebDriverWait(self.driver, 3900) # 65 minutos
+
+        # Momento do clique final de exportação (CSVs mais antigos são ignorados)
+        self.inicio_exportacao = None
+        # Métricas da detecção do download (backend usado, espera e latência)
+        self.metricas_download = {}
+        self.coletor_cdp = ColetorEventosCDP(
+            self.driver, self.navegador_config.get("padrao_url_exportacao", PADRAO_URL_EXPORTACAO),
+            float(self.navegador_config.get("intervalo_eventos_segundos", INTERVALO_EVENTOS)),
+        )
+        # Segundos entre o início da automação e o clique final de exportação
+        self.tempo_ate_exportacao = None
         
         if dev_mode:
             self.driver.maximize_window() # Maximiza APENAS em modo dev
         # --- FIM DA ALTERAÇÃO 3 ---
 
+    def _nome_arquivo_final(self):
+        return self.nome_arquivo or f"{datetime.now().strftime('%Y-%m-%d')}_produtos.csv"
+
     def _limpar_pasta_downloads(self):
-        """Apaga arquivos .csv e .crdownload antigos da pasta."""
+        """Apaga arquivos .csv, .crdownload e .part (download HTTP parcial) antigos da pasta."""
         print(f"[Sistema] Limpando pasta de downloads...")
         try:
             files_csv = glob.glob(os.path.join(self.pasta_downloads, "*.csv"))
             files_cr = glob.glob(os.path.join(self.pasta_downloads, "*.crdownload"))
+            files_part = glob.glob(os.path.join(self.pasta_downloads, "*.part"))
             
-            for f in files_csv + files_cr:
+            for f in files_csv + files_cr + files_part:
                 os.remove(f)
             print("[Sistema] Pasta limpa.")
         except OSError as e:
@@ -78,6 +157,7 @@ class PlugPharmaAutomator:
         elemento = self.wait.until(EC.element_to_be_clickable(by_locator))
         elemento.click()
 
+    @metricas.medir("login")
     def fazer_login(self):
         url_login = self.config.get('url_login')
         print(f"[Web] Acessando URL de login: {url_login}")
@@ -94,15 +174,35 @@ class PlugPharmaAutomator:
         self.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "a[title='Menu']")))
         print("[Web] Página principal carregada.")
 
+    @metricas.medir("navegacao")
     def navegar_para_produtos(self):
         url_produtos = self.config.get('url_produtos')
         print(f"[Web] Navegando diretamente para a URL de produtos: {url_produtos}")
         self.driver.get(url_produtos)
         print("[Web] Aguardando página de produtos carregar...")
-        locator_pagina_produtos = (By.XPATH, "//button[contains(., 'Exportar') and .//i[contains(@class, 'icon-lx-file-csv')]]")
-        self.wait.until(EC.presence_of_element_located(locator_pagina_produtos))
+        self.wait.until(EC.presence_of_element_located(LOCATOR_BOTAO_EXPORTAR))
         print("[Web] Página de produtos carregada.")
 
+    @metricas.medir("verificacao_sessao")
+    def sessao_ativa(self, timeout_segundos=8):
+        """
+        Abre direto a página de produtos. Se o botão 'Exportar' aparecer, a
+        sessão salva no perfil ainda vale e o login pode ser pulado.
+        """
+        url_produtos = self.config.get('url_produtos')
+        print(f"[Web] Verificando se a sessão salva ainda é válida: {url_produtos}")
+        self.driver.get(url_produtos)
+        try:
+            WebDriverWait(self.driver, timeout_segundos).until(
+                EC.presence_of_element_located(LOCATOR_BOTAO_EXPORTAR)
+            )
+            print("[Web] Sessão válida. Login não é necessário.")
+            return True
+        except TimeoutException:
+            print("[Web] Sessão expirada ou inexistente. Fazendo login...")
+            return False
+
+    @metricas.medir("exportacao")
     def coletar_dados_produtos(self):
         """
         Executa a sequência de cliques para exportar o CSV.
@@ -110,8 +210,7 @@ class PlugPharmaAutomator:
         """
         try:
             print("[Web] Procurando botão 'Exportar' (CSV)...")
-            locator_btn1 = (By.XPATH, "//button[contains(., 'Exportar') and .//i[contains(@class, 'icon-lx-file-csv')]]")
-            self._esperar_e_clicar(locator_btn1)
+            self._esperar_e_clicar(LOCATOR_BOTAO_EXPORTAR)
 
             print("[Web] Botão CSV clicado. Aguardando modal de confirmação...")
             locator_btn2 = (By.XPATH, "//button[contains(@class, 'btn-primary') and .//span[normalize-space(.)='Exportar']]")
@@ -120,7 +219,11 @@ class PlugPharmaAutomator:
             # Limpa a pasta ANTES do clique final que inicia o processo
             self._limpar_pasta_downloads()
             
-            # Clica no botão final
+            # Clica no botão final (eventos anteriores do DevTools são descartados)
+            self.coletor_cdp.marcar_exportacao()
+            self.inicio_exportacao = time.time()
+            self.tempo_ate_exportacao = self.inicio_exportacao - self.inicio_automacao
+            print(f"[Sistema] Tempo da inicialização até o clique de exportação: {self.tempo_ate_exportacao:.1f}s")
             self._esperar_e_clicar(locator_btn2)
 
             print("[Web] Botão de confirmação clicado. Aguardando snackbar...")
@@ -133,31 +236,77 @@ class PlugPharmaAutomator:
             print(f"[Web] Erro ao tentar clicar para exportar o arquivo: {e}")
             return False
 
-    def _esperar_processamento_servidor(self):
+    @metricas.medir("processamento_servidor")
+    def _esperar_processamento_servidor(self, timeout_segundos=None):
         """
-        Espera a barra de progresso (mat-progress-bar) aparecer e depois desaparecer.
+        Espera o servidor terminar a exportação pelos eventos do DevTools (log
+        'performance'), sem consultar o DOM: pronto quando o Chrome anuncia o
+        download; falha quando a requisição de exportação responde com erro,
+        cai ou o download é cancelado.
         """
+        timeout_segundos = timeout_segundos or self.timeout_exportacao
         try:
-            locator_barra = (By.TAG_NAME, "mat-progress-bar")
-            print("[Web] Aguardando barra de progresso (mat-progress-bar) aparecer...")
-            # Espera até 10s para a barra aparecer
-            WebDriverWait(self.driver, 10).until(EC.presence_of_element_located(locator_barra))
-            print("[Web] Barra apareceu. Agora aguardando desaparecer (processamento do servidor)...")
-            
-            # Usa a espera longa (até 65 min) para a barra DESAPARECER
-            self.wait_long.until(EC.invisibility_of_element_located(locator_barra))
-            print("[Web] Barra desapareceu. Servidor terminou de processar.")
-            return True
-        except TimeoutException:
-            # Se a barra nunca apareceu (processamento instantâneo)
-            print("[Web] Aviso: Barra de progresso não foi detectada (processamento rápido ou falha).")
-            # Assume que foi rápido e continua, mas monitora o download
-            return True
+            print("[Web] Aguardando o servidor processar a exportação (eventos do DevTools)...")
+            pronto, motivo = self.coletor_cdp.aguardar_exportacao(timeout_segundos)
         except Exception as e:
-            print(f"[Web] Erro ao esperar barra de progresso: {e}")
+            print(f"[Web] Erro ao acompanhar a exportação: {e}")
             return False
+        espera = time.time() - (self.inicio_exportacao or time.time())
+        if not pronto:
+            print(f"[Web] ERRO: a exportação falhou: {motivo} (após {espera:.1f}s).")
+            return False
+        print(f"[Web] Servidor terminou de processar: {motivo} (após {espera:.1f}s).")
+        return True
 
-    def _monitorar_download_concluido(self, timeout_segundos=3900): # 65 minutos
+    @metricas.medir("download")
+    def _monitorar_download_concluido(self, timeout_segundos=None):
+        """
+        Espera o download ser concluído. No Linux usa inotify (avisado assim que o
+        .crdownload vira .csv); nos demais sistemas, ou se o inotify falhar,
+        monitora a pasta por polling. Só CSVs gravados depois do clique de
+        exportação contam. As métricas ficam em 'self.metricas_download'.
+        """
+        timeout_segundos = timeout_segundos or self.timeout_exportacao
+        inicio = time.time()
+        # Tolerância de 2s para a resolução do mtime em alguns sistemas de arquivos
+        desde = (self.inicio_exportacao or inicio) - 2
+
+        arquivo = None
+        backend = "polling"
+        if inotify_disponivel():
+            try:
+                monitor = MonitorInotify(self.pasta_downloads)
+                backend = "inotify"
+            except OSError as e:
+                print(f"[Sistema] Aviso: inotify indisponível ({e}). Usando polling.")
+                monitor = None
+            if monitor:
+                print(f"[Sistema] Monitorando pasta '{self.pasta_downloads}' via inotify por até {timeout_segundos}s...")
+                try:
+                    arquivo = monitor.aguardar_csv(desde, timeout_segundos)
+                finally:
+                    monitor.fechar()
+                if not arquivo:
+                    raise Exception(f"Timeout de {timeout_segundos}s atingido. Download não concluído.")
+
+        if not arquivo:
+            arquivo = self._monitorar_download_polling(desde, timeout_segundos)
+
+        detectado = time.time()
+        self.metricas_download = {
+            "backend": backend,
+            "espera_s": round(detectado - inicio, 3),
+            # Tempo entre a última escrita do arquivo e a detecção
+            "latencia_deteccao_s": round(max(0.0, detectado - os.path.getmtime(arquivo)), 3),
+            "bytes": os.path.getsize(arquivo),
+        }
+        metricas.anotar(bytes=self.metricas_download["bytes"])
+        print("\n[Sistema] Download concluído!")
+        print(f"[Sistema] Arquivo baixado: {arquivo}")
+        print(f"[Sistema] Detecção via {backend}: latência de {self.metricas_download['latencia_deteccao_s']}s")
+        return arquivo
+
+    def _monitorar_download_polling(self, desde, timeout_segundos):
         """
         Espera o download ser concluído monitorando a pasta.
         O download é considerado completo quando um arquivo .csv existe
@@ -172,18 +321,17 @@ class PlugPharmaAutomator:
             if time.time() - start_time > timeout_segundos:
                 raise Exception(f"Timeout de {timeout_segundos}s atingido. Download não concluído.")
 
-            # 2. Procura os arquivos
+            # 2. Procura os arquivos (CSVs anteriores à exportação são ignorados)
             arquivos_cr = glob.glob(os.path.join(self.pasta_downloads, "*.crdownload"))
-            arquivos_csv = glob.glob(os.path.join(self.pasta_downloads, "*.csv"))
+            arquivos_csv = [
+                f for f in glob.glob(os.path.join(self.pasta_downloads, "*.csv")) if csv_recente(f, desde)
+            ]
 
             # 3. Verifica a condição de conclusão
             # (Temos CSV) E (NÃO temos .crdownload) = Sucesso!
             if arquivos_csv and not arquivos_cr:
-                print("\n[Sistema] Download concluído!")
                 # Encontra o arquivo .csv mais recente
-                arquivo_recente = max(arquivos_csv, key=os.path.getctime)
-                print(f"[Sistema] Arquivo baixado: {arquivo_recente}")
-                return arquivo_recente
+                return max(arquivos_csv, key=os.path.getmtime)
 
             # 4. Se não terminou, informa o status e espera
             if arquivos_cr:
@@ -195,9 +343,55 @@ class PlugPharmaAutomator:
 
             time.sleep(2) # Espera 2 segundos antes de verificar novamente
 
+    @metricas.medir("download")
+    def _baixar_direto(self, caminho_destino, timeout_segundos=None):
+        """
+        Espera o Chrome anunciar o download do arquivo exportado, fecha o
+        navegador e baixa o arquivo por HTTP (em stream, com retomada),
+        reaproveitando cookies e cabeçalhos de autenticação da sessão.
+        Retorna o caminho baixado, ou None se a URL não puder ser usada.
+        """
+        timeout_segundos = timeout_segundos or self.timeout_exportacao
+        inicio = time.time()
+        print("[Web] Aguardando a URL do arquivo exportado (eventos do DevTools)...")
+        url = self.coletor_cdp.aguardar_url_download(timeout_segundos)
+        if not url or not url.lower().startswith(("http://", "https://")):
+            print(f"[Web] URL de download não utilizável por HTTP: {url!r}")
+            return None
+
+        print(f"[Web] URL do arquivo: {url}")
+        autorizacao = self.coletor_cdp.autorizacao_por_host.get(urlparse(url).netloc)
+        sessao = criar_sessao_http(self.driver, autorizacao)
+        # A sessão já foi copiada: o navegador não é mais necessário
+        self.fechar_navegador()
+
+        try:
+            print(f"[HTTP] Baixando para {caminho_destino}...")
+            tamanho = baixar_em_stream(sessao, url, caminho_destino)
+        finally:
+            sessao.close()
+            # Remove o download parcial que o Chrome tinha começado
+            for f in glob.glob(os.path.join(self.pasta_downloads, "*.crdownload")):
+                try:
+                    os.remove(f)
+                except OSError:
+                    pass
+
+        self.metricas_download = {
+            "backend": "http",
+            "espera_s": round(time.time() - inicio, 3),
+            "bytes": tamanho,
+        }
+        metricas.anotar(bytes=tamanho)
+        print(f"[HTTP] Download concluído: {tamanho} bytes em {self.metricas_download['espera_s']}s")
+        return caminho_destino
+
     def fechar_navegador(self):
+        if self.driver is None:
+            return
         print("[Web] Fechando o navegador.")
         self.driver.quit()
+        self.driver = None
 
     def executar_extracao(self):
         """
@@ -207,20 +401,33 @@ class PlugPharmaAutomator:
         caminho_arquivo_original = None
         caminho_arquivo_renomeado = None
         try:
-            self.fazer_login()
-            self.navegar_para_produtos()
+            if not (self.warm_start and self.sessao_ativa()):
+                self.fazer_login()
+                self.navegar_para_produtos()
 
             sucesso_cliques = self.coletar_dados_produtos()
 
             if sucesso_cliques:
                 if self._esperar_processamento_servidor():
+                    if self.download_direto:
+                        caminho_direto = os.path.join(self.pasta_downloads, self._nome_arquivo_final())
+                        try:
+                            caminho_baixado = self._baixar_direto(caminho_direto)
+                            if caminho_baixado:
+                                return caminho_baixado
+                        except Exception as e:
+                            print(f"[HTTP] Erro no download direto: {e}")
+                        if self.driver is None:
+                            # O navegador já foi fechado: não há download do Chrome para esperar
+                            return None
+                        print("[Sistema] Voltando para o download pelo navegador...")
+
                     caminho_arquivo_original = self._monitorar_download_concluido()
 
                     if caminho_arquivo_original:
                         try:
-                            hoje_str = datetime.now().strftime('%Y-%m-%d')
                             # --- ALTERAÇÃO AQUI ---
-                            novo_nome = f"{hoje_str}_produtos.csv" # Formato alterado
+                            novo_nome = self._nome_arquivo_final() # Formato alterado
                             # --- FIM DA ALTERAÇÃO ---
                             caminho_arquivo_renomeado = os.path.join(self.pasta_downloads, novo_nome)
 
@@ -268,7 +475,8 @@ if __name__ == "__main__":
     if login_cfg:
         # Passa o argumento 'dev_mode' para a classe
         # args.dev será True se --dev for usado, ou False caso contrário
-        automator = PlugPharmaAutomator(login_cfg, dev_mode=args.dev) 
+        navegador_cfg = config.get("navegador", {})
+        automator = PlugPharmaAutomator(login_cfg, dev_mode=args.dev, navegador_config=navegador_cfg)
         caminho_arquivo_final = automator.executar_extracao()
         
         if caminho_arquivo_final:
@@ -0,0 +1,5 @@
+# benchmark/__init__.py
+
+"""
+Gerador de exports sintéticos e benchmark das etapas de carga.
+"""
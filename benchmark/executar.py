@@ -0,0 +1,182 @@
+# benchmark/executar.py
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+import pandas as pd
+from destinos import criar_destino
+from tabelas import INDICES_PADRAO
+from transformacao import preparar_dataframe, transformar_produtos
+from utils import detectar_encoding
+from benchmark.gerador import ENCODINGS, gerar_csv
+
+TAMANHOS_PADRAO = [10000, 100000, 1000000]
+TABELA_BENCHMARK = "bronze_plugpharma_produtos_benchmark"
+PASTA_RESULTADOS_PADRAO = os.path.join("benchmark", "resultados")
+ETAPAS = ("leitura", "transformacao", "insercao")
+
+
+def _commit_atual():
+    try:
+        saida = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        )
+        return saida.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+DESTINOS = ("sqlite", "duckdb", "parquet", "mariadb")
+
+
+def criar_destino_benchmark(nome, backend, pasta_dados):
+    """
+    Destino da carga (ver destinos.py) para o benchmark. SQLite e DuckDB ficam
+    em memória e o Parquet vai para a pasta dos dados: medem só o lado Python,
+    sem rede. O MariaDB usa o 'dbDrogamais' do config.json, em uma tabela
+    própria do benchmark que é apagada depois de cada medição (sem guardar
+    gerações anteriores nem comparar com a carga anterior).
+    """
+    if nome == "mariadb":
+        import geracoes
+        from utils import carregar_config
+        return criar_destino(
+            nome, db_config=carregar_config().get("dbDrogamais", {}), backend=backend, tabela=TABELA_BENCHMARK,
+            politica_geracoes=geracoes.politica({"manter": 0, "max_variacao_linhas": None})
+        )
+    caminho = os.path.join(pasta_dados, f"{TABELA_BENCHMARK}.parquet") if nome == "parquet" else ":memory:"
+    return criar_destino(nome, caminho, tabela=TABELA_BENCHMARK)
+
+
+def medir_tamanho(caminho_csv, destino, agora):
+    """
+    Roda leitura, transformação e inserção do CSV, medindo cada etapa separadamente.
+    A inserção inclui a criação dos índices e a publicação da tabela no destino.
+    """
+    etapas = {}
+
+    inicio = time.perf_counter()
+    encoding, _ = detectar_encoding(caminho_csv)
+    df = pd.read_csv(caminho_csv, sep=";", encoding=encoding, low_memory=False, dtype=str)
+    etapas["leitura"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    df_transformado = transformar_produtos(preparar_dataframe(df), agora)
+    etapas["transformacao"] = time.perf_counter() - inicio
+
+    destino.iniciar()
+    try:
+        inicio = time.perf_counter()
+        total = destino.escrever(df_transformado)
+        destino.concluir(INDICES_PADRAO)
+        etapas["insercao"] = time.perf_counter() - inicio
+        if destino.nome == "mariadb":
+            destino.cursor.execute(f"DROP TABLE IF EXISTS {TABELA_BENCHMARK}")
+    finally:
+        destino.fechar()
+
+    return {
+        "linhas_csv": len(df),
+        "linhas_inseridas": total,
+        "bytes_csv": os.path.getsize(caminho_csv),
+        "encoding": encoding,
+        "segundos": {etapa: round(segundos, 4) for etapa, segundos in etapas.items()},
+        "linhas_por_segundo": {
+            "leitura": round(len(df) / etapas["leitura"], 1) if etapas["leitura"] else None,
+            "transformacao": round(len(df) / etapas["transformacao"], 1) if etapas["transformacao"] else None,
+            "insercao": round(total / etapas["insercao"], 1) if etapas["insercao"] else None,
+        },
+    }
+
+
+def comparar(resultado, anterior):
+    """
+    Imprime a variação de tempo de cada etapa em relação a um resultado anterior.
+    """
+    anteriores = {item["linhas_csv"]: item for item in anterior.get("resultados", [])}
+    print(f"\n[Benchmark] Comparação com {anterior.get('commit') or 'resultado anterior'}:")
+    for item in resultado["resultados"]:
+        base = anteriores.get(item["linhas_csv"])
+        if not base:
+            continue
+        for etapa in ETAPAS:
+            antes, depois = base["segundos"][etapa], item["segundos"][etapa]
+            variacao = (depois - antes) / antes * 100 if antes else 0.0
+            print(f"  {item['linhas_csv']:>9} linhas | {etapa:<13} {antes:>9.3f}s -> {depois:>9.3f}s ({variacao:+.1f}%)")
+
+
+def executar_benchmark(tamanhos, destino_nome="sqlite", backend="executemany", encoding="utf-8-sig",
+                       fracao_adicionais=0.3, semente=42, pasta_dados=None):
+    """
+    Gera um CSV sintético para cada tamanho e mede as três etapas. Retorna o
+    resultado completo (com commit, versões e medições) pronto para virar JSON.
+    """
+    pasta_dados = pasta_dados or tempfile.mkdtemp(prefix="pp_benchmark_")
+    os.makedirs(pasta_dados, exist_ok=True)
+    backend = backend if destino_nome == "mariadb" else None
+    agora = datetime.now()
+    resultados = []
+    for linhas in tamanhos:
+        caminho_csv = os.path.join(pasta_dados, f"produtos_{linhas}_{encoding}_{semente}.csv")
+        if not os.path.exists(caminho_csv):
+            print(f"[Benchmark] Gerando CSV sintético com {linhas} linhas...")
+            gerar_csv(caminho_csv, linhas, encoding, fracao_adicionais, semente=semente)
+        print(f"[Benchmark] Medindo {linhas} linhas (destino '{destino_nome}'" +
+              (f", backend '{backend}')..." if backend else ")..."))
+        medicao = medir_tamanho(caminho_csv, criar_destino_benchmark(destino_nome, backend, pasta_dados), agora)
+        resultados.append(medicao)
+        print(
+            f"[Benchmark] {linhas} linhas: " +
+            ", ".join(f"{etapa} {medicao['segundos'][etapa]:.3f}s" for etapa in ETAPAS)
+        )
+
+    return {
+        "commit": _commit_atual(),
+        "executado_em": agora.isoformat(sep=" ", timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "destino": destino_nome,
+        "backend": backend,
+        "encoding": encoding,
+        "fracao_adicionais": fracao_adicionais,
+        "semente": semente,
+        "resultados": resultados,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark das etapas de leitura, transformação e inserção.")
+    parser.add_argument("--linhas", type=int, nargs="+", default=TAMANHOS_PADRAO,
+                        help="Tamanhos do CSV sintético (padrão: 10000 100000 1000000).")
+    parser.add_argument("--destino", choices=DESTINOS, default="sqlite",
+                        help="'sqlite' / 'duckdb' (em memória), 'parquet' (arquivo) ou 'mariadb' (dbDrogamais do config.json).")
+    parser.add_argument("--backend", default="executemany", help="Backend de carga (apenas para o MariaDB).")
+    parser.add_argument("--encoding", choices=ENCODINGS, default="utf-8-sig")
+    parser.add_argument("--fracao-adicionais", type=float, default=0.3)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--dados", help="Pasta onde os CSVs sintéticos ficam guardados entre execuções.")
+    parser.add_argument("--saida", help="Arquivo JSON de resultado (padrão: benchmark/resultados/<data>_<commit>.json).")
+    parser.add_argument("--comparar", metavar="JSON", help="Resultado anterior para comparar as etapas.")
+    args = parser.parse_args()
+
+    resultado = executar_benchmark(
+        args.linhas, args.destino, args.backend, args.encoding, args.fracao_adicionais, args.semente, args.dados
+    )
+
+    saida = args.saida
+    if not saida:
+        os.makedirs(PASTA_RESULTADOS_PADRAO, exist_ok=True)
+        nome = f"{datetime.now().strftime('%Y-%m-%d_%H%M%S')}_{resultado['commit'] or 'sem-commit'}.json"
+        saida = os.path.join(PASTA_RESULTADOS_PADRAO, nome)
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+    print(f"\n[Benchmark] Resultado salvo em {saida}")
+
+    if args.comparar:
+        with open(args.comparar, "r", encoding="utf-8") as f:
+            comparar(resultado, json.load(f))
@@ -0,0 +1,122 @@
+# benchmark/gerador.py
+
+import argparse
+import numpy as np
+import pandas as pd
+from transformacao import COLUNAS_CSV_NECESSARIAS, FORMATO_DATA_BR
+
+ENCODINGS = ("utf-8-sig", "utf-8", "latin-1")
+
+FABRICANTES = ["EMS S/A", "EUROFARMA LABORATÓRIOS", "MEDLEY FARMACÊUTICA", "ACHÉ LABORATÓRIOS", "NEO QUÍMICA"]
+TIPOS_PRODUTO = ["MEDICAMENTO", "PERFUMARIA", "CONVENIÊNCIA", "HIGIENE PESSOAL"]
+GRUPOS = ["GENÉRICO", "SIMILAR", "REFERÊNCIA", "OUTROS"]
+NCM_DESCRICOES = ["Medicamentos em doses", "Preparações capilares", "Produtos de beleza"]
+SUBSTANCIAS = ["DIPIRONA SÓDICA", "PARACETAMOL", "IBUPROFENO", "LOSARTANA POTÁSSICA", ""]
+FARMACOLOGICOS = ["ANALGÉSICO", "ANTI-INFLAMATÓRIO", "ANTI-HIPERTENSIVO", ""]
+DESCRICOES = ["DIPIRONA", "PARACETAMOL", "SHAMPOO ANTICASPA", "PROTETOR SOLAR", "LOSARTANA"]
+APRESENTACOES = ["500MG C/ 10 COMP", "200ML", "FPS 50 120G", "50MG C/ 30 COMP", "GOTAS 20ML"]
+DATAS_INVALIDAS = ["31/02/2023 00:00:00", "", "2023-01-15", "lixo"]
+
+
+def _escolher(rng, opcoes, linhas):
+    return np.asarray(opcoes, dtype=object)[rng.integers(0, len(opcoes), linhas)]
+
+
+def _codigos_barras(rng, linhas):
+    # EAN-13 brasileiros (789...), alguns com espaços em volta como no export real
+    codigos = pd.Series(rng.integers(7890000000000, 7899999999999, linhas).astype(str))
+    com_espaco = rng.random(linhas) < 0.02
+    codigos[com_espaco] = " " + codigos[com_espaco] + " "
+    return codigos
+
+
+def _datas(rng, linhas, fracao_invalidas):
+    segundos = rng.integers(1262304000, 1735689600, linhas)  # 2010-01-01 .. 2025-01-01
+    datas = pd.Series(pd.to_datetime(segundos, unit="s").strftime(FORMATO_DATA_BR))
+    invalidas = rng.random(linhas) < fracao_invalidas
+    datas[invalidas] = _escolher(rng, DATAS_INVALIDAS, int(invalidas.sum()))
+    return datas
+
+
+def gerar_dataframe(linhas, fracao_adicionais=0.3, fracao_datas_invalidas=0.01, semente=42):
+    """
+    Gera um DataFrame no formato do export de produtos do PlugPharma, com as
+    colunas que o 'database.py' usa. 'fracao_adicionais' dos produtos recebe
+    de 1 a 3 códigos de barras adicionais unidos por '+', e
+    'fracao_datas_invalidas' das datas vem fora do padrão dd/mm/aaaa.
+    """
+    rng = np.random.default_rng(semente)
+    df = pd.DataFrame(index=range(linhas))
+
+    df["CODIGO INTERNO"] = pd.Series(np.arange(1, linhas + 1)).astype(str)
+    df["CODIGO BARRAS PRINCIPAL"] = _codigos_barras(rng, linhas)
+    sem_principal = rng.random(linhas) < 0.01
+    df.loc[sem_principal, "CODIGO BARRAS PRINCIPAL"] = ""
+
+    # Adicionais: "cod1+cod2+cod3", às vezes com '+' sobrando ou espaços
+    quantidade = np.where(rng.random(linhas) < fracao_adicionais, rng.integers(1, 4, linhas), 0)
+    adicionais = pd.Series([""] * linhas, dtype=object)
+    for i in range(1, 4):
+        recebe = quantidade >= i
+        codigos = _codigos_barras(rng, linhas)[recebe]
+        adicionais[recebe] = np.where(adicionais[recebe] == "", codigos, adicionais[recebe] + "+" + codigos)
+    com_sobra = (quantidade > 0) & (rng.random(linhas) < 0.02)
+    adicionais[com_sobra] = adicionais[com_sobra] + " + "
+    df["CODIGO BARRAS ADICIONAL"] = adicionais
+
+    df["DESCRIÇÃO"] = _escolher(rng, DESCRICOES, linhas)
+    df["APRESENTAÇÃO"] = _escolher(rng, APRESENTACOES, linhas)
+    df["STATUS"] = np.where(rng.random(linhas) < 0.9, "ATIVO", "INATIVO")
+    codigo_fabricante = rng.integers(0, len(FABRICANTES), linhas)
+    df["CODIGO FABRICANTE"] = codigo_fabricante.astype(str)
+    df["FABRICANTE"] = np.asarray(FABRICANTES, dtype=object)[codigo_fabricante]
+    df["CNPJ FABRICANTE"] = pd.Series(rng.integers(10**13, 10**14 - 1, linhas)).astype(str)
+    codigo_tipo = rng.integers(0, len(TIPOS_PRODUTO), linhas)
+    df["CODIGO TIPO PRODUTO"] = codigo_tipo.astype(str)
+    df["TIPO PRODUTO"] = np.asarray(TIPOS_PRODUTO, dtype=object)[codigo_tipo]
+    codigo_grupo = rng.integers(0, len(GRUPOS), linhas)
+    df["CODIGO GRUPO PRINCIPAL"] = codigo_grupo.astype(str)
+    df["GRUPO PRINCIPAL"] = np.asarray(GRUPOS, dtype=object)[codigo_grupo]
+    df["NCM"] = pd.Series(rng.integers(30000000, 34000000, linhas)).astype(str)
+    df["NCM DESCRIÇÃO"] = _escolher(rng, NCM_DESCRICOES, linhas)
+    df["PREÇO CONTROLADO"] = np.where(rng.random(linhas) < 0.4, "S", "N")
+    df["CODIGO MS"] = pd.Series(rng.integers(10**12, 10**13 - 1, linhas)).astype(str)
+    df["PORTARIA"] = _escolher(rng, ["", "344/98 - C1", "344/98 - B1"], linhas)
+    df["FORMA APRESENTAÇÃO"] = _escolher(rng, ["COMPRIMIDO", "SOLUÇÃO", "CREME", "GOTAS"], linhas)
+    df["CODIGO UNIDADE MEDIDA"] = _escolher(rng, ["UN", "CX", "FR"], linhas)
+    df["FRAÇÃO"] = pd.Series(rng.integers(1, 60, linhas)).astype(str)
+    df["SUBSTANCIA NOME"] = _escolher(rng, SUBSTANCIAS, linhas)
+    df["CONCENTRAÇÃO"] = _escolher(rng, ["500MG", "50MG", "1G/ML", ""], linhas)
+    df["FARMACOLOGICO"] = _escolher(rng, FARMACOLOGICOS, linhas)
+    df["DATA CADASTRO"] = _datas(rng, linhas, fracao_datas_invalidas)
+    df["ULTIMA ALTERAÇÃO"] = _datas(rng, linhas, fracao_datas_invalidas)
+    df["ASSOCIADO"] = _escolher(rng, ["S", "N"], linhas)
+
+    return df[COLUNAS_CSV_NECESSARIAS]
+
+
+def gerar_csv(caminho, linhas, encoding="utf-8-sig", fracao_adicionais=0.3,
+              fracao_datas_invalidas=0.01, semente=42):
+    """
+    Grava um CSV sintético (separador ';') no formato do export. Retorna o caminho.
+    """
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Encoding não suportado: '{encoding}'. Opções: {', '.join(ENCODINGS)}")
+    df = gerar_dataframe(linhas, fracao_adicionais, fracao_datas_invalidas, semente)
+    df.to_csv(caminho, sep=";", index=False, encoding=encoding)
+    return caminho
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera um CSV sintético no formato do export de produtos.")
+    parser.add_argument("destino", help="Caminho do CSV a gerar.")
+    parser.add_argument("--linhas", type=int, default=10000)
+    parser.add_argument("--encoding", choices=ENCODINGS, default="utf-8-sig")
+    parser.add_argument("--fracao-adicionais", type=float, default=0.3)
+    parser.add_argument("--fracao-datas-invalidas", type=float, default=0.01)
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    gerar_csv(args.destino, args.linhas, args.encoding, args.fracao_adicionais,
+              args.fracao_datas_invalidas, args.semente)
+    print(f"[Benchmark] CSV gerado: {args.destino} ({args.linhas} linhas, {args.encoding})")
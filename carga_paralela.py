@@ -0,0 +1,96 @@
+# carga_paralela.py
+
+import queue
+import threading
+import time
+from carregadores import criar_carregador
+from transformacao import COLUNAS_DB_TODAS
+
+
+def _trabalhar(numero, pool, backend, tabela, fila, erros, resultados, colunas, derivadas):
+    """
+    Worker: pega uma conexão do pool e carrega blocos da fila até receber None.
+    Depois de um erro (dele ou de outro worker) continua esvaziando a fila,
+    sem carregar, para o produtor não ficar bloqueado.
+    """
+    linhas = 0
+    tempo_ativo = 0.0
+    conexao = None
+    cursor = None
+    try:
+        conexao = pool.get_connection()
+        cursor = conexao.cursor()
+        carregador = criar_carregador(backend, cursor, tabela, colunas, derivadas)
+    except Exception as e:
+        erros.append(e)
+
+    while True:
+        df_bloco = fila.get()
+        if df_bloco is None:
+            break
+        if erros:
+            continue
+        try:
+            inicio = time.perf_counter()
+            linhas += carregador.carregar(carregador.preparar(df_bloco))
+            conexao.commit()
+            tempo_ativo += time.perf_counter() - inicio
+        except Exception as e:
+            print(f"[Database] Worker {numero}: erro ao carregar bloco: {e}")
+            erros.append(e)
+            try:
+                conexao.rollback()
+            except Exception:
+                pass
+
+    if cursor: cursor.close()
+    if conexao: conexao.close()  # devolve a conexão ao pool
+    resultados[numero] = (linhas, tempo_ativo)
+
+
+def carregar_em_paralelo(pool, backend, tabela, blocos, workers, colunas=COLUNAS_DB_TODAS, derivadas=None):
+    """
+    Distribui os blocos transformados (DataFrames) entre 'workers' threads,
+    cada uma com sua conexão do pool, inserindo lotes disjuntos na mesma tabela.
+    'colunas' e 'derivadas' são repassadas ao carregador de cada worker.
+    Imprime linhas/s por worker e retorna o total de linhas inseridas.
+    """
+    fila = queue.Queue(maxsize=workers * 2)
+    erros = []
+    resultados = {}
+    threads = [
+        threading.Thread(
+            target=_trabalhar,
+            args=(numero, pool, backend, tabela, fila, erros, resultados, colunas, derivadas),
+            daemon=True,
+        )
+        for numero in range(1, workers + 1)
+    ]
+    for t in threads:
+        t.start()
+
+    inicio = time.perf_counter()
+    try:
+        for df_bloco in blocos:
+            if erros:
+                break
+            fila.put(df_bloco)
+    finally:
+        for _ in threads:
+            fila.put(None)
+        for t in threads:
+            t.join()
+
+    if erros:
+        raise erros[0]
+
+    duracao = time.perf_counter() - inicio
+    total = 0
+    for numero in sorted(resultados):
+        linhas, tempo_ativo = resultados[numero]
+        total += linhas
+        taxa = linhas / tempo_ativo if tempo_ativo else 0
+        print(f"[Database] Worker {numero}: {linhas} linhas em {tempo_ativo:.1f}s ({taxa:.0f} linhas/s)")
+    taxa_total = total / duracao if duracao else 0
+    print(f"[Database] Total paralelo: {total} linhas em {duracao:.1f}s ({taxa_total:.0f} linhas/s, {workers} workers)")
+    return total
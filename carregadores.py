@@ -0,0 +1,316 @@
+# carregadores.py
+
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from transformacao import COLUNAS_DB_TODAS, linhas_para_insercao
+
+# --- Lotes do executemany: tamanho decidido em bytes, não em linhas ---
+MAX_ALLOWED_PACKET_PADRAO = 16 * 1024 * 1024  # usado se não der para consultar o servidor
+FRACAO_PACOTE = 0.5                            # cada lote usa no máximo metade do max_allowed_packet
+LOTE_BYTES_INICIAL = 4 * 1024 * 1024
+LOTE_BYTES_MINIMO = 256 * 1024
+BYTES_POR_CAMPO = 4                            # cabeçalho aproximado de cada valor no protocolo
+BYTES_VALOR_FIXO = 8                           # datas e números
+TEMPO_LOTE_ALVO = (0.5, 2.0)                   # faixa de duração desejada para cada lote (segundos)
+
+# Erros que indicam que o LOAD DATA LOCAL INFILE foi recusado (servidor ou cliente)
+ERROS_LOCAL_INFILE_RECUSADO = {
+    1148,  # ER_NOT_ALLOWED_COMMAND
+    2068,  # CR_LOAD_DATA_LOCAL_INFILE_REJECTED
+    4166,  # ER_LOAD_INFILE_CAPABILITY_DISABLED
+}
+
+AVISOS_EXIBIDOS = 5                            # avisos do LOAD DATA mostrados na mensagem de erro
+
+COLUNAS_DATETIME = ["data_cadastro", "ultima_alteracao", "data_insercao"]
+NULO_TSV = "\\N"
+
+
+def consultar_max_allowed_packet(cursor):
+    """
+    max_allowed_packet da sessão, ou None se não for possível consultar.
+    """
+    try:
+        cursor.execute("SELECT @@max_allowed_packet")
+        return int(cursor.fetchone()[0])
+    except Exception:
+        return None
+
+
+def bytes_utf8(serie):
+    """
+    Tamanho em bytes UTF-8 de cada texto da série (nulos contam 0). Letras
+    acentuadas ocupam 2 bytes: contar caracteres subestimaria os lotes.
+    Usa o pyarrow, se instalado (bem mais rápido); senão, codifica cada valor.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        tamanhos = pc.binary_length(pa.array(serie, type=pa.string(), from_pandas=True))
+        return tamanhos.fill_null(0).to_numpy(zero_copy_only=False).astype(np.int64)
+    except (ImportError, TypeError, ValueError):
+        # Sem pyarrow, ou valores que não são texto (ArrowInvalid é um ValueError)
+        return serie.str.encode("utf-8").str.len().fillna(0).to_numpy(dtype=np.int64)
+
+
+def estimar_bytes_linhas(df, colunas):
+    """
+    Estimativa vetorizada do tamanho de cada linha no INSERT: bytes UTF-8
+    dos textos + um valor fixo para datas e números + o cabeçalho de cada
+    campo. Retorna um array numpy com um valor por linha.
+    """
+    tamanhos = np.full(len(df), BYTES_POR_CAMPO * len(colunas), dtype=np.int64)
+    for col in colunas:
+        serie = df[col]
+        if pd.api.types.is_object_dtype(serie) or pd.api.types.is_string_dtype(serie):
+            tamanhos += bytes_utf8(serie)
+        else:
+            tamanhos += BYTES_VALOR_FIXO
+    return tamanhos
+
+
+class OrcamentoLotes:
+    """
+    Decide quantos bytes vão em cada lote do executemany. O limite vem do
+    max_allowed_packet; dentro dele, o orçamento dobra quando os lotes
+    voltam rápido e cai pela metade quando demoram (tempo medido de cada lote).
+    """
+
+    def __init__(self, max_allowed_packet):
+        self.limite = max(LOTE_BYTES_MINIMO, int(max_allowed_packet * FRACAO_PACOTE))
+        self.bytes_lote = min(LOTE_BYTES_INICIAL, self.limite)
+
+    def fim_do_lote(self, acumulado, inicio):
+        """
+        Índice (exclusivo) da última linha que cabe no lote começando em 'inicio',
+        dado o tamanho acumulado das linhas. Sempre inclui ao menos uma linha.
+        """
+        base = acumulado[inicio - 1] if inicio else 0
+        fim = int(np.searchsorted(acumulado, base + self.bytes_lote, side="right"))
+        return max(fim, inicio + 1)
+
+    def ajustar(self, segundos):
+        """
+        Ajusta o orçamento a partir da duração do último lote. Retorna True se mudou.
+        """
+        anterior = self.bytes_lote
+        if segundos < TEMPO_LOTE_ALVO[0]:
+            self.bytes_lote = min(self.bytes_lote * 2, self.limite)
+        elif segundos > TEMPO_LOTE_ALVO[1]:
+            self.bytes_lote = max(self.bytes_lote // 2, LOTE_BYTES_MINIMO)
+        return self.bytes_lote != anterior
+
+
+class CarregadorExecutemany:
+    """
+    Backend padrão: INSERT com placeholders via cursor.executemany. Os lotes são
+    formados por bytes estimados (ver OrcamentoLotes), não por quantidade de linhas.
+    'derivadas' ({coluna: expressão SQL}) são calculadas pelo banco a partir
+    das colunas enviadas antes delas na mesma linha.
+    """
+    nome = "executemany"
+
+    def __init__(self, cursor, tabela, colunas=COLUNAS_DB_TODAS, derivadas=None):
+        self.cursor = cursor
+        self.tabela = tabela
+        self.colunas = colunas
+        self.lote = 1
+        derivadas = derivadas or {}
+        colunas_sql = ", ".join(list(colunas) + list(derivadas))
+        valores = ", ".join(["?"] * len(colunas) + list(derivadas.values()))
+        self.query = f"INSERT INTO {tabela} ({colunas_sql}) VALUES ({valores})"
+        self.orcamento = None
+
+    def _iniciar_orcamento(self):
+        max_allowed_packet = consultar_max_allowed_packet(self.cursor)
+        origem = "servidor"
+        if not max_allowed_packet:
+            max_allowed_packet = MAX_ALLOWED_PACKET_PADRAO
+            origem = "padrão"
+        self.orcamento = OrcamentoLotes(max_allowed_packet)
+        print(
+            f"[Database] max_allowed_packet: {max_allowed_packet // 1024} KB ({origem}). "
+            f"Lotes de até {self.orcamento.limite // 1024} KB, começando com {self.orcamento.bytes_lote // 1024} KB."
+        )
+
+    def preparar(self, df_transformado):
+        """Converte o bloco transformado no formato que 'carregar' envia ao banco."""
+        return (
+            linhas_para_insercao(df_transformado, self.colunas),
+            np.cumsum(estimar_bytes_linhas(df_transformado, self.colunas)),
+        )
+
+    def carregar(self, preparado):
+        """Envia o bloco preparado. Retorna o número de linhas inseridas."""
+        linhas, acumulado = preparado
+        if self.orcamento is None:
+            self._iniciar_orcamento()
+        inicio = 0
+        while inicio < len(linhas):
+            fim = self.orcamento.fim_do_lote(acumulado, inicio)
+            bytes_lote = int(acumulado[fim - 1] - (acumulado[inicio - 1] if inicio else 0))
+            comeco = time.perf_counter()
+            self.cursor.executemany(self.query, linhas[inicio:fim])
+            segundos = time.perf_counter() - comeco
+            taxa = (fim - inicio) / segundos if segundos else 0
+            print(
+                f"[Database] Inserido lote {self.lote}: {fim - inicio} linhas, ~{bytes_lote // 1024} KB "
+                f"em {segundos:.2f}s ({taxa:.0f} linhas/s)"
+            )
+            if self.orcamento.ajustar(segundos):
+                print(f"[Database] Tamanho do lote ajustado para {self.orcamento.bytes_lote // 1024} KB")
+            self.lote += 1
+            inicio = fim
+        return len(linhas)
+
+    def descartar(self, preparado):
+        """Libera recursos de um bloco preparado que não será carregado."""
+        pass
+
+
+def _escapar_tsv(serie):
+    """
+    Escapa uma coluna de texto para o formato padrão do LOAD DATA
+    (FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n').
+    """
+    return (
+        serie.str.replace("\\", "\\\\", regex=False)
+        .str.replace("\t", "\\t", regex=False)
+        .str.replace("\n", "\\n", regex=False)
+        .str.replace("\r", "\\r", regex=False)
+        .str.replace("\0", "\\0", regex=False)
+    )
+
+
+def escrever_tsv(df_transformado, arquivo, colunas=COLUNAS_DB_TODAS):
+    """
+    Grava o bloco transformado como TSV (UTF-8) no formato esperado pelo LOAD DATA.
+    Datas inválidas (NaT) e valores nulos viram \\N (NULL).
+    """
+    textos = []
+    for col in colunas:
+        serie = df_transformado[col]
+        if col in COLUNAS_DATETIME:
+            texto = pd.to_datetime(serie).dt.strftime("%Y-%m-%d %H:%M:%S")
+        elif col == "codigo_principal":
+            texto = serie.astype(str)
+        else:
+            texto = _escapar_tsv(serie.fillna("").astype(str)).where(serie.notna(), None)
+        textos.append(texto.fillna(NULO_TSV))
+
+    linhas = textos[0]
+    for texto in textos[1:]:
+        linhas = linhas + "\t" + texto
+
+    if len(linhas):
+        arquivo.write("\n".join(linhas))
+        arquivo.write("\n")
+    return len(linhas)
+
+
+class CargaComAvisos(Exception):
+    """O LOAD DATA terminou, mas gravou linhas a menos ou com valores alterados."""
+
+
+class CarregadorLoadData:
+    """
+    Backend de carga em massa: grava cada bloco em um TSV temporário e usa
+    LOAD DATA LOCAL INFILE. Se o servidor recusar o local infile, passa a
+    usar o executemany para o restante da carga. Avisos do LOAD DATA (valores
+    truncados ou inválidos) ou linhas a menos falham a carga (CargaComAvisos).
+    """
+    nome = "load_data"
+
+    def __init__(self, cursor, tabela, colunas=COLUNAS_DB_TODAS, derivadas=None):
+        self.cursor = cursor
+        self.tabela = tabela
+        self.colunas = colunas
+        self.derivadas = derivadas or {}
+        self.reserva = CarregadorExecutemany(cursor, tabela, colunas, derivadas)
+        self.recusado = False
+
+    def preparar(self, df_transformado):
+        if self.recusado:
+            return (df_transformado, None)
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", newline="", suffix=".tsv", prefix="pp_produtos_", delete=False
+        ) as arquivo:
+            escrever_tsv(df_transformado, arquivo, self.colunas)
+        return (df_transformado, arquivo.name)
+
+    def carregar(self, preparado):
+        df_transformado, caminho_tsv = preparado
+        try:
+            if not self.recusado:
+                try:
+                    self.cursor.execute(self._query_load_data(caminho_tsv))
+                    self._conferir_carga(len(df_transformado))
+                    print(f"[Database] LOAD DATA: {len(df_transformado)} linhas carregadas")
+                    return len(df_transformado)
+                except Exception as e:
+                    # Sem 'import mariadb' aqui: o erro do conector é reconhecido pelo errno
+                    if getattr(e, "errno", None) not in ERROS_LOCAL_INFILE_RECUSADO:
+                        raise
+                    print(f"[Database] Aviso: LOAD DATA LOCAL INFILE recusado ({e}). Usando executemany.")
+                    self.recusado = True
+            return self.reserva.carregar(self.reserva.preparar(df_transformado))
+        finally:
+            self.descartar(preparado)
+
+    def _conferir_carga(self, linhas):
+        """
+        O LOAD DATA LOCAL não falha com valores truncados ou inválidos nem com
+        linhas rejeitadas: o LOCAL implica IGNORE e tudo vira aviso. Compara as
+        linhas gravadas com as enviadas e consulta o SHOW WARNINGS; se algo não
+        bater, falha a carga (ela fica só na staging, que é descartada).
+        """
+        gravadas = self.cursor.rowcount
+        self.cursor.execute("SHOW WARNINGS")
+        # 'Note' é só informativo; 'Warning' e 'Error' indicam dado alterado ou perdido
+        avisos = [aviso for aviso in self.cursor.fetchall() if aviso[0] != "Note"]
+        if gravadas is not None and gravadas >= 0 and gravadas != linhas:
+            raise CargaComAvisos(
+                f"LOAD DATA em {self.tabela} gravou {gravadas} de {linhas} linhas"
+                + (f" ({len(avisos)} avisos)." if avisos else ".")
+            )
+        if avisos:
+            detalhes = "; ".join(
+                f"{nivel} {codigo}: {mensagem}" for nivel, codigo, mensagem in avisos[:AVISOS_EXIBIDOS]
+            )
+            raise CargaComAvisos(f"LOAD DATA em {self.tabela} gerou {len(avisos)} avisos: {detalhes}")
+
+    def descartar(self, preparado):
+        caminho_tsv = preparado[1]
+        if caminho_tsv and os.path.exists(caminho_tsv):
+            os.remove(caminho_tsv)
+
+    def _query_load_data(self, caminho_tsv):
+        # Barras normais funcionam no Windows e dispensam escapar '\' no literal SQL
+        caminho_sql = caminho_tsv.replace("\\", "/").replace("'", "\\'")
+        colunas_sql = ", ".join(self.colunas)
+        set_sql = (
+            " SET " + ", ".join(f"{coluna} = {expressao}" for coluna, expressao in self.derivadas.items())
+            if self.derivadas else ""
+        )
+        return (
+            f"LOAD DATA LOCAL INFILE '{caminho_sql}' INTO TABLE {self.tabela} "
+            f"CHARACTER SET utf8mb4 "
+            f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' "
+            f"LINES TERMINATED BY '\\n' ({colunas_sql}){set_sql}"
+        )
+
+
+CARREGADORES = {
+    CarregadorExecutemany.nome: CarregadorExecutemany,
+    CarregadorLoadData.nome: CarregadorLoadData,
+}
+BACKEND_PADRAO = CarregadorExecutemany.nome
+
+
+def criar_carregador(nome, cursor, tabela, colunas=COLUNAS_DB_TODAS, derivadas=None):
+    if nome not in CARREGADORES:
+        raise ValueError(f"Backend de carga desconhecido: '{nome}'. Opções: {', '.join(CARREGADORES)}")
+    return CARREGADORES[nome](cursor, tabela, colunas, derivadas)
@@ -0,0 +1,73 @@
+# checkpoint.py
+
+TABELA_CHECKPOINT = "bronze_plugpharma_produtos_checkpoint"
+
+
+def criar_tabela_checkpoint(cursor):
+    """
+    Tabela de controle da carga com checkpoint: um registro por (arquivo, tabela de staging).
+    """
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS {TABELA_CHECKPOINT} (
+        sha256 CHAR(64) NOT NULL, tabela VARCHAR(64) NOT NULL,
+        linhas_por_bloco INT NOT NULL, blocos_confirmados INT NOT NULL,
+        linhas_csv_confirmadas BIGINT NOT NULL, linhas_confirmadas BIGINT NOT NULL,
+        data_insercao DATETIME NOT NULL, atualizado_em DATETIME NOT NULL,
+        PRIMARY KEY (sha256, tabela)
+    ) CHARSET=utf8mb4;
+    """)
+
+
+def ler_checkpoint(cursor, sha256, tabela):
+    """
+    Último checkpoint confirmado deste arquivo nesta tabela, ou None.
+    """
+    cursor.execute(
+        f"SELECT linhas_por_bloco, blocos_confirmados, linhas_csv_confirmadas, linhas_confirmadas, data_insercao "
+        f"FROM {TABELA_CHECKPOINT} WHERE sha256 = ? AND tabela = ?",
+        (sha256, tabela)
+    )
+    linha = cursor.fetchone()
+    if not linha:
+        return None
+    return {
+        "linhas_por_bloco": linha[0],
+        "blocos_confirmados": linha[1],
+        "linhas_csv_confirmadas": linha[2],
+        "linhas_confirmadas": linha[3],
+        "data_insercao": linha[4],
+    }
+
+
+def salvar_checkpoint(cursor, sha256, tabela, linhas_por_bloco, blocos, linhas_csv, linhas, data_insercao):
+    """
+    Grava o progresso da carga. Deve ser chamado na mesma transação do bloco
+    inserido, para que o bloco e o checkpoint sejam confirmados juntos.
+    """
+    cursor.execute(
+        f"INSERT INTO {TABELA_CHECKPOINT} "
+        f"(sha256, tabela, linhas_por_bloco, blocos_confirmados, linhas_csv_confirmadas, linhas_confirmadas, "
+        f"data_insercao, atualizado_em) VALUES (?, ?, ?, ?, ?, ?, ?, NOW()) "
+        f"ON DUPLICATE KEY UPDATE linhas_por_bloco = VALUES(linhas_por_bloco), "
+        f"blocos_confirmados = VALUES(blocos_confirmados), linhas_csv_confirmadas = VALUES(linhas_csv_confirmadas), "
+        f"linhas_confirmadas = VALUES(linhas_confirmadas), data_insercao = VALUES(data_insercao), "
+        f"atualizado_em = NOW()",
+        (sha256, tabela, linhas_por_bloco, blocos, linhas_csv, linhas, data_insercao)
+    )
+
+
+def apagar_checkpoint(cursor, tabela):
+    """
+    Remove os checkpoints da tabela (de qualquer arquivo).
+    """
+    cursor.execute(f"DELETE FROM {TABELA_CHECKPOINT} WHERE tabela = ?", (tabela,))
+
+
+def contar_linhas(cursor, tabela):
+    cursor.execute(f"SELECT COUNT(*) FROM {tabela}")
+    return cursor.fetchone()[0]
+
+
+def tabela_existe(cursor, tabela):
+    cursor.execute(f"SHOW TABLES LIKE '{tabela}'")
+    return bool(cursor.fetchall())
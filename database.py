@@ -1,15 +1,31 @@
 # database.py
 
-import mariadb
 import pandas as pd
 import sys
 import os
+import queue
+import threading
 from datetime import datetime
-from utils import carregar_config
+from utils import carregar_config, detectar_encoding
+from transformacao import preparar_dataframe, transformar_produtos
+from carregadores import BACKEND_PADRAO, criar_carregador
+from carga_paralela import carregar_em_paralelo
+import checkpoint
+import geracoes
+import incremental
+import silver
+import metricas
+import manifesto
+import snapshots
+from tabelas import (
+    COLUNA_BASE, INDICE_BASE, INDICES_PADRAO, TABELA_PRINCIPAL, criar_tabela, validar_indices
+)
+from destinos import DestinoMariaDB, criar_destino
 
-def conectar_db(db_config):
+def conectar_db(db_config, local_infile=False):
     """
     Tenta conectar ao banco de dados real MariaDB.
+    'local_infile' habilita o LOAD DATA LOCAL INFILE (backend 'load_data').
     """
     host = db_config.get("host")
     port = db_config.get("porta", 3306)
@@ -17,6 +33,7 @@ def conectar_db(db_config):
     user = db_config.get("usuario")
     pwd = db_config.get("senha")
 
+    import mariadb  # Importado aqui: os destinos locais (ver destinos.py) não precisam do conector
     try:
         print(f"[Database] Conectando ao banco real MariaDB: {db}@{host}:{port}...")
         conexao = mariadb.connect(
@@ -25,6 +42,7 @@ def conectar_db(db_config):
             host=host,
             port=port,
             database=db,
+            local_infile=local_infile,
             connect_timeout=10 # Aumentar timeout de conexão inicial, se necessário
             # Considere aumentar read_timeout e write_timeout se a rede for lenta,
             # mas o problema principal costuma ser o max_allowed_packet
@@ -32,15 +50,8 @@ def conectar_db(db_config):
             # write_timeout=60
         )
         print("[Database] Conexão real estabelecida.")
-        # Opcional: Verificar o max_allowed_packet da conexão atual
-        # try:
-        #     cursor_check = conexao.cursor()
-        #     cursor_check.execute("SHOW VARIABLES LIKE 'max_allowed_packet'")
-        #     result = cursor_check.fetchone()
-        #     print(f"[Database] max_allowed_packet da sessão atual: {result}")
-        #     cursor_check.close()
-        # except mariadb.Error as e:
-        #     print(f"[Database] Aviso: Não foi possível verificar max_allowed_packet ({e})")
+        # O max_allowed_packet da sessão é consultado pelo carregador 'executemany',
+        # que monta os lotes por bytes a partir dele (ver carregadores.OrcamentoLotes)
         return conexao
 
     except mariadb.Error as e:
@@ -49,140 +60,502 @@ def conectar_db(db_config):
         print("[Database] Verifique seu config.json e se o serviço MariaDB está rodando.")
         return None
 
-def inserir_dados_produtos(conexao, caminho_arquivo_csv):
+
+def criar_pool_db(db_config, tamanho, local_infile=False):
+    """
+    Cria um pool de conexões MariaDB com 'tamanho' conexões (carga paralela).
+    """
+    host = db_config.get("host")
+    port = db_config.get("porta", 3306)
+    db = db_config.get("database")
+
+    import mariadb
+    try:
+        print(f"[Database] Criando pool de {tamanho} conexões: {db}@{host}:{port}...")
+        pool = mariadb.ConnectionPool(
+            pool_name="pp_produtos",
+            pool_size=tamanho,
+            user=db_config.get("usuario"),
+            password=db_config.get("senha"),
+            host=host,
+            port=port,
+            database=db,
+            local_infile=local_infile,
+            connect_timeout=10
+        )
+        print("[Database] Pool de conexões criado.")
+        return pool
+
+    except mariadb.Error as e:
+        print(f"[Database] !!! FALHA AO CRIAR O POOL DE CONEXÕES !!!")
+        print(f"[Database] Erro: {e}")
+        return None
+
+DESTINO_PADRAO = "mariadb"
+LINHAS_POR_BLOCO_PADRAO = 50000
+
+
+def _resultado(agora, linhas_csv, linhas_inseridas, **extras):
+    """
+    Estatísticas devolvidas pelas funções de carga quando a carga é concluída.
+    """
+    resultado = {
+        "linhas_csv": linhas_csv,
+        "linhas_inseridas": linhas_inseridas,
+        "data_insercao": agora.isoformat(sep=" ", timespec="seconds"),
+    }
+    resultado.update(extras)
+    return resultado
+
+
+def _eh_snapshot(caminho_arquivo):
+    return caminho_arquivo.lower().endswith(".parquet")
+
+
+def _detectar_encoding(caminho_arquivo_csv):
+    if _eh_snapshot(caminho_arquivo_csv):
+        return None
+    encoding, segundos = detectar_encoding(caminho_arquivo_csv)
+    print(f"[Database] Encoding detectado: {encoding} (em {segundos:.2f}s)")
+    return encoding
+
+
+def _ler_e_transformar(caminho_arquivo_csv, agora, colunas_derivadas=True):
+    print(f"[Database] Lendo arquivo: {caminho_arquivo_csv}")
+    with metricas.etapa("leitura"):
+        if _eh_snapshot(caminho_arquivo_csv):
+            # Snapshot Parquet: lê só as colunas usadas, com as datas já tipadas
+            df = snapshots.ler_snapshot(caminho_arquivo_csv)
+        else:
+            encoding = _detectar_encoding(caminho_arquivo_csv)
+            df = pd.read_csv(caminho_arquivo_csv, sep=';', encoding=encoding, low_memory=False, dtype=str)
+        metricas.anotar(linhas=len(df), bytes=os.path.getsize(caminho_arquivo_csv))
+
+    with metricas.etapa("transformacao"):
+        # Seleção de colunas e correção de datas
+        df = preparar_dataframe(df)
+
+        # Expansão vetorizada: uma linha por código de barras (principal + adicionais)
+        df_transformado = transformar_produtos(df, agora, colunas_derivadas)
+        metricas.anotar(linhas=len(df_transformado))
+    return df_transformado, len(df)
+
+
+def inserir_dados_produtos(conexao, caminho_arquivo_csv, backend=BACKEND_PADRAO, indices=INDICES_PADRAO,
+                           gerar_silver=False, criar_staging=True, politica_geracoes=None,
+                           derivadas_no_banco=False, coletor=None):
+    """
+    Carga completa: lê o CSV inteiro, carrega a staging (sem índices), cria os
+    índices e troca pela tabela principal. Com 'gerar_silver', carrega também
+    as stagings da camada silver (dimensões + fato, ver silver.py), que são
+    conferidas antes e publicadas no mesmo RENAME TABLE do bronze.
+    'criar_staging=False' usa a staging vazia já criada (ver preparacao_db.py).
+    'derivadas_no_banco' deixa o MariaDB calcular as colunas derivadas.
+    'coletor' (opcional) é chamado com o DataFrame transformado (ver
+    indice_barras.ColetorIndice); o mesmo vale para as outras cargas.
+    Retorna as estatísticas da carga, ou None se ela falhar.
+    """
     if not conexao:
         print("[Database] Inserção falhou: conexão está nula.")
         return
 
-    TABELA_PRINCIPAL = "bronze_plugpharma_produtos"
-    TABELA_STAGING = "bronze_plugpharma_produtos_staging"
-    CHUNK_SIZE = 10000 
-
-    # --- Constantes ---
-    COLUNAS_CSV_BASE = ["CODIGO INTERNO", "CODIGO BARRAS PRINCIPAL", "CODIGO BARRAS ADICIONAL"]
-    COLUNAS_CSV_DADOS = [
-        "DESCRIÇÃO", "APRESENTAÇÃO", "STATUS", "CODIGO FABRICANTE", "FABRICANTE",
-        "CNPJ FABRICANTE", "CODIGO TIPO PRODUTO", "TIPO PRODUTO",
-        "CODIGO GRUPO PRINCIPAL", "GRUPO PRINCIPAL", "NCM", "NCM DESCRIÇÃO",
-        "PREÇO CONTROLADO", "CODIGO MS", "PORTARIA", "FORMA APRESENTAÇÃO",
-        "CODIGO UNIDADE MEDIDA", "FRAÇÃO", "SUBSTANCIA NOME", "CONCENTRAÇÃO",
-        "FARMACOLOGICO", "DATA CADASTRO", "ULTIMA ALTERAÇÃO", "ASSOCIADO"
-    ]
-    COLUNAS_DB_DADOS = [
-        "descricao", "apresentacao", "produto", "status", "codigo_fabricante", "fabricante",
-        "cnpj_fabricante", "codigo_tipo_produto", "tipo_produto",
-        "codigo_grupo_principal", "grupo_principal", "ncm", "ncm_descricao",
-        "preco_controlado", "codigo_ms", "portaria", "forma_apresentacao",
-        "codigo_unidade_medida", "fracao", "substancia_nome", "concentracao",
-        "farmacologico", "data_cadastro", "ultima_alteracao", "associado"
-    ]
-    COLUNAS_DB_BASE = ["codigo_interno", "codigo_barras", "codigo_barras_normalizado", "codigo_principal"]
-    COLUNAS_CSV_NECESSARIAS = COLUNAS_CSV_BASE + COLUNAS_CSV_DADOS
-    COLUNAS_DB_TODAS = COLUNAS_DB_BASE + COLUNAS_DB_DADOS + ["data_insercao"]
+    agora = datetime.now()
+    destino = DestinoMariaDB(
+        backend=backend, conexao=conexao, politica_geracoes=politica_geracoes, derivadas_no_banco=derivadas_no_banco
+    )
+
+    try:
+        df_transformado, linhas_csv = _ler_e_transformar(caminho_arquivo_csv, agora, not derivadas_no_banco)
+
+        if df_transformado.empty:
+            print("[Database] Nenhum dado para inserir.")
+            return
+        if coletor:
+            coletor(df_transformado)
+
+        destino.iniciar(criar_staging)
+        with metricas.etapa("insercao"):
+            total = destino.escrever(df_transformado)
+            metricas.anotar(linhas=total)
+
+        extras = {}
+        acompanhantes = []
+        if gerar_silver:
+            with metricas.etapa("silver"):
+                extras["silver"] = silver.carregar_silver(destino.cursor, df_transformado, backend)
+                acompanhantes = silver.acompanhantes_promocao()
+                metricas.anotar(linhas=extras["silver"]["fato"])
+
+        segundos_indices = destino.concluir(
+            indices, linhas=total, acompanhantes=acompanhantes, linhas_csv=linhas_csv
+        )
+
+        print("[Database] Sucesso total!")
+        return _resultado(agora, linhas_csv, total, segundos_indices=round(segundos_indices, 3), **extras)
+
+    except Exception as e:
+        print(f"[Database] Erro: {e}")
+        destino.descartar()
+    finally:
+        destino.fechar()
+
+
+def _pular_registros(blocos, pular_linhas):
+    # Os blocos já carregados são lidos, mas não transformados
+    for bloco in blocos:
+        if pular_linhas >= len(bloco):
+            pular_linhas -= len(bloco)
+            continue
+        yield bloco.iloc[pular_linhas:]
+        pular_linhas = 0
+
+
+def _ler_blocos(caminho_arquivo, encoding, linhas_por_bloco, pular_linhas=0):
+    """
+    Gera o arquivo (CSV ou snapshot Parquet) em DataFrames de até 'linhas_por_bloco' linhas.
+    As primeiras 'pular_linhas' linhas de dados são ignoradas (retomada de carga).
+    Elas contam registros, como o len(bloco) gravado no checkpoint, e não
+    linhas físicas do arquivo: o cabeçalho (com ou sem BOM) e campos com
+    quebra de linha não deslocam a retomada.
+    """
+    if _eh_snapshot(caminho_arquivo):
+        yield from _pular_registros(snapshots.ler_snapshot_em_blocos(caminho_arquivo, linhas_por_bloco), pular_linhas)
+        return
+    with pd.read_csv(caminho_arquivo, sep=';', encoding=encoding, dtype=str, chunksize=linhas_por_bloco) as leitor:
+        yield from _pular_registros(leitor, pular_linhas)
+
+
+def _produzir_blocos(caminho_arquivo_csv, encoding, linhas_por_bloco, agora, carregador, fila, parar,
+                     colunas_derivadas=True, coletor=None):
+    """
+    Thread produtora: lê o CSV em blocos, transforma e prepara cada bloco para o
+    backend de carga e coloca o resultado na fila. Termina com None (fim) ou
+    com a exceção ocorrida.
+    """
+    def _colocar(item):
+        while not parar.is_set():
+            try:
+                fila.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    try:
+        for bloco in _ler_blocos(caminho_arquivo_csv, encoding, linhas_por_bloco):
+            df_transformado = transformar_produtos(preparar_dataframe(bloco), agora, colunas_derivadas)
+            if coletor:
+                coletor(df_transformado)
+            preparado = carregador.preparar(df_transformado)
+            if not _colocar((len(bloco), preparado)):
+                carregador.descartar(preparado)
+                return
+        _colocar(None)
+    except Exception as e:
+        _colocar(e)
+
+
+def _carregar_streaming(carregador, caminho_arquivo_csv, encoding, linhas_por_bloco, agora, colunas_derivadas=True,
+                        coletor=None):
+    """
+    Consome os blocos da thread produtora e insere cada um assim que fica pronto,
+    enquanto o próximo bloco já está sendo lido.
+    Retorna (linhas lidas do CSV, linhas inseridas).
+    """
+    # maxsize=1: no máximo um bloco pronto esperando + um sendo lido + um sendo inserido
+    fila = queue.Queue(maxsize=1)
+    parar = threading.Event()
+    produtor = threading.Thread(
+        target=_produzir_blocos,
+        args=(caminho_arquivo_csv, encoding, linhas_por_bloco, agora, carregador, fila, parar, colunas_derivadas, coletor),
+        daemon=True,
+    )
+    produtor.start()
+
+    linhas_csv = 0
+    total = 0
+    try:
+        while True:
+            item = fila.get()
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                raise item
+            linhas_bloco, preparado = item
+            linhas_csv += linhas_bloco
+            total += carregador.carregar(preparado)
+            print(f"[Database] Bloco carregado ({total} linhas até agora)")
+    finally:
+        parar.set()
+        produtor.join()
+        # Descarta blocos preparados que não chegaram a ser carregados
+        while not fila.empty():
+            item = fila.get_nowait()
+            if isinstance(item, tuple):
+                carregador.descartar(item[1])
+    return linhas_csv, total
+
+
+def inserir_dados_produtos_streaming(conexao, caminho_arquivo_csv, linhas_por_bloco=LINHAS_POR_BLOCO_PADRAO,
+                                     backend=BACKEND_PADRAO, indices=INDICES_PADRAO, criar_staging=True,
+                                     politica_geracoes=None, derivadas_no_banco=False, coletor=None):
+    """
+    Versão em streaming de 'inserir_dados_produtos': a memória fica limitada
+    a poucos blocos de 'linhas_por_bloco' linhas do CSV, e a inserção do bloco N
+    acontece em paralelo com a leitura do bloco N+1.
+    """
+    if not conexao:
+        print("[Database] Inserção falhou: conexão está nula.")
+        return
 
     agora = datetime.now()
-    cursor = None
+    destino = DestinoMariaDB(
+        backend=backend, conexao=conexao, politica_geracoes=politica_geracoes, derivadas_no_banco=derivadas_no_banco
+    )
 
     try:
-        print(f"[Database] Lendo arquivo: {caminho_arquivo_csv}")
-        try:
-            df = pd.read_csv(caminho_arquivo_csv, sep=';', encoding='utf-8-sig', low_memory=False, dtype=str)
-        except:
-            df = pd.read_csv(caminho_arquivo_csv, sep=';', encoding='latin-1', low_memory=False, dtype=str)
-
-        df = df[COLUNAS_CSV_NECESSARIAS].fillna('')
-        
-        # Correção de datas
-        formato_data_br = '%d/%m/%Y %H:%M:%S'
-        df['DATA CADASTRO'] = pd.to_datetime(df['DATA CADASTRO'], format=formato_data_br, errors='coerce')
-        df['ULTIMA ALTERAÇÃO'] = pd.to_datetime(df['ULTIMA ALTERAÇÃO'], format=formato_data_br, errors='coerce')
-
-        data_to_insert = []
-        for _, row in df.iterrows():
-            cod_interno_raw = row["CODIGO INTERNO"].strip()
-            cod_principal_raw = row["CODIGO BARRAS PRINCIPAL"].strip()
-            cod_adicional_raw = row["CODIGO BARRAS ADICIONAL"].strip()
-
-            if not cod_interno_raw: continue
-
-            cod_interno_trunc = cod_interno_raw[:14]
-            descricao = (row["DESCRIÇÃO"] or "").strip()
-            apresentacao = (row["APRESENTAÇÃO"] or "").strip()
-
-            dados_base_csv = [
-                row[col].strip() if isinstance(row[col], str) else row[col]
-                for col in COLUNAS_CSV_DADOS
-            ]
-
-            # --- PROCESSA CÓDIGO PRINCIPAL ---
-            if cod_principal_raw:
-                cod_norm = cod_principal_raw.zfill(14)[:14]
-                # AJUSTE: Usando cod_principal_raw em vez de cod_norm
-                prod_concat = f"{cod_principal_raw} - {descricao} {apresentacao}"
-                
-                lista_val = dados_base_csv.copy()
-                lista_val.insert(2, prod_concat) 
-
-                tupla = (cod_interno_trunc, cod_principal_raw, cod_norm, 1) + tuple(lista_val) + (agora,)
-                data_to_insert.append(tupla)
-
-            # --- PROCESSA CÓDIGOS ADICIONAIS ---
-            if cod_adicional_raw:
-                for cod_ad in cod_adicional_raw.split("+"):
-                    cod_ad_limpo = cod_ad.strip()
-                    if not cod_ad_limpo: continue
-                    
-                    cod_norm_ad = cod_ad_limpo.zfill(14)[:14]
-                    # AJUSTE: Usando cod_ad_limpo em vez de cod_norm_ad
-                    prod_concat_ad = f"{cod_ad_limpo} - {descricao} {apresentacao}"
-                    
-                    lista_val_ad = dados_base_csv.copy()
-                    lista_val_ad.insert(2, prod_concat_ad)
-
-                    tupla_ad = (cod_interno_trunc, cod_ad_limpo, cod_norm_ad, 0) + tuple(lista_val_ad) + (agora,)
-                    data_to_insert.append(tupla_ad)
-
-        if not data_to_insert:
+        print(f"[Database] Lendo arquivo em streaming ({linhas_por_bloco} linhas por bloco): {caminho_arquivo_csv}")
+        encoding = _detectar_encoding(caminho_arquivo_csv)
+        destino.iniciar(criar_staging)
+        # Leitura, transformação e inserção acontecem em paralelo: medidas juntas
+        with metricas.etapa("carga_streaming"):
+            linhas_csv, total = _carregar_streaming(
+                destino.carregador, caminho_arquivo_csv, encoding, linhas_por_bloco, agora, not derivadas_no_banco,
+                coletor
+            )
+            metricas.anotar(linhas=total, bytes=os.path.getsize(caminho_arquivo_csv))
+
+        if not total:
+            print("[Database] Nenhum dado para inserir.")
+            destino.apagar_staging()
+            return
+
+        segundos_indices = destino.concluir(indices, linhas=total, linhas_csv=linhas_csv)
+        print(f"[Database] Sucesso total! {total} linhas inseridas.")
+        return _resultado(agora, linhas_csv, total, segundos_indices=round(segundos_indices, 3))
+
+    except Exception as e:
+        print(f"[Database] Erro: {e}")
+        destino.descartar()
+    finally:
+        destino.fechar()
+
+
+def _blocos_transformados(caminho_arquivo_csv, encoding, linhas_por_bloco, agora, contador, colunas_derivadas=True,
+                          coletor=None):
+    """
+    Gera os blocos do CSV já preparados e transformados.
+    Acumula em contador["linhas_csv"] as linhas lidas do CSV.
+    """
+    for bloco in _ler_blocos(caminho_arquivo_csv, encoding, linhas_por_bloco):
+        contador["linhas_csv"] += len(bloco)
+        df_transformado = transformar_produtos(preparar_dataframe(bloco), agora, colunas_derivadas)
+        if coletor:
+            coletor(df_transformado)
+        yield df_transformado
+
+
+def inserir_dados_produtos_paralelo(conexao, pool, caminho_arquivo_csv, workers,
+                                    linhas_por_bloco=LINHAS_POR_BLOCO_PADRAO, backend=BACKEND_PADRAO,
+                                    indices=INDICES_PADRAO, criar_staging=True, politica_geracoes=None,
+                                    derivadas_no_banco=False, coletor=None):
+    """
+    Carga paralela: o CSV é lido em blocos e cada bloco vai para um dos 'workers',
+    cada um com sua conexão do pool, inserindo na mesma tabela de staging.
+    A troca staging -> principal é feita no final, pela conexão principal.
+    """
+    if not conexao or not pool:
+        print("[Database] Inserção falhou: conexão ou pool nulo.")
+        return
+
+    agora = datetime.now()
+    destino = DestinoMariaDB(
+        backend=backend, conexao=conexao, politica_geracoes=politica_geracoes, derivadas_no_banco=derivadas_no_banco
+    )
+
+    try:
+        print(f"[Database] Lendo arquivo para carga paralela ({workers} workers): {caminho_arquivo_csv}")
+        encoding = _detectar_encoding(caminho_arquivo_csv)
+        destino.iniciar(criar_staging)
+        contador = {"linhas_csv": 0}
+        blocos = _blocos_transformados(
+            caminho_arquivo_csv, encoding, linhas_por_bloco, agora, contador, not derivadas_no_banco, coletor
+        )
+        with metricas.etapa("carga_paralela"):
+            total = carregar_em_paralelo(
+                pool, backend, destino.staging, blocos, workers, destino.colunas, destino.derivadas
+            )
+            metricas.anotar(linhas=total, bytes=os.path.getsize(caminho_arquivo_csv))
+
+        if not total:
+            print("[Database] Nenhum dado para inserir.")
+            destino.apagar_staging()
+            return
+
+        segundos_indices = destino.concluir(indices, linhas=total, linhas_csv=contador["linhas_csv"])
+        print(f"[Database] Sucesso total! {total} linhas inseridas.")
+        return _resultado(
+            agora, contador["linhas_csv"], total, workers=workers, segundos_indices=round(segundos_indices, 3)
+        )
+
+    except Exception as e:
+        print(f"[Database] Erro: {e}")
+        destino.descartar()
+    finally:
+        destino.fechar()
+
+
+def inserir_dados_produtos_checkpoint(conexao, caminho_arquivo_csv, sha256=None,
+                                      linhas_por_bloco=LINHAS_POR_BLOCO_PADRAO, backend=BACKEND_PADRAO,
+                                      indices=INDICES_PADRAO, politica_geracoes=None, derivadas_no_banco=False,
+                                      coletor=None):
+    """
+    Carga completa com checkpoint: cada bloco de 'linhas_por_bloco' linhas é
+    confirmado (commit) junto com o progresso na tabela de controle. Se a carga
+    cair no meio, a próxima execução com o mesmo arquivo (mesmo SHA-256)
+    continua a partir do último bloco confirmado. Antes da troca, a quantidade
+    de linhas da staging é conferida com o total carregado.
+    Numa retomada, os blocos já confirmados não passam pelo 'coletor'.
+    """
+    if not conexao:
+        print("[Database] Inserção falhou: conexão está nula.")
+        return
+
+    destino = DestinoMariaDB(
+        backend=backend, conexao=conexao, politica_geracoes=politica_geracoes, derivadas_no_banco=derivadas_no_banco
+    )
+
+    try:
+        if not sha256:
+            sha256, _ = manifesto.calcular_hash_arquivo(caminho_arquivo_csv)
+        destino.iniciar(criar_staging=False)
+        cursor = destino.cursor
+        checkpoint.criar_tabela_checkpoint(cursor)
+
+        estado = checkpoint.ler_checkpoint(cursor, sha256, destino.staging)
+        retomar = False
+        if estado and estado["linhas_por_bloco"] == linhas_por_bloco and checkpoint.tabela_existe(cursor, destino.staging):
+            linhas_staging = checkpoint.contar_linhas(cursor, destino.staging)
+            if linhas_staging == estado["linhas_confirmadas"]:
+                retomar = True
+            else:
+                print(
+                    f"[Database] Aviso: checkpoint indica {estado['linhas_confirmadas']} linhas, mas a staging tem "
+                    f"{linhas_staging}. Recomeçando a carga do zero."
+                )
+
+        if retomar:
+            agora = estado["data_insercao"]
+            blocos = estado["blocos_confirmados"]
+            linhas_csv = estado["linhas_csv_confirmadas"]
+            total = estado["linhas_confirmadas"]
+            print(f"[Database] Retomando carga a partir do bloco {blocos + 1} ({linhas_csv} linhas do CSV já carregadas).")
+        else:
+            agora = datetime.now().replace(microsecond=0)
+            blocos = linhas_csv = total = 0
+            checkpoint.apagar_checkpoint(cursor, destino.staging)
+            destino.criar_staging()
+            conexao.commit()
+
+        print(f"[Database] Carga com checkpoint ({linhas_por_bloco} linhas por bloco): {caminho_arquivo_csv}")
+        encoding = _detectar_encoding(caminho_arquivo_csv)
+
+        with metricas.etapa("carga_checkpoint"):
+            for bloco in _ler_blocos(caminho_arquivo_csv, encoding, linhas_por_bloco, pular_linhas=linhas_csv):
+                df_transformado = transformar_produtos(preparar_dataframe(bloco), agora, not derivadas_no_banco)
+                if coletor:
+                    coletor(df_transformado)
+                total += destino.escrever(df_transformado)
+                linhas_csv += len(bloco)
+                blocos += 1
+                checkpoint.salvar_checkpoint(
+                    cursor, sha256, destino.staging, linhas_por_bloco, blocos, linhas_csv, total, agora
+                )
+                conexao.commit()
+                print(f"[Database] Checkpoint: bloco {blocos} confirmado ({total} linhas até agora)")
+            metricas.anotar(linhas=total)
+
+        if not total:
             print("[Database] Nenhum dado para inserir.")
+            destino.apagar_staging()
+            checkpoint.apagar_checkpoint(cursor, destino.staging)
+            conexao.commit()
             return
 
+        # Conferência final antes da troca
+        linhas_staging = checkpoint.contar_linhas(cursor, destino.staging)
+        if linhas_staging != total:
+            raise Exception(
+                f"Conferência falhou: a staging tem {linhas_staging} linhas, mas foram carregadas {total}."
+            )
+        print(f"[Database] Conferência OK: {linhas_staging} linhas na staging.")
+
+        segundos_indices = destino.concluir(indices, linhas=linhas_staging, linhas_csv=linhas_csv)
+        checkpoint.apagar_checkpoint(cursor, destino.staging)
+        conexao.commit()
+        print(f"[Database] Sucesso total! {total} linhas inseridas.")
+        return _resultado(
+            agora, linhas_csv, total, retomada=retomar, segundos_indices=round(segundos_indices, 3)
+        )
+
+    except Exception as e:
+        print(f"[Database] Erro: {e}")
+        print("[Database] Os blocos já confirmados foram mantidos. Execute novamente para retomar a carga.")
+        destino.descartar()
+    finally:
+        destino.fechar()
+
+
+def inserir_dados_produtos_incremental(conexao, caminho_arquivo_csv, backend=BACKEND_PADRAO, indices=INDICES_PADRAO,
+                                       coletor=None):
+    """
+    Carga incremental: aplica em 'bronze_plugpharma_produtos' apenas o delta
+    (inseridos, atualizados e removidos) em vez de recriar a tabela inteira.
+    Retorna as estatísticas da carga, com as contagens por categoria.
+    """
+    if not conexao:
+        print("[Database] Inserção falhou: conexão está nula.")
+        return
+
+    agora = datetime.now()
+    cursor = None
+
+    try:
+        df_transformado, linhas_csv = _ler_e_transformar(caminho_arquivo_csv, agora)
+        if coletor:
+            coletor(df_transformado)
+        df_transformado[incremental.COLUNA_HASH] = incremental.calcular_hash_conteudo(df_transformado)
+
         cursor = conexao.cursor()
-        cursor.execute(f"DROP TABLE IF EXISTS {TABELA_STAGING}")
-
-        create_query = f"""
-        CREATE TABLE {TABELA_STAGING} (
-            codigo_interno VARCHAR(14), codigo_barras VARCHAR(14),
-            codigo_barras_normalizado VARCHAR(14), codigo_principal TINYINT,
-            descricao VARCHAR(255), apresentacao VARCHAR(255), produto VARCHAR(255), status VARCHAR(20),
-            codigo_fabricante VARCHAR(50), fabricante TEXT, cnpj_fabricante VARCHAR(20),
-            codigo_tipo_produto VARCHAR(50), tipo_produto VARCHAR(255),
-            codigo_grupo_principal VARCHAR(50), grupo_principal VARCHAR(255),
-            ncm VARCHAR(20), ncm_descricao TEXT, preco_controlado VARCHAR(10),
-            codigo_ms VARCHAR(255), portaria TEXT, forma_apresentacao TEXT,
-            codigo_unidade_medida VARCHAR(50), fracao VARCHAR(50), substancia_nome TEXT,
-            concentracao TEXT, farmacologico TEXT, data_cadastro DATETIME,
-            ultima_alteracao DATETIME, associado TEXT,
-            data_insercao DATETIME,
-            INDEX idx_produto (produto),
-            INDEX idx_cod_barras_norm (codigo_barras_normalizado),
-            INDEX idx_cod_interno (codigo_interno)
-        ) CHARSET=utf8mb4;
-        """
-        cursor.execute(create_query)
-
-        colunas_sql = ", ".join(COLUNAS_DB_TODAS)
-        placeholders = ", ".join(["?"] * 30)
-        query = f"INSERT INTO {TABELA_STAGING} ({colunas_sql}) VALUES ({placeholders})"
-
-        for i in range(0, len(data_to_insert), CHUNK_SIZE):
-            batch = data_to_insert[i:i + CHUNK_SIZE]
-            cursor.executemany(query, batch)
-            print(f"[Database] Inserido lote {(i//CHUNK_SIZE)+1}")
-
-        cursor.execute(f"DROP TABLE IF EXISTS {TABELA_PRINCIPAL}")
-        cursor.execute(f"RENAME TABLE {TABELA_STAGING} TO {TABELA_PRINCIPAL}")
+        cursor.execute(f"SHOW TABLES LIKE '{TABELA_PRINCIPAL}'")
+        if not cursor.fetchall():
+            print(f"[Database] Tabela {TABELA_PRINCIPAL} não existe. Criando para a primeira carga incremental...")
+            criar_tabela(cursor, TABELA_PRINCIPAL, indices)
+        cursor.execute(
+            f"ALTER TABLE {TABELA_PRINCIPAL} ADD COLUMN IF NOT EXISTS {incremental.COLUNA_HASH} BIGINT UNSIGNED"
+        )
+
+        print("[Database] Calculando delta contra a tabela atual...")
+        with metricas.etapa("delta"):
+            atual = incremental.ler_estado_atual(cursor, TABELA_PRINCIPAL)
+            para_inserir, para_remover, contagens = incremental.calcular_delta(df_transformado, atual)
+            metricas.anotar(linhas=len(df_transformado))
+        print(
+            f"[Database] Delta: {contagens['inseridos']} inseridos, {contagens['atualizados']} atualizados, "
+            f"{contagens['removidos']} removidos, {contagens['inalterados']} inalterados"
+        )
+
+        with metricas.etapa("insercao"):
+            if para_remover:
+                incremental.remover_chaves(cursor, TABELA_PRINCIPAL, para_remover)
+            if not para_inserir.empty:
+                carregador = criar_carregador(backend, cursor, TABELA_PRINCIPAL, incremental.COLUNAS_INCREMENTAL)
+                carregador.carregar(carregador.preparar(para_inserir))
+            metricas.anotar(linhas=len(para_inserir))
+
         conexao.commit()
-        print("[Database] Sucesso total!")
+        print("[Database] Sucesso total (incremental)!")
+        return _resultado(agora, linhas_csv, len(para_inserir), **contagens)
 
     except Exception as e:
         print(f"[Database] Erro: {e}")
@@ -191,22 +564,278 @@ def inserir_dados_produtos(conexao, caminho_arquivo_csv):
         if cursor: cursor.close()
 
 
-# --- Função 'processar_csv_para_db' (sem alterações) ---
-def processar_csv_para_db(caminho_arquivo_csv_a_processar):
-    print(f"--- Executando 'database.py' (processar_csv_para_db) para o arquivo: {os.path.basename(caminho_arquivo_csv_a_processar)} ---")
+def inserir_dados_produtos_destino(destino, caminho_arquivo_csv, linhas_por_bloco=LINHAS_POR_BLOCO_PADRAO,
+                                   indices=INDICES_PADRAO):
+    """
+    Carga completa em um destino de destinos.py (SQLite, DuckDB, Parquet ou
+    MariaDB): lê o arquivo em blocos, transforma e entrega cada bloco ao
+    destino, que só publica o resultado depois do último bloco.
+    Retorna as estatísticas da carga, ou None se ela falhar.
+    """
+    agora = datetime.now()
+    try:
+        print(f"[Database] Carregando no destino '{destino.nome}' ({destino.local}): {caminho_arquivo_csv}")
+        encoding = _detectar_encoding(caminho_arquivo_csv)
+        destino.iniciar()
+        linhas_csv = 0
+        total = 0
+        with metricas.etapa("carga_destino"):
+            for bloco in _ler_blocos(caminho_arquivo_csv, encoding, linhas_por_bloco):
+                linhas_csv += len(bloco)
+                total += destino.escrever(transformar_produtos(preparar_dataframe(bloco), agora))
+                print(f"[Database] Bloco gravado ({total} linhas até agora)")
+            metricas.anotar(linhas=total, bytes=os.path.getsize(caminho_arquivo_csv))
+
+        if not total:
+            print("[Database] Nenhum dado para inserir.")
+            destino.descartar()
+            return
+
+        destino.concluir(indices)
+        print(f"[Database] Sucesso total! {total} linhas gravadas em {destino.local}.")
+        return _resultado(agora, linhas_csv, total)
+
+    except Exception as e:
+        print(f"[Database] Erro: {e}")
+        destino.descartar()
+    finally:
+        destino.fechar()
+
+
+def processar_em_destino_local(caminho_arquivo_csv, carga_cfg):
+    """
+    Carga no destino local de 'carga.destino' (sqlite, duckdb ou parquet),
+    sem servidor: dry-run da carga e medição da transformação e da escrita.
+    Retorna as estatísticas da carga; levanta exceção se ela falhar.
+    """
+    nome_destino = carga_cfg["destino"]
+    ignoradas = [
+        opcao for opcao in ("streaming", "checkpoint", "silver", "derivadas_no_banco") if carga_cfg.get(opcao, False)
+    ]
+    if carga_cfg.get("modo", "completo") == "incremental":
+        ignoradas.append("modo incremental")
+    if int(carga_cfg.get("workers", 1)) > 1:
+        ignoradas.append("workers")
+    if ignoradas:
+        print(f"[DB] Aviso: o destino '{nome_destino}' usa sempre a carga completa em blocos. Ignorando: {', '.join(ignoradas)}.")
+
+    destino = criar_destino(nome_destino, carga_cfg.get("destino_caminho") or None)
+    resultado = inserir_dados_produtos_destino(
+        destino, caminho_arquivo_csv,
+        int(carga_cfg.get("linhas_por_bloco", LINHAS_POR_BLOCO_PADRAO)),
+        validar_indices(carga_cfg.get("indices", INDICES_PADRAO))
+    )
+    if resultado is None:
+        raise Exception("A carga não foi concluída (veja os erros acima).")
+    resultado["modo"] = "completo"
+    resultado["destino"] = nome_destino
+    resultado["tabela"] = destino.local
+    print("[DB] Processo de carga finalizado.")
+    return resultado
+
+
+def inserir_dados_produtos_multibase(conexao, arquivos_por_base, backend=BACKEND_PADRAO, indices=INDICES_PADRAO,
+                                     politica_geracoes=None, derivadas_no_banco=False):
+    """
+    Carga completa de várias bases do PlugPharma na mesma tabela, com a
+    coluna 'base' identificando a origem de cada linha. 'arquivos_por_base'
+    é um dicionário {nome da base: caminho do CSV}. Os arquivos são lidos e
+    inseridos um de cada vez na staging, que só é trocada pela tabela
+    principal quando todas as bases foram carregadas.
+    Retorna as estatísticas da carga (com o detalhe por base), ou None se ela falhar.
+    """
+    if not conexao:
+        print("[Database] Inserção falhou: conexão está nula.")
+        return
+
+    agora = datetime.now()
+    destino = DestinoMariaDB(
+        backend=backend, conexao=conexao, politica_geracoes=politica_geracoes, derivadas_no_banco=derivadas_no_banco,
+        coluna_base=True
+    )
+
+    try:
+        destino.iniciar()
+
+        por_base = {}
+        for nome_base, caminho_arquivo_csv in arquivos_por_base.items():
+            print(f"[Database] Base '{nome_base}':")
+            df_transformado, linhas_csv = _ler_e_transformar(caminho_arquivo_csv, agora, not derivadas_no_banco)
+            df_transformado.insert(0, COLUNA_BASE, nome_base)
+            with metricas.etapa("insercao"):
+                inseridas = destino.escrever(df_transformado) if len(df_transformado) else 0
+                metricas.anotar(linhas=inseridas)
+            por_base[nome_base] = {"linhas_csv": linhas_csv, "linhas_inseridas": inseridas}
+            print(f"[Database] Base '{nome_base}': {inseridas} linhas inseridas.")
+            del df_transformado
+
+        total = sum(b["linhas_inseridas"] for b in por_base.values())
+        linhas_csv = sum(b["linhas_csv"] for b in por_base.values())
+        if not total:
+            print("[Database] Nenhum dado para inserir.")
+            destino.apagar_staging()
+            return
+
+        segundos_indices = destino.concluir(indices, linhas=total, linhas_csv=linhas_csv)
+        print(f"[Database] Sucesso total! {total} linhas de {len(por_base)} bases inseridas.")
+        return _resultado(
+            agora, linhas_csv, total,
+            segundos_indices=round(segundos_indices, 3), bases=por_base
+        )
+
+    except Exception as e:
+        print(f"[Database] Erro: {e}")
+        destino.descartar()
+    finally:
+        destino.fechar()
+
+
+def processar_multibase_para_db(arquivos_por_base):
+    """
+    Conecta ao banco e carrega os CSVs de todas as bases (modo multi-base) na
+    tabela principal, marcados com a coluna 'base'. Usa 'backend' e 'indices'
+    da seção 'carga' do config.json; o modo é sempre a carga completa.
+    Retorna as estatísticas da carga; levanta exceção se ela falhar.
+    """
+    print(f"--- Executando 'database.py' (processar_multibase_para_db) para {len(arquivos_por_base)} bases ---")
     config = carregar_config()
+    if config.get("carga", {}).get("destino", DESTINO_PADRAO) != DESTINO_PADRAO:
+        print("[DB] Aviso: o modo multi-base só carrega no MariaDB. Ignorando 'carga.destino'.")
     db_cfg = config.get("dbDrogamais")
     if not db_cfg:
         print("[DB] Erro: Configuração 'dbDrogamais' não encontrada no config.json")
         raise Exception("Configuração 'dbDrogamais' não encontrada no config.json")
+    carga_cfg = config.get("carga", {})
+    backend = carga_cfg.get("backend", BACKEND_PADRAO)
+    indices = dict(validar_indices(carga_cfg.get("indices", INDICES_PADRAO), coluna_base=True))
+    politica_geracoes = geracoes.politica(config.get("geracoes"))
+    for nome, colunas in INDICE_BASE.items():
+        indices.setdefault(nome, colunas)
 
+    ignoradas = [opcao for opcao in ("streaming", "checkpoint", "silver") if carga_cfg.get(opcao, False)]
+    if carga_cfg.get("modo", "completo") == "incremental":
+        ignoradas.append("modo incremental")
+    if int(carga_cfg.get("workers", 1)) > 1:
+        ignoradas.append("workers")
+    if ignoradas:
+        print(f"[DB] Aviso: o modo multi-base usa sempre a carga completa simples. Ignorando: {', '.join(ignoradas)}.")
+
+    conexao = conectar_db(db_cfg, local_infile=(backend == "load_data"))
+    if not conexao:
+        print("[DB] Conexão com o banco falhou. Processo abortado.")
+        raise Exception("Conexão com o banco de dados falhou.")
+    try:
+        print(f"[DB] Conexão bem-sucedida. Iniciando inserção multi-base (backend '{backend}')...")
+        resultado = inserir_dados_produtos_multibase(
+            conexao, arquivos_por_base, backend, indices, politica_geracoes, carga_cfg.get("derivadas_no_banco", False)
+        )
+        if resultado is None:
+            raise Exception("A carga não foi concluída (veja os erros acima).")
+        resultado["modo"] = "multibase"
+        resultado["tabela"] = TABELA_PRINCIPAL
+        print("[DB] Processo de inserção finalizado.")
+        return resultado
+    finally:
+        conexao.close()
+        print("[DB] Conexão fechada.")
+
+
+def processar_csv_para_db(caminho_arquivo_csv_a_processar, sha256=None, preparacao=None, coletor_indice=None):
+    """
+    Conecta ao banco e carrega o CSV conforme a seção 'carga' do config.json.
+    'sha256' (opcional) evita recalcular o hash do arquivo na carga com checkpoint.
+    'preparacao' (opcional, ver preparacao_db.py) traz a conexão, o pool e a
+    staging já preparados durante a exportação.
+    'coletor_indice' (opcional, ver indice_barras.ColetorIndice) recebe cada
+    bloco transformado pela carga no MariaDB.
+    Retorna as estatísticas da carga; levanta exceção se ela falhar.
+    """
+    print(f"--- Executando 'database.py' (processar_csv_para_db) para o arquivo: {os.path.basename(caminho_arquivo_csv_a_processar)} ---")
+    config = carregar_config()
+    if config.get("carga", {}).get("destino", DESTINO_PADRAO) != DESTINO_PADRAO:
+        if preparacao:
+            preparacao.fechar()
+        return processar_em_destino_local(caminho_arquivo_csv_a_processar, config["carga"])
+    db_cfg = config.get("dbDrogamais")
+    if not db_cfg:
+        print("[DB] Erro: Configuração 'dbDrogamais' não encontrada no config.json")
+        if preparacao:
+            preparacao.fechar()
+        raise Exception("Configuração 'dbDrogamais' não encontrada no config.json")
     conexao = None
+    pool = None
+    staging_pronta = False
     try:
-        conexao = conectar_db(db_cfg)
+        carga_cfg = config.get("carga", {})
+        backend = carga_cfg.get("backend", BACKEND_PADRAO)
+        linhas_por_bloco = int(carga_cfg.get("linhas_por_bloco", LINHAS_POR_BLOCO_PADRAO))
+        workers = int(carga_cfg.get("workers", 1))
+        indices = validar_indices(carga_cfg.get("indices", INDICES_PADRAO))
+        gerar_silver = carga_cfg.get("silver", False)
+        derivadas_no_banco = carga_cfg.get("derivadas_no_banco", False)
+        politica_geracoes = geracoes.politica(config.get("geracoes"))
+        local_infile = (backend == "load_data")
+
+        if preparacao and preparacao.aguardar():
+            conexao, pool, staging_pronta = preparacao.entregar()
+            if conexao:
+                print("[DB] Usando a conexão preparada durante a exportação.")
+        if not conexao:
+            conexao = conectar_db(db_cfg, local_infile=local_infile)
         if conexao:
-            print("[DB] Conexão bem-sucedida. Iniciando inserção...")
-            inserir_dados_produtos(conexao, caminho_arquivo_csv_a_processar)
+            print(f"[DB] Conexão bem-sucedida. Iniciando inserção (backend '{backend}')...")
+            modo = carga_cfg.get("modo", "completo")
+            usar_checkpoint = carga_cfg.get("checkpoint", False)
+            if gerar_silver and (modo == "incremental" or usar_checkpoint or workers > 1
+                                 or carga_cfg.get("streaming", False)):
+                print("[DB] Aviso: a camada silver só é gerada na carga completa simples "
+                      "(sem streaming, checkpoint ou workers). Ignorando 'silver'.")
+            elif gerar_silver and derivadas_no_banco:
+                print("[DB] Aviso: a camada silver precisa das colunas derivadas montadas no Python. "
+                      "Ignorando 'derivadas_no_banco'.")
+                derivadas_no_banco = False
+            if derivadas_no_banco and modo == "incremental":
+                print("[DB] Aviso: o modo incremental compara as colunas derivadas no Python. "
+                      "Ignorando 'derivadas_no_banco'.")
+            elif derivadas_no_banco:
+                print("[DB] Colunas derivadas (codigo_barras_normalizado, produto) calculadas pelo MariaDB.")
+            if modo == "incremental":
+                resultado = inserir_dados_produtos_incremental(
+                    conexao, caminho_arquivo_csv_a_processar, backend, indices, coletor=coletor_indice
+                )
+            elif usar_checkpoint:
+                resultado = inserir_dados_produtos_checkpoint(
+                    conexao, caminho_arquivo_csv_a_processar, sha256, linhas_por_bloco, backend, indices,
+                    politica_geracoes, derivadas_no_banco, coletor=coletor_indice
+                )
+            elif workers > 1:
+                pool = pool or criar_pool_db(db_cfg, workers, local_infile=local_infile)
+                if not pool:
+                    raise Exception("Não foi possível criar o pool de conexões.")
+                resultado = inserir_dados_produtos_paralelo(
+                    conexao, pool, caminho_arquivo_csv_a_processar, workers, linhas_por_bloco, backend, indices,
+                    criar_staging=not staging_pronta, politica_geracoes=politica_geracoes,
+                    derivadas_no_banco=derivadas_no_banco, coletor=coletor_indice
+                )
+            elif carga_cfg.get("streaming", False):
+                resultado = inserir_dados_produtos_streaming(
+                    conexao, caminho_arquivo_csv_a_processar, linhas_por_bloco, backend, indices,
+                    criar_staging=not staging_pronta, politica_geracoes=politica_geracoes,
+                    derivadas_no_banco=derivadas_no_banco, coletor=coletor_indice
+                )
+            else:
+                resultado = inserir_dados_produtos(
+                    conexao, caminho_arquivo_csv_a_processar, backend, indices, gerar_silver,
+                    criar_staging=not staging_pronta, politica_geracoes=politica_geracoes,
+                    derivadas_no_banco=derivadas_no_banco, coletor=coletor_indice
+                )
+
+            if resultado is None:
+                raise Exception("A carga não foi concluída (veja os erros acima).")
+            resultado["modo"] = modo
+            resultado["tabela"] = TABELA_PRINCIPAL
             print("[DB] Processo de inserção finalizado.")
+            return resultado
         else:
             print("[DB] Conexão com o banco falhou. Processo abortado.")
             raise Exception("Conexão com o banco de dados falhou.")
@@ -215,11 +844,44 @@ def processar_csv_para_db(caminho_arquivo_csv_a_processar):
         # Re-levanta a exceção para que o run.py possa capturá-la e sair com erro
         raise e
     finally:
+        if preparacao:
+            # Libera o que a preparação abriu e não entregou (falhou, não terminou ou a carga parou antes)
+            preparacao.fechar()
+        if pool:
+            pool.close()
         if conexao:
             conexao.close()
             print("[DB] Conexão fechada.")
 
 
+def reverter_geracao():
+    """
+    Restaura a geração anterior da tabela principal (rollback de uma carga
+    ruim), sem ler nenhum arquivo. Retorna quantas gerações anteriores ainda
+    restam; levanta exceção se não houver geração para restaurar.
+    """
+    print(f"--- Executando 'database.py' (reverter_geracao) para {TABELA_PRINCIPAL} ---")
+    db_cfg = carregar_config().get("dbDrogamais")
+    if not db_cfg:
+        print("[DB] Erro: Configuração 'dbDrogamais' não encontrada no config.json")
+        raise Exception("Configuração 'dbDrogamais' não encontrada no config.json")
+    conexao = conectar_db(db_cfg)
+    if not conexao:
+        raise Exception("Conexão com o banco de dados falhou.")
+    cursor = conexao.cursor()
+    try:
+        with metricas.etapa("reversao"):
+            # A silver volta junto, no mesmo RENAME TABLE, para as camadas continuarem da mesma carga
+            tabelas_silver = silver.tabelas_para_reverter(cursor, TABELA_PRINCIPAL)
+            restantes = geracoes.reverter(cursor, TABELA_PRINCIPAL, tabelas_silver)
+        conexao.commit()
+        return restantes
+    finally:
+        cursor.close()
+        conexao.close()
+        print("[DB] Conexão fechada.")
+
+
 # --- Bloco de Execução Independente (ajustado para teste) ---
 if __name__ == "__main__":
     print("--- Executando 'database.py' em modo de teste direto ---")
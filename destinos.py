@@ -0,0 +1,290 @@
+# destinos.py
+
+import os
+import sqlite3
+import pandas as pd
+from carregadores import BACKEND_PADRAO, COLUNAS_DATETIME, criar_carregador
+from tabelas import (
+    COLUNA_BASE, PADRAO_COLUNA_INDICE, SUFIXO_STAGING, TABELA_PRINCIPAL, criar_indices, criar_tabela_staging,
+    promover_staging
+)
+from transformacao import COLUNAS_DB_ORIGEM, COLUNAS_DB_TODAS, EXPRESSOES_DERIVADAS_SQL, linhas_para_insercao
+
+# Destinos da carga completa. Todos seguem a mesma sequência:
+#   iniciar() -> escrever(bloco) ... -> concluir(indices) -> fechar()
+# e só publicam o resultado em 'concluir'; 'descartar' desfaz o que foi escrito.
+PASTA_DESTINOS_PADRAO = "destinos"
+
+
+def _colunas_indice(colunas):
+    # Prefixos como "fabricante(50)" são só do MariaDB
+    return [PADRAO_COLUNA_INDICE.match(coluna).group(1) for coluna in colunas]
+
+
+class DestinoMariaDB:
+    """
+    O banco de produção: staging sem índices, carregada pelo backend da
+    seção 'carga' (executemany ou load_data), índices em um único ALTER
+    TABLE e troca pela tabela principal, guardando a anterior como geração
+    (ver geracoes.py). É o caminho de todas as cargas completas de
+    database.py. Com 'conexao', usa a conexão de quem chama e não a fecha.
+    'derivadas_no_banco' envia só as colunas de origem e o MariaDB calcula
+    as derivadas; 'coluna_base' acrescenta a coluna 'base' (multi-base).
+    """
+    nome = "mariadb"
+
+    def __init__(self, db_config=None, backend=BACKEND_PADRAO, tabela=TABELA_PRINCIPAL, conexao=None,
+                 politica_geracoes=None, derivadas_no_banco=False, coluna_base=False):
+        self.db_config = db_config
+        self.backend = backend
+        self.politica_geracoes = politica_geracoes
+        self.tabela = tabela
+        self.staging = tabela + SUFIXO_STAGING
+        self.coluna_base = coluna_base
+        self.colunas = ([COLUNA_BASE] if coluna_base else []) + (
+            COLUNAS_DB_ORIGEM if derivadas_no_banco else COLUNAS_DB_TODAS
+        )
+        self.derivadas = EXPRESSOES_DERIVADAS_SQL if derivadas_no_banco else None
+        self.conexao = conexao
+        self.conexao_propria = conexao is None
+        self.cursor = None
+        self.carregador = None
+
+    @property
+    def local(self):
+        return self.tabela
+
+    def iniciar(self, criar_staging=True):
+        """
+        'criar_staging=False' usa a staging que já existe (preparada antes ou
+        retomada de um checkpoint).
+        """
+        if not self.conexao:
+            # Importado aqui: database.py importa este módulo
+            from database import conectar_db
+            self.conexao = conectar_db(self.db_config, local_infile=(self.backend == "load_data"))
+            if not self.conexao:
+                raise Exception("Conexão com o banco de dados falhou.")
+        self.cursor = self.conexao.cursor()
+        if criar_staging:
+            self.criar_staging()
+        self.carregador = criar_carregador(self.backend, self.cursor, self.staging, self.colunas, self.derivadas)
+
+    def criar_staging(self):
+        criar_tabela_staging(self.cursor, self.staging, self.coluna_base)
+
+    def apagar_staging(self):
+        self.cursor.execute(f"DROP TABLE IF EXISTS {self.staging}")
+
+    def escrever(self, df_transformado):
+        return self.carregador.carregar(self.carregador.preparar(df_transformado))
+
+    def concluir(self, indices, linhas=None, acompanhantes=(), linhas_csv=None):
+        """
+        Cria os índices, verifica e promove a staging e confirma. 'linhas' é o
+        total carregado, se já conhecido, e 'linhas_csv' os produtos lidos do
+        arquivo; 'acompanhantes' são publicadas no mesmo RENAME TABLE.
+        Retorna os segundos gastos nos índices.
+        """
+        segundos_indices = criar_indices(self.cursor, self.staging, indices)
+        promover_staging(
+            self.cursor, self.tabela, self.staging, self.politica_geracoes, linhas, acompanhantes, linhas_csv,
+            self.coluna_base
+        )
+        self.conexao.commit()
+        return segundos_indices
+
+    def descartar(self):
+        if self.conexao:
+            self.conexao.rollback()
+
+    def fechar(self):
+        if self.cursor:
+            self.cursor.close()
+        self.cursor = None
+        if self.conexao and self.conexao_propria:
+            self.conexao.close()
+            self.conexao = None
+
+
+class DestinoSQLite:
+    """
+    Banco SQLite em um arquivo local (ou ':memory:'), sem servidor. Toda a
+    carga roda em uma única transação: a tabela antiga continua visível até
+    o 'concluir', que troca as tabelas e cria os índices de uma vez.
+    """
+    nome = "sqlite"
+    extensao = "sqlite"
+
+    def __init__(self, caminho, tabela=TABELA_PRINCIPAL):
+        self.caminho = caminho
+        self.tabela = tabela
+        self.staging = tabela + SUFIXO_STAGING
+        self.conexao = None
+        self.query = (
+            f"INSERT INTO {self.staging} ({', '.join(COLUNAS_DB_TODAS)}) "
+            f"VALUES ({', '.join(['?'] * len(COLUNAS_DB_TODAS))})"
+        )
+
+    @property
+    def local(self):
+        return f"{self.caminho}:{self.tabela}"
+
+    def _tipo(self, coluna):
+        return "INTEGER" if coluna == "codigo_principal" else "TEXT"
+
+    def _conectar(self):
+        # Datas vão como texto ISO ("AAAA-MM-DD HH:MM:SS"); NaT vira NULL
+        sqlite3.register_adapter(pd.Timestamp, lambda valor: valor.isoformat(sep=" "))
+        sqlite3.register_adapter(type(pd.NaT), lambda valor: None)
+        return sqlite3.connect(self.caminho, isolation_level=None)
+
+    def iniciar(self):
+        if self.caminho != ":memory:":
+            os.makedirs(os.path.dirname(self.caminho) or ".", exist_ok=True)
+        self.conexao = self._conectar()
+        self.conexao.execute("BEGIN")
+        self.conexao.execute(f"DROP TABLE IF EXISTS {self.staging}")
+        definicoes = ", ".join(f"{c} {self._tipo(c)}" for c in COLUNAS_DB_TODAS)
+        self.conexao.execute(f"CREATE TABLE {self.staging} ({definicoes})")
+
+    def escrever(self, df_transformado):
+        linhas = linhas_para_insercao(df_transformado)
+        self.conexao.executemany(self.query, linhas)
+        return len(linhas)
+
+    def concluir(self, indices):
+        # Nomes de índice são globais no SQLite: a tabela antiga (e os índices dela)
+        # sai antes, e os índices são criados já na tabela final
+        self.conexao.execute(f"DROP TABLE IF EXISTS {self.tabela}")
+        self.conexao.execute(f"ALTER TABLE {self.staging} RENAME TO {self.tabela}")
+        for nome, colunas in indices.items():
+            self.conexao.execute(f"CREATE INDEX {nome} ON {self.tabela} ({', '.join(_colunas_indice(colunas))})")
+        self.conexao.execute("COMMIT")
+
+    def descartar(self):
+        if self.conexao and self.conexao.in_transaction:
+            self.conexao.execute("ROLLBACK")
+
+    def fechar(self):
+        if self.conexao:
+            self.conexao.close()
+            self.conexao = None
+
+
+class DestinoDuckDB(DestinoSQLite):
+    """
+    Banco DuckDB em um arquivo local (colunar, bom para análise). Cada bloco
+    entra com um INSERT ... SELECT direto do DataFrame, sem montar tuplas.
+    Requer o pacote 'duckdb'.
+    """
+    nome = "duckdb"
+    extensao = "duckdb"
+
+    def _tipo(self, coluna):
+        if coluna == "codigo_principal":
+            return "TINYINT"
+        return "TIMESTAMP" if coluna in COLUNAS_DATETIME else "VARCHAR"
+
+    def _conectar(self):
+        try:
+            import duckdb
+        except ImportError:
+            raise ImportError("O pacote 'duckdb' é necessário para o destino 'duckdb' (pip install duckdb).")
+        return duckdb.connect(self.caminho)
+
+    def escrever(self, df_transformado):
+        self.conexao.register("bloco_pp", df_transformado[COLUNAS_DB_TODAS])
+        try:
+            self.conexao.execute(f"INSERT INTO {self.staging} SELECT * FROM bloco_pp")
+        finally:
+            self.conexao.unregister("bloco_pp")
+        return len(df_transformado)
+
+    def descartar(self):
+        if self.conexao:
+            try:
+                self.conexao.execute("ROLLBACK")
+            except Exception:
+                pass
+
+
+class DestinoParquet:
+    """
+    Arquivo Parquet (zstd) com as colunas da tabela, gravado bloco a bloco em
+    um temporário e trocado de uma vez no 'concluir'. Não tem índices.
+    Requer o pacote 'pyarrow'.
+    """
+    nome = "parquet"
+    extensao = "parquet"
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.temporario = f"{caminho}.tmp"
+        self.escritor = None
+        self.esquema = None
+
+    @property
+    def local(self):
+        return self.caminho
+
+    def iniciar(self):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("O pacote 'pyarrow' é necessário para o destino 'parquet' (pip install pyarrow).")
+        self._pa = pa
+        self.esquema = pa.schema([
+            pa.field(c, pa.int8() if c == "codigo_principal"
+                     else pa.timestamp("us") if c in COLUNAS_DATETIME else pa.string())
+            for c in COLUNAS_DB_TODAS
+        ])
+        os.makedirs(os.path.dirname(self.caminho) or ".", exist_ok=True)
+        self.escritor = pq.ParquetWriter(self.temporario, self.esquema, compression="zstd")
+
+    def escrever(self, df_transformado):
+        tabela = self._pa.Table.from_pandas(df_transformado[COLUNAS_DB_TODAS], preserve_index=False)
+        self.escritor.write_table(tabela.cast(self.esquema))
+        return len(df_transformado)
+
+    def concluir(self, indices):
+        if indices:
+            print(f"[Database] Aviso: o destino 'parquet' não tem índices. Ignorando: {', '.join(indices)}.")
+        self.escritor.close()
+        self.escritor = None
+        os.replace(self.temporario, self.caminho)
+
+    def descartar(self):
+        if self.escritor:
+            self.escritor.close()
+            self.escritor = None
+        if os.path.exists(self.temporario):
+            os.remove(self.temporario)
+
+    def fechar(self):
+        self.descartar()
+
+
+DESTINOS = {
+    DestinoMariaDB.nome: DestinoMariaDB,
+    DestinoSQLite.nome: DestinoSQLite,
+    DestinoDuckDB.nome: DestinoDuckDB,
+    DestinoParquet.nome: DestinoParquet,
+}
+
+
+def criar_destino(nome, caminho=None, db_config=None, backend=BACKEND_PADRAO, tabela=TABELA_PRINCIPAL,
+                  politica_geracoes=None):
+    """
+    Cria o destino 'nome'. Os destinos locais gravam em 'caminho' (padrão:
+    'destinos/<tabela>.<extensão>'); o MariaDB usa 'db_config', 'backend' e
+    'politica_geracoes'.
+    """
+    if nome not in DESTINOS:
+        raise ValueError(f"Destino de carga desconhecido: '{nome}'. Opções: {', '.join(DESTINOS)}")
+    if nome == DestinoMariaDB.nome:
+        return DestinoMariaDB(db_config, backend, tabela, politica_geracoes=politica_geracoes)
+    classe = DESTINOS[nome]
+    caminho = caminho or os.path.join(PASTA_DESTINOS_PADRAO, f"{tabela}.{classe.extensao}")
+    return classe(caminho) if classe is DestinoParquet else classe(caminho, tabela)
@@ -0,0 +1,237 @@
+# download_http.py
+
+import json
+import os
+import re
+import time
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+
+TAMANHO_BLOCO = 1024 * 1024
+TENTATIVAS_PADRAO = 5
+EVENTOS_DOWNLOAD = ("Page.downloadWillBegin", "Browser.downloadWillBegin")
+EVENTOS_PROGRESSO_DOWNLOAD = ("Page.downloadProgress", "Browser.downloadProgress")
+PADRAO_URL_EXPORTACAO = r"export"
+# Os eventos ficam guardados no log 'performance' do chromedriver até serem lidos:
+# ler a cada 2 s não perde nenhum, só atrasa a detecção, e faz menos chamadas ao
+# WebDriver que a espera antiga pela barra de progresso (uma consulta ao DOM a cada 0,5 s)
+INTERVALO_EVENTOS = 2.0
+
+
+class ColetorEventosCDP:
+    """
+    Lê os eventos do DevTools que o chromedriver guarda no log 'performance'
+    (exige a capability goog:loggingPrefs = {"performance": "ALL"}).
+    Guarda apenas o necessário: o último cabeçalho Authorization visto por
+    host, o evento de início de download e, depois de 'marcar_exportacao',
+    o andamento das requisições de exportação (URL casando com
+    'padrao_exportacao'), usadas só para detectar falhas.
+    Não há assinatura de eventos: o log é lido a cada 'intervalo' segundos
+    (uma chamada ao WebDriver por leitura, que traz tudo o que chegou).
+    """
+
+    def __init__(self, driver, padrao_exportacao=PADRAO_URL_EXPORTACAO, intervalo=INTERVALO_EVENTOS):
+        self.driver = driver
+        self.intervalo = intervalo
+        self.autorizacao_por_host = {}
+        self.download = None
+        self.estado_download = None
+        self.padrao_exportacao = re.compile(padrao_exportacao, re.IGNORECASE)
+        self.acompanhando_exportacao = False
+        self.requisicoes_exportacao = {}
+
+    def processar(self):
+        """
+        Consome o que estiver no buffer de eventos. Retorna a lista de eventos lidos.
+        """
+        eventos = []
+        for entrada in self.driver.get_log("performance"):
+            try:
+                mensagem = json.loads(entrada["message"])["message"]
+            except (KeyError, ValueError):
+                continue
+            metodo = mensagem.get("method")
+            params = mensagem.get("params", {})
+            eventos.append((metodo, params))
+
+            if metodo == "Network.requestWillBeSent":
+                requisicao = params.get("request", {})
+                cabecalhos = {k.lower(): v for k, v in requisicao.get("headers", {}).items()}
+                if "authorization" in cabecalhos:
+                    host = urlparse(requisicao.get("url", "")).netloc
+                    self.autorizacao_por_host[host] = cabecalhos["authorization"]
+                if (self.acompanhando_exportacao and params.get("type") in ("XHR", "Fetch")
+                        and self.padrao_exportacao.search(requisicao.get("url", ""))):
+                    self.requisicoes_exportacao[params.get("requestId")] = {
+                        "url": requisicao.get("url"), "status": None, "concluida": False, "erro": None,
+                    }
+            elif metodo == "Network.responseReceived" and params.get("requestId") in self.requisicoes_exportacao:
+                self.requisicoes_exportacao[params["requestId"]]["status"] = params.get("response", {}).get("status")
+            elif metodo == "Network.loadingFinished" and params.get("requestId") in self.requisicoes_exportacao:
+                self.requisicoes_exportacao[params["requestId"]]["concluida"] = True
+            elif metodo == "Network.loadingFailed" and params.get("requestId") in self.requisicoes_exportacao:
+                self.requisicoes_exportacao[params["requestId"]]["erro"] = params.get("errorText") or "falha de rede"
+            elif metodo in EVENTOS_DOWNLOAD and not self.download:
+                self.download = {
+                    "url": params.get("url"),
+                    "nome": params.get("suggestedFilename"),
+                    "guid": params.get("guid"),
+                }
+            elif metodo in EVENTOS_PROGRESSO_DOWNLOAD and self.download and params.get("guid") == self.download["guid"]:
+                self.estado_download = params.get("state")
+        return eventos
+
+    def marcar_exportacao(self):
+        """
+        Chamado logo antes do clique que inicia a exportação: descarta os
+        eventos anteriores e passa a acompanhar as requisições de exportação.
+        """
+        self.processar()
+        self.download = None
+        self.estado_download = None
+        self.requisicoes_exportacao = {}
+        self.acompanhando_exportacao = True
+
+    def situacao_exportacao(self):
+        """
+        Avalia os eventos já processados. Retorna (True, motivo) quando o
+        arquivo está pronto, (False, motivo) quando a exportação falhou, ou
+        None enquanto ela estiver em andamento. Só o início do download conta
+        como pronto: uma requisição de exportação que termina bem pode ser
+        apenas o aceite do pedido ou uma consulta de andamento.
+        """
+        if self.estado_download == "canceled":
+            return False, "o download do arquivo foi cancelado"
+        if self.download:
+            return True, f"download iniciado ({self.download.get('nome') or self.download.get('url')})"
+        for requisicao in self.requisicoes_exportacao.values():
+            if requisicao["erro"]:
+                return False, f"a requisição {requisicao['url']} falhou: {requisicao['erro']}"
+            if requisicao["status"] and requisicao["status"] >= 400:
+                return False, f"a requisição {requisicao['url']} respondeu HTTP {requisicao['status']}"
+        return None
+
+    def aguardar_exportacao(self, timeout_segundos, intervalo=None):
+        """
+        Espera a exportação terminar olhando só os eventos do DevTools (sem
+        consultar o DOM). Retorna (pronto, motivo); estourar o timeout é falha.
+        """
+        intervalo = intervalo or self.intervalo
+        limite = time.time() + timeout_segundos
+        while time.time() < limite:
+            self.processar()
+            situacao = self.situacao_exportacao()
+            if situacao is not None:
+                return situacao
+            time.sleep(intervalo)
+        return False, f"nenhum sinal da exportação em {timeout_segundos}s"
+
+    def aguardar_url_download(self, timeout_segundos, intervalo=0.5):
+        """
+        Espera o Chrome anunciar o download do arquivo gerado e retorna sua URL
+        (ou None se estourar o timeout).
+        """
+        limite = time.time() + timeout_segundos
+        while time.time() < limite:
+            self.processar()
+            if self.download:
+                return self.download["url"]
+            time.sleep(intervalo)
+        return None
+
+
+def criar_sessao_http(driver, autorizacao=None, tamanho_pool=4):
+    """
+    Cria uma sessão HTTP (com pool de conexões) que reaproveita a sessão do
+    navegador: cookies, User-Agent, Referer e, se houver, o Authorization.
+    """
+    sessao = requests.Session()
+    adaptador = HTTPAdapter(pool_connections=tamanho_pool, pool_maxsize=tamanho_pool)
+    sessao.mount("http://", adaptador)
+    sessao.mount("https://", adaptador)
+
+    for cookie in driver.get_cookies():
+        sessao.cookies.set(
+            cookie["name"], cookie["value"], domain=cookie.get("domain"), path=cookie.get("path", "/")
+        )
+    sessao.headers["User-Agent"] = driver.execute_script("return navigator.userAgent")
+    sessao.headers["Referer"] = driver.current_url
+    if autorizacao:
+        sessao.headers["Authorization"] = autorizacao
+    return sessao
+
+
+class DownloadIncompleto(Exception):
+    """A resposta terminou antes do tamanho anunciado pelo servidor."""
+
+
+def _tamanho_total(resposta, inicio):
+    """
+    Tamanho do arquivo completo segundo o servidor: o total do Content-Range
+    (respostas 206 e 416) ou 'inicio' + Content-Length. None se não der para
+    saber, inclusive em respostas comprimidas (o Content-Length não é o
+    tamanho gravado).
+    """
+    faixa = re.match(r"bytes\s+(?:\d+-\d+|\*)/(\d+)", resposta.headers.get("Content-Range", ""))
+    if faixa:
+        return int(faixa.group(1))
+    if resposta.status_code == 416 or resposta.headers.get("Content-Encoding", "identity") != "identity":
+        return None
+    comprimento = resposta.headers.get("Content-Length", "")
+    return inicio + int(comprimento) if comprimento.isdigit() else None
+
+
+def baixar_em_stream(sessao, url, destino, tentativas=TENTATIVAS_PADRAO, timeout=(10, 120)):
+    """
+    Baixa 'url' em blocos direto para 'destino'. O conteúdo vai para
+    'destino.part' e, se a conexão cair, a próxima tentativa continua de onde
+    parou com um Range request. Um 'destino.part' que já existia antes da
+    chamada é descartado: ele pode ser de outro arquivo. No final, o tamanho do arquivo é conferido
+    com o anunciado pelo servidor (Content-Length / Content-Range): um
+    arquivo truncado nunca vira 'destino'. Retorna o número de bytes do
+    arquivo final.
+    """
+    parcial = f"{destino}.part"
+    if os.path.exists(parcial):
+        # Sobra de outra execução (ou de outra exportação): só se retoma entre tentativas desta chamada
+        print(f"[HTTP] Descartando download parcial antigo: {parcial}")
+        os.remove(parcial)
+    esperado = None
+    for tentativa in range(1, tentativas + 1):
+        ja_baixado = os.path.getsize(parcial) if os.path.exists(parcial) else 0
+        cabecalhos = {"Range": f"bytes={ja_baixado}-"} if ja_baixado else {}
+        try:
+            with sessao.get(url, headers=cabecalhos, stream=True, timeout=timeout) as resposta:
+                if resposta.status_code == 416:
+                    # O servidor diz que não há mais nada depois do que já temos
+                    esperado = _tamanho_total(resposta, 0) or esperado
+                    break
+                resposta.raise_for_status()
+                if ja_baixado and resposta.status_code != 206:
+                    print("[HTTP] Servidor ignorou o Range. Recomeçando o download do zero.")
+                    ja_baixado = 0
+                esperado = _tamanho_total(resposta, ja_baixado)
+                modo = "ab" if ja_baixado else "wb"
+                with open(parcial, modo) as f:
+                    for bloco in resposta.iter_content(chunk_size=TAMANHO_BLOCO):
+                        f.write(bloco)
+            tamanho = os.path.getsize(parcial)
+            if esperado is not None and tamanho < esperado:
+                raise DownloadIncompleto(f"a resposta terminou com {tamanho} de {esperado} bytes")
+            break
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError,
+                DownloadIncompleto) as e:
+            if tentativa == tentativas:
+                raise
+            espera = min(2 ** tentativa, 30)
+            print(f"[HTTP] Conexão interrompida ({e}). Retomando em {espera}s (tentativa {tentativa + 1}/{tentativas})...")
+            time.sleep(espera)
+
+    tamanho = os.path.getsize(parcial) if os.path.exists(parcial) else 0
+    if esperado is not None and tamanho != esperado:
+        raise DownloadIncompleto(f"{parcial} tem {tamanho} bytes, mas o servidor anunciou {esperado}.")
+    if os.path.exists(destino):
+        os.remove(destino)
+    os.rename(parcial, destino)
+    return tamanho
@@ -0,0 +1,154 @@
+# geracoes.py
+
+import re
+from checkpoint import contar_linhas, tabela_existe
+
+# Gerações anteriores de uma tabela: <tabela>_g1 (a mais recente), <tabela>_g2, ...
+# Promover e reverter são um único RENAME TABLE com várias trocas, que o MariaDB
+# faz de forma atômica: quem lê a tabela nunca a encontra ausente.
+SUFIXO_GERACAO = "_g"
+SUFIXO_REVERTIDA = "_revertida"
+MANTER_PADRAO = 2
+MAX_VARIACAO_LINHAS_PADRAO = 0.3
+MAX_PRODUTOS_SEM_BARRAS_PADRAO = 0.05
+
+
+def tabela_geracao(tabela, numero):
+    return f"{tabela}{SUFIXO_GERACAO}{numero}"
+
+
+def politica(geracoes_cfg=None):
+    """
+    Seção 'geracoes' do config.json com os padrões preenchidos. Os limites das
+    verificações aceitam null para desligá-las.
+    """
+    geracoes_cfg = geracoes_cfg or {}
+    manter = int(geracoes_cfg.get("manter", MANTER_PADRAO))
+    if manter < 0:
+        raise ValueError("'geracoes.manter' não pode ser negativo.")
+    return {
+        "manter": manter,
+        "max_variacao_linhas": geracoes_cfg.get("max_variacao_linhas", MAX_VARIACAO_LINHAS_PADRAO),
+        "max_produtos_sem_barras": geracoes_cfg.get("max_produtos_sem_barras", MAX_PRODUTOS_SEM_BARRAS_PADRAO),
+    }
+
+
+def listar_geracoes(cursor, tabela):
+    """
+    Números das gerações anteriores existentes de 'tabela', em ordem crescente.
+    """
+    cursor.execute(f"SHOW TABLES LIKE '{tabela}%'")
+    padrao = re.compile(re.escape(tabela + SUFIXO_GERACAO) + r"(\d+)$")
+    numeros = [padrao.match(linha[0]) for linha in cursor.fetchall()]
+    return sorted(int(m.group(1)) for m in numeros if m)
+
+
+def _renomear(cursor, trocas):
+    cursor.execute("RENAME TABLE " + ", ".join(f"{origem} TO {destino}" for origem, destino in trocas))
+
+
+def verificar_staging(cursor, tabela, staging, politica_geracoes, linhas=None, linhas_csv=None,
+                      chave_produto="codigo_interno"):
+    """
+    Confere a staging antes de ela virar a tabela principal: a variação do
+    número de linhas em relação à tabela atual e, se 'linhas_csv' (produtos
+    lidos do arquivo) for informado, a fração de produtos do arquivo que não
+    chegaram à staging. Levanta exceção se algum limite for ultrapassado.
+    'linhas' evita o COUNT(*) da staging quando quem chama já sabe o total.
+    'chave_produto' identifica um produto (no multi-base, "base, codigo_interno").
+    """
+    linhas = contar_linhas(cursor, staging) if linhas is None else linhas
+    if not linhas:
+        raise Exception(f"Verificação falhou: a staging {staging} está vazia.")
+
+    # Produtos sem nenhum código de barras não geram linha no bronze (ver
+    # transformacao.py): um arquivo com a coluna de códigos vazia ou trocada
+    # aparece aqui como produtos faltando
+    max_sem_barras = politica_geracoes["max_produtos_sem_barras"]
+    if max_sem_barras is not None and linhas_csv:
+        cursor.execute(f"SELECT COUNT(*) FROM (SELECT DISTINCT {chave_produto} FROM {staging}) produtos")
+        faltando = max(linhas_csv - cursor.fetchone()[0], 0)
+        if faltando / linhas_csv > max_sem_barras:
+            raise Exception(
+                f"Verificação falhou: {faltando} de {linhas_csv} produtos do arquivo ({faltando / linhas_csv:.1%}) "
+                f"ficaram fora da staging, sem código de barras (limite {max_sem_barras:.1%})."
+            )
+
+    max_variacao = politica_geracoes["max_variacao_linhas"]
+    if max_variacao is not None and tabela_existe(cursor, tabela):
+        atuais = contar_linhas(cursor, tabela)
+        if atuais:
+            variacao = (linhas - atuais) / atuais
+            if abs(variacao) > max_variacao:
+                raise Exception(
+                    f"Verificação falhou: a nova carga tem {linhas} linhas e a tabela atual {atuais} "
+                    f"({variacao:+.1%}, limite ±{max_variacao:.0%})."
+                )
+            print(f"[Gerações] Variação de linhas em relação à tabela atual: {variacao:+.1%}")
+    print(f"[Gerações] Verificação da staging OK ({linhas} linhas).")
+
+
+def _trocas_promocao(cursor, tabela, staging):
+    # Cada geração desce um número, a tabela atual vira _g1 e a staging toma o lugar dela
+    geracoes = listar_geracoes(cursor, tabela)
+    trocas = [(tabela_geracao(tabela, n), tabela_geracao(tabela, n + 1)) for n in reversed(geracoes)]
+    if tabela_existe(cursor, tabela):
+        trocas.append((tabela, tabela_geracao(tabela, 1)))
+    trocas.append((staging, tabela))
+    return trocas, geracoes
+
+
+def _apagar_excedentes(cursor, tabela, geracoes, manter):
+    for numero in [n + 1 for n in geracoes] + [1]:
+        if numero > manter:
+            cursor.execute(f"DROP TABLE IF EXISTS {tabela_geracao(tabela, numero)}")
+
+
+def promover(cursor, tabela, staging, manter=MANTER_PADRAO, acompanhantes=()):
+    """
+    Troca atômica: cada geração anterior desce um número, a tabela atual vira
+    <tabela>_g1 e a staging vira a tabela principal. Depois apaga as gerações
+    além de 'manter' (com manter=0 não sobra nenhuma).
+    'acompanhantes' [(tabela, staging)] são publicadas no mesmo RENAME TABLE
+    e guardam gerações com a mesma numeração (ex.: a camada silver), para que
+    o rollback possa restaurá-las junto com esta.
+    """
+    trocas, geracoes = _trocas_promocao(cursor, tabela, staging)
+    outras = [(outra, _trocas_promocao(cursor, outra, outra_staging)) for outra, outra_staging in acompanhantes]
+    _renomear(cursor, trocas + [troca for _, (trocas_outra, _) in outras for troca in trocas_outra])
+
+    _apagar_excedentes(cursor, tabela, geracoes, manter)
+    for outra, (_, geracoes_outra) in outras:
+        _apagar_excedentes(cursor, outra, geracoes_outra, manter)
+    print(f"[Gerações] {staging} promovida a {tabela}. Gerações anteriores guardadas: {min(len(trocas) - 1, manter)}.")
+
+
+def _trocas_reversao(cursor, tabela, geracoes):
+    # A tabela atual vai para _revertida, a _g1 volta a ser a principal e as demais sobem um número
+    revertida = tabela + SUFIXO_REVERTIDA
+    cursor.execute(f"DROP TABLE IF EXISTS {revertida}")
+    trocas = [(tabela, revertida)] if tabela_existe(cursor, tabela) else []
+    trocas.append((tabela_geracao(tabela, 1), tabela))
+    trocas += [(tabela_geracao(tabela, n), tabela_geracao(tabela, n - 1)) for n in geracoes if n > 1]
+    return trocas
+
+
+def reverter(cursor, tabela, acompanhantes=()):
+    """
+    Volta a geração anterior (<tabela>_g1) para a tabela principal em um único
+    RENAME TABLE. A tabela atual fica guardada em <tabela>_revertida (a
+    reversão anterior, se houver, é apagada) e as demais gerações sobem um
+    número. As tabelas de 'acompanhantes' são revertidas no mesmo RENAME.
+    Retorna quantas gerações anteriores ainda restam.
+    """
+    geracoes = {outra: listar_geracoes(cursor, outra) for outra in [tabela] + list(acompanhantes)}
+    for outra, numeros in geracoes.items():
+        if 1 not in numeros:
+            raise Exception(f"Não há geração anterior de {outra} para restaurar.")
+    trocas = [troca for outra, numeros in geracoes.items() for troca in _trocas_reversao(cursor, outra, numeros)]
+    _renomear(cursor, trocas)
+    print(f"[Gerações] {tabela_geracao(tabela, 1)} restaurada como {tabela}; "
+          f"a tabela revertida ficou em {tabela + SUFIXO_REVERTIDA}.")
+    if acompanhantes:
+        print(f"[Gerações] Restauradas no mesmo RENAME TABLE: {', '.join(acompanhantes)}.")
+    return len(geracoes[tabela]) - 1
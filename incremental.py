@@ -0,0 +1,81 @@
+# incremental.py
+
+import pandas as pd
+from transformacao import COLUNAS_DB_TODAS
+
+CHAVE = ["codigo_interno", "codigo_barras_normalizado"]
+COLUNA_HASH = "hash_conteudo"
+# Todas as colunas de conteúdo (inclui 'ultima_alteracao'); 'data_insercao' muda a cada carga e fica fora
+COLUNAS_HASH = [c for c in COLUNAS_DB_TODAS if c != "data_insercao"]
+COLUNAS_INCREMENTAL = COLUNAS_DB_TODAS + [COLUNA_HASH]
+HASH_KEY = "pp_produtos_hash"  # precisa ter 16 bytes
+LOTE_DELETE = 10000
+
+
+def calcular_hash_conteudo(df_transformado):
+    """
+    Hash de 64 bits por linha sobre as colunas de conteúdo (vetorizado com pandas).
+    """
+    return pd.util.hash_pandas_object(
+        df_transformado[COLUNAS_HASH], index=False, hash_key=HASH_KEY
+    ).astype("UInt64")
+
+
+def ler_estado_atual(cursor, tabela):
+    """
+    Lê chave, última alteração e hash de todas as linhas já carregadas.
+    Linhas antigas, sem hash (NULL), sempre aparecem como atualizadas.
+    """
+    cursor.execute(f"SELECT {', '.join(CHAVE)}, ultima_alteracao, {COLUNA_HASH} FROM {tabela}")
+    atual = pd.DataFrame(cursor.fetchall(), columns=CHAVE + ["ultima_alteracao", COLUNA_HASH])
+    atual["ultima_alteracao"] = pd.to_datetime(atual["ultima_alteracao"])
+    atual[COLUNA_HASH] = pd.array(atual[COLUNA_HASH].tolist(), dtype="UInt64")
+    return atual
+
+
+def calcular_delta(df_novo, atual):
+    """
+    Compara o export novo (já com 'hash_conteudo') com o estado do banco.
+    Cada chave (codigo_interno, codigo_barras_normalizado) é tratada como um
+    conjunto de linhas: se o conjunto mudou, a chave é inserida, atualizada ou
+    removida por inteiro. Retorna (linhas_para_inserir, chaves_para_remover, contagens).
+    """
+    assinatura = CHAVE + ["ultima_alteracao", COLUNA_HASH]
+    novo = df_novo[assinatura].copy()
+    antigo = atual[assinatura].copy()
+    # 'ocorrencia' diferencia linhas idênticas repetidas dentro da mesma chave
+    novo["ocorrencia"] = novo.groupby(assinatura, dropna=False).cumcount()
+    antigo["ocorrencia"] = antigo.groupby(assinatura, dropna=False).cumcount()
+
+    comparacao = novo.merge(antigo, on=assinatura + ["ocorrencia"], how="outer", indicator=True)
+    diferentes = comparacao[comparacao["_merge"] != "both"]
+    alteradas = pd.MultiIndex.from_frame(diferentes[CHAVE]).unique()
+
+    chaves_novo = pd.MultiIndex.from_frame(novo[CHAVE]).unique()
+    chaves_antigo = pd.MultiIndex.from_frame(antigo[CHAVE]).unique()
+
+    inseridas = alteradas.difference(chaves_antigo)
+    removidas = alteradas.difference(chaves_novo)
+    atualizadas = alteradas.intersection(chaves_novo).intersection(chaves_antigo)
+
+    para_inserir = df_novo[pd.MultiIndex.from_frame(df_novo[CHAVE]).isin(inseridas.union(atualizadas))]
+    para_remover = list(removidas.union(atualizadas))
+
+    contagens = {
+        "inseridos": len(inseridas),
+        "atualizados": len(atualizadas),
+        "removidos": len(removidas),
+        "inalterados": len(chaves_novo) - len(inseridas) - len(atualizadas),
+        "linhas_escritas": len(para_inserir),
+    }
+    return para_inserir, para_remover, contagens
+
+
+def remover_chaves(cursor, tabela, chaves):
+    """
+    Remove as chaves em lotes de LOTE_DELETE.
+    """
+    query = f"DELETE FROM {tabela} WHERE codigo_interno = ? AND codigo_barras_normalizado = ?"
+    for i in range(0, len(chaves), LOTE_DELETE):
+        cursor.executemany(query, chaves[i:i + LOTE_DELETE])
+        print(f"[Database] Removidas {min(i + LOTE_DELETE, len(chaves))}/{len(chaves)} chaves")
@@ -0,0 +1,237 @@
+# indice_barras.py
+
+import argparse
+import mmap
+import os
+import struct
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from transformacao import completar_derivadas, preparar_dataframe, transformar_produtos
+from utils import detectar_encoding
+import snapshots
+
+# Formato do arquivo (little-endian):
+#   cabeçalho (64 bytes) | offsets: (n + 1) uint64 | chaves: n x 14 bytes, ordenadas | registros (UTF-8)
+# Cada registro é "codigo_interno \x1f codigo_principal \x1f produto"; o registro i
+# ocupa os bytes offsets[i]:offsets[i + 1] da área de registros.
+MAGICO = b"PPBARRAS"
+VERSAO = 1
+LARGURA_CHAVE = 14
+FORMATO_CABECALHO = "<8sIIQQQQ"
+TAMANHO_CABECALHO = 64
+SEPARADOR = "\x1f"
+CAMINHO_PADRAO = os.path.join("indices", "produtos_barras.idx")
+LINHAS_POR_BLOCO = 100000
+COLUNAS_INDICE = ["codigo_barras_normalizado", "codigo_interno", "codigo_principal", "produto"]
+
+
+def normalizar_codigo(codigo):
+    """
+    Mesma normalização da coluna 'codigo_barras_normalizado' (zfill(14), cortado em 14).
+    """
+    return str(codigo).strip().zfill(LARGURA_CHAVE)[:LARGURA_CHAVE]
+
+
+def construir_indice(df_transformado, caminho=CAMINHO_PADRAO):
+    """
+    Grava o índice a partir do DataFrame transformado (colunas
+    'codigo_barras_normalizado', 'codigo_interno', 'codigo_principal' e
+    'produto'). Chaves repetidas ficam juntas, com o código principal primeiro.
+    O arquivo é gravado em um temporário e trocado de uma vez.
+    Retorna o número de chaves gravadas.
+    """
+    chaves = df_transformado["codigo_barras_normalizado"]
+    # Chave de largura fixa: códigos com caracteres fora do ASCII não cabem em 14 bytes
+    ascii_ok = chaves.map(str.isascii).to_numpy(dtype=bool)
+    if not ascii_ok.all():
+        print(f"[Índice] Aviso: {int((~ascii_ok).sum())} códigos de barras com caracteres especiais ignorados.")
+    df = df_transformado[ascii_ok]
+
+    chaves = df["codigo_barras_normalizado"].to_numpy(dtype=f"S{LARGURA_CHAVE}")
+    principal = df["codigo_principal"].to_numpy(dtype=np.int64)
+    interno = df["codigo_interno"].to_numpy(dtype=object)
+    ordem = np.lexsort((interno.astype(str), -principal, chaves))
+
+    registros = (
+        df["codigo_interno"] + SEPARADOR + df["codigo_principal"].astype(str) + SEPARADOR + df["produto"]
+    ).str.encode("utf-8").to_numpy(dtype=object)[ordem]
+    offsets = np.zeros(len(registros) + 1, dtype="<u8")
+    if len(registros):
+        np.cumsum([len(r) for r in registros], out=offsets[1:])
+
+    n = len(chaves)
+    inicio_offsets = TAMANHO_CABECALHO
+    inicio_chaves = inicio_offsets + offsets.nbytes
+    inicio_registros = inicio_chaves + n * LARGURA_CHAVE
+    cabecalho = struct.pack(
+        FORMATO_CABECALHO, MAGICO, VERSAO, LARGURA_CHAVE, n, inicio_chaves, inicio_registros, int(offsets[-1])
+    ).ljust(TAMANHO_CABECALHO, b"\0")
+
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    temporario = f"{caminho}.tmp"
+    with open(temporario, "wb") as f:
+        f.write(cabecalho)
+        f.write(offsets.tobytes())
+        f.write(chaves[ordem].tobytes())
+        for registro in registros:
+            f.write(registro)
+    # No Windows a troca falha enquanto algum leitor mantiver o índice antigo mapeado
+    os.replace(temporario, caminho)
+    return n
+
+
+class ColetorIndice:
+    """
+    Guarda só as colunas do índice de cada bloco que a carga transforma
+    (é chamado com o DataFrame transformado), para o índice ser gerado no
+    fim sem ler e transformar o arquivo de novo.
+    """
+
+    def __init__(self):
+        self.partes = []
+
+    def __call__(self, df_transformado):
+        # Com 'derivadas_no_banco' o bloco chega sem as colunas derivadas
+        self.partes.append(completar_derivadas(df_transformado)[COLUNAS_INDICE])
+
+    def gerar(self, caminho=CAMINHO_PADRAO):
+        """
+        Grava o índice com as partes coletadas. Retorna o número de chaves gravadas.
+        """
+        df = pd.concat(self.partes, ignore_index=True) if self.partes else pd.DataFrame(columns=COLUNAS_INDICE)
+        n = construir_indice(df, caminho)
+        print(f"[Índice] {n} códigos gravados em {caminho} ({os.path.getsize(caminho)} bytes).")
+        return n
+
+
+def gerar_indice_do_arquivo(caminho_arquivo, caminho=CAMINHO_PADRAO, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """
+    Gera o índice a partir do CSV do dia ou de um snapshot Parquet, com a
+    mesma transformação da carga. O arquivo é lido em blocos e só as colunas
+    do índice ficam na memória. Usado quando não há uma carga que acabou de
+    transformar o arquivo (execução avulsa ou arquivo já carregado).
+    Retorna o número de chaves gravadas.
+    """
+    print(f"[Índice] Gerando índice de códigos de barras a partir de '{os.path.basename(caminho_arquivo)}'...")
+    if caminho_arquivo.lower().endswith(".parquet"):
+        blocos = snapshots.ler_snapshot_em_blocos(caminho_arquivo, linhas_por_bloco)
+    else:
+        encoding, _ = detectar_encoding(caminho_arquivo)
+        blocos = pd.read_csv(caminho_arquivo, sep=';', encoding=encoding, dtype=str, chunksize=linhas_por_bloco)
+
+    agora = datetime.now()
+    coletor = ColetorIndice()
+    for bloco in blocos:
+        coletor(transformar_produtos(preparar_dataframe(bloco), agora))
+    return coletor.gerar(caminho)
+
+
+class IndiceBarras:
+    """
+    Leitor do índice de códigos de barras. O arquivo é mapeado na memória
+    (mmap) e as chaves são lidas direto do mapeamento, sem cópia: abrir é
+    instantâneo e cada busca é uma busca binária (O(log n)), sem banco.
+    """
+
+    def __init__(self, caminho=CAMINHO_PADRAO):
+        self._arquivo = open(caminho, "rb")
+        try:
+            self._mapa = mmap.mmap(self._arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Arquivo vazio não pode ser mapeado
+            self._arquivo.close()
+            raise ValueError(f"Índice de códigos de barras inválido: '{caminho}'")
+        magico, versao, largura, n, inicio_chaves, inicio_registros, _ = struct.unpack_from(
+            FORMATO_CABECALHO, self._mapa
+        )
+        if magico != MAGICO or versao != VERSAO or largura != LARGURA_CHAVE:
+            self.fechar()
+            raise ValueError(f"Índice de códigos de barras inválido: '{caminho}'")
+        self.tamanho = n
+        self._offsets = np.frombuffer(self._mapa, dtype="<u8", count=n + 1, offset=TAMANHO_CABECALHO)
+        self._chaves = np.frombuffer(self._mapa, dtype=f"S{LARGURA_CHAVE}", count=n, offset=inicio_chaves)
+        self._inicio_registros = inicio_registros
+
+    def __len__(self):
+        return self.tamanho
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+    def fechar(self):
+        # Os arrays apontam para o mmap: precisam ser soltos antes de fechá-lo
+        self._offsets = self._chaves = None
+        if self._mapa is not None:
+            self._mapa.close()
+            self._mapa = None
+        self._arquivo.close()
+
+    def _registro(self, posicao):
+        inicio = self._inicio_registros + int(self._offsets[posicao])
+        fim = self._inicio_registros + int(self._offsets[posicao + 1])
+        codigo_interno, principal, produto = self._mapa[inicio:fim].decode("utf-8").split(SEPARADOR, 2)
+        return codigo_interno, int(principal), produto
+
+    @staticmethod
+    def _chave(codigo):
+        chave = normalizar_codigo(codigo)
+        return chave.encode("ascii") if chave.isascii() else None
+
+    def buscar(self, codigo):
+        """
+        (codigo_interno, codigo_principal, produto) do código de barras, ou
+        None se ele não existir. Se o código estiver em mais de um produto,
+        devolve aquele em que ele é o código principal.
+        """
+        chave = self._chave(codigo)
+        if chave is None:
+            return None
+        posicao = int(np.searchsorted(self._chaves, chave, side="left"))
+        if posicao < self.tamanho and self._chaves[posicao] == chave:
+            return self._registro(posicao)
+        return None
+
+    def buscar_todos(self, codigo):
+        """
+        Todos os (codigo_interno, codigo_principal, produto) do código de barras.
+        """
+        chave = self._chave(codigo)
+        if chave is None:
+            return []
+        inicio = int(np.searchsorted(self._chaves, chave, side="left"))
+        fim = int(np.searchsorted(self._chaves, chave, side="right"))
+        return [self._registro(p) for p in range(inicio, fim)]
+
+    def buscar_lote(self, codigos):
+        """
+        Busca vários códigos de uma vez (busca binária vetorizada).
+        Retorna uma lista na mesma ordem, com None para os não encontrados.
+        """
+        chaves = [self._chave(c) for c in codigos]
+        validas = np.array([c is not None for c in chaves], dtype=bool)
+        procurar = np.array([c if c is not None else b"" for c in chaves], dtype=f"S{LARGURA_CHAVE}")
+        posicoes = np.searchsorted(self._chaves, procurar, side="left")
+        dentro = posicoes < self.tamanho
+        achou = validas & dentro
+        achou[dentro] &= self._chaves[posicoes[dentro]] == procurar[dentro]
+        return [self._registro(int(p)) if ok else None for p, ok in zip(posicoes, achou)]
+
+
+# --- Bloco de Execução Independente ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera ou consulta o índice de códigos de barras.")
+    parser.add_argument("codigos", nargs="*", help="Códigos de barras a consultar.")
+    parser.add_argument("--indice", default=CAMINHO_PADRAO, help="Caminho do índice.")
+    parser.add_argument("--gerar", metavar="ARQUIVO", help="Gera o índice a partir de um CSV ou snapshot Parquet.")
+    args = parser.parse_args()
+
+    if args.gerar:
+        gerar_indice_do_arquivo(args.gerar, args.indice)
+    if args.codigos:
+        with IndiceBarras(args.indice) as indice:
+            for codigo, resultado in zip(args.codigos, indice.buscar_lote(args.codigos)):
+                print(f"{codigo}: {resultado if resultado else 'não encontrado'}")
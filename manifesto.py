@@ -0,0 +1,94 @@
+# manifesto.py
+
+import hashlib
+import json
+import os
+from datetime import datetime
+
+ARQUIVO_MANIFESTO = "manifesto_cargas.json"
+MAX_CARGAS_HISTORICO = 60
+MAX_REVERSOES_HISTORICO = 20
+
+
+def calcular_hash_arquivo(caminho_arquivo, tamanho_bloco=1024 * 1024):
+    """
+    SHA-256 do arquivo lido em blocos (não carrega o arquivo inteiro na memória).
+    Retorna (hash_hex, tamanho_em_bytes).
+    """
+    sha = hashlib.sha256()
+    tamanho = 0
+    with open(caminho_arquivo, 'rb') as f:
+        while True:
+            bloco = f.read(tamanho_bloco)
+            if not bloco:
+                break
+            sha.update(bloco)
+            tamanho += len(bloco)
+    return sha.hexdigest(), tamanho
+
+
+def carregar_manifesto(arquivo=ARQUIVO_MANIFESTO):
+    if not os.path.exists(arquivo):
+        return {"geracao": 0, "cargas": []}
+    try:
+        with open(arquivo, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"[Manifesto] Aviso: não foi possível ler '{arquivo}' ({e}). Começando um manifesto novo.")
+        return {"geracao": 0, "cargas": []}
+
+
+def salvar_manifesto(manifesto, arquivo=ARQUIVO_MANIFESTO):
+    # Grava em um temporário e troca, para nunca deixar um manifesto pela metade
+    temporario = f"{arquivo}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=2)
+    os.replace(temporario, arquivo)
+
+
+def carga_atual(manifesto):
+    """
+    Última carga registrada, ou seja, a que está viva na tabela.
+    """
+    return manifesto["cargas"][-1] if manifesto.get("cargas") else None
+
+
+def arquivo_ja_carregado(sha256, manifesto):
+    atual = carga_atual(manifesto)
+    return atual is not None and atual.get("sha256") == sha256
+
+
+def registrar_carga(manifesto, caminho_arquivo, sha256, tamanho, resultado, arquivo=ARQUIVO_MANIFESTO):
+    """
+    Registra uma carga concluída como a nova geração da tabela e salva o manifesto.
+    """
+    manifesto["geracao"] = manifesto.get("geracao", 0) + 1
+    registro = {
+        "geracao": manifesto["geracao"],
+        "arquivo": os.path.basename(caminho_arquivo),
+        "sha256": sha256,
+        "bytes": tamanho,
+        "carregado_em": datetime.now().isoformat(sep=" ", timespec="seconds"),
+    }
+    registro.update(resultado or {})
+    manifesto.setdefault("cargas", []).append(registro)
+    manifesto["cargas"] = manifesto["cargas"][-MAX_CARGAS_HISTORICO:]
+    salvar_manifesto(manifesto, arquivo)
+    return registro
+
+
+def registrar_reversao(manifesto, arquivo=ARQUIVO_MANIFESTO):
+    """
+    Registra que a tabela voltou para a geração anterior: a carga atual sai
+    de 'cargas' (a anterior volta a ser a atual) e fica em 'revertidas'.
+    Retorna o registro revertido, ou None se não havia carga registrada.
+    """
+    atual = carga_atual(manifesto)
+    if atual is None:
+        return None
+    manifesto["cargas"].pop()
+    atual["revertido_em"] = datetime.now().isoformat(sep=" ", timespec="seconds")
+    manifesto.setdefault("revertidas", []).append(atual)
+    manifesto["revertidas"] = manifesto["revertidas"][-MAX_REVERSOES_HISTORICO:]
+    salvar_manifesto(manifesto, arquivo)
+    return atual
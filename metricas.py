@@ -0,0 +1,211 @@
+# metricas.py
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+PREFIXO_PROMETHEUS = "pp_produtos"
+
+
+def pico_memoria_bytes():
+    """
+    Pico de memória residente (RSS) do processo até agora, em bytes.
+    Retorna None se não for possível medir neste sistema.
+    """
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        contadores = PROCESS_MEMORY_COUNTERS()
+        contadores.cb = ctypes.sizeof(contadores)
+        processo = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(processo, ctypes.byref(contadores), contadores.cb):
+            return None
+        return contadores.PeakWorkingSetSize
+
+    try:
+        import resource
+    except ImportError:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss vem em bytes no macOS e em KB no Linux
+    return pico if sys.platform == "darwin" else pico * 1024
+
+
+class RegistroExecucao:
+    """
+    Guarda as etapas de uma execução (duração, linhas, bytes, pico de RSS)
+    e gera o relatório JSON e o arquivo do textfile collector do Prometheus.
+    """
+
+    def __init__(self):
+        self.inicio = time.time()
+        self.etapas = []
+        self.status = None
+        self._trava = threading.Lock()
+        self._ativas = threading.local()
+
+    def _pilha(self):
+        if not hasattr(self._ativas, "pilha"):
+            self._ativas.pilha = []
+        return self._ativas.pilha
+
+    @contextmanager
+    def etapa(self, nome):
+        """
+        Mede o bloco 'with' como a etapa 'nome'. Linhas e bytes podem ser
+        informados com 'anotar' enquanto a etapa está aberta.
+        """
+        dados = {"linhas": None, "bytes": None, "sucesso": True}
+        pilha = self._pilha()
+        pilha.append(dados)
+        inicio = time.perf_counter()
+        try:
+            yield dados
+        except BaseException:
+            dados["sucesso"] = False
+            raise
+        finally:
+            pilha.pop()
+            self.registrar(nome, time.perf_counter() - inicio, **dados)
+
+    def anotar(self, linhas=None, bytes=None):
+        """
+        Informa linhas e/ou bytes processados pela etapa aberta mais interna desta thread.
+        """
+        pilha = self._pilha()
+        if not pilha:
+            return
+        if linhas is not None:
+            pilha[-1]["linhas"] = linhas
+        if bytes is not None:
+            pilha[-1]["bytes"] = bytes
+
+    def registrar(self, nome, segundos, linhas=None, bytes=None, sucesso=True):
+        etapa = {
+            "etapa": nome,
+            "segundos": round(segundos, 3),
+            "linhas": linhas,
+            "linhas_por_segundo": round(linhas / segundos, 1) if linhas and segundos > 0 else None,
+            "bytes": bytes,
+            "pico_rss_bytes": pico_memoria_bytes(),
+            "sucesso": sucesso,
+        }
+        with self._trava:
+            self.etapas.append(etapa)
+        texto = f"[Métricas] Etapa '{nome}': {etapa['segundos']}s"
+        if etapa["linhas_por_segundo"]:
+            texto += f", {linhas} linhas ({etapa['linhas_por_segundo']} linhas/s)"
+        if bytes:
+            texto += f", {bytes} bytes"
+        print(texto)
+        return etapa
+
+    def relatorio(self):
+        fim = time.time()
+        return {
+            "inicio": datetime.fromtimestamp(self.inicio).isoformat(sep=" ", timespec="seconds"),
+            "fim": datetime.fromtimestamp(fim).isoformat(sep=" ", timespec="seconds"),
+            "duracao_total_s": round(fim - self.inicio, 3),
+            "status": self.status,
+            "pico_rss_bytes": pico_memoria_bytes(),
+            "etapas": list(self.etapas),
+        }
+
+    def salvar_json(self, caminho):
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        temporario = f"{caminho}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(self.relatorio(), f, ensure_ascii=False, indent=2)
+        os.replace(temporario, caminho)
+        return caminho
+
+    def texto_prometheus(self):
+        """
+        Relatório no formato de exposição do Prometheus (textfile collector).
+        Etapas repetidas são somadas.
+        """
+        relatorio = self.relatorio()
+        por_etapa = {}
+        for etapa in relatorio["etapas"]:
+            soma = por_etapa.setdefault(etapa["etapa"], {"segundos": 0.0, "linhas": 0, "bytes": 0})
+            soma["segundos"] += etapa["segundos"]
+            soma["linhas"] += etapa["linhas"] or 0
+            soma["bytes"] += etapa["bytes"] or 0
+
+        linhas = []
+
+        def _metrica(nome, ajuda, amostras):
+            linhas.append(f"# HELP {PREFIXO_PROMETHEUS}_{nome} {ajuda}")
+            linhas.append(f"# TYPE {PREFIXO_PROMETHEUS}_{nome} gauge")
+            for rotulo, valor in amostras:
+                rotulos = f'{{etapa="{rotulo}"}}' if rotulo else ""
+                linhas.append(f"{PREFIXO_PROMETHEUS}_{nome}{rotulos} {valor}")
+
+        _metrica("etapa_duracao_segundos", "Duracao de cada etapa da ultima execucao.",
+                 [(nome, soma["segundos"]) for nome, soma in por_etapa.items()])
+        _metrica("etapa_linhas", "Linhas processadas por etapa na ultima execucao.",
+                 [(nome, soma["linhas"]) for nome, soma in por_etapa.items() if soma["linhas"]])
+        _metrica("etapa_linhas_por_segundo", "Vazao de cada etapa na ultima execucao.",
+                 [(nome, round(soma["linhas"] / soma["segundos"], 1))
+                  for nome, soma in por_etapa.items() if soma["linhas"] and soma["segundos"] > 0])
+        _metrica("etapa_bytes", "Bytes processados por etapa na ultima execucao.",
+                 [(nome, soma["bytes"]) for nome, soma in por_etapa.items() if soma["bytes"]])
+        _metrica("execucao_duracao_segundos", "Duracao total da ultima execucao.",
+                 [(None, relatorio["duracao_total_s"])])
+        _metrica("execucao_sucesso", "1 se a ultima execucao terminou com sucesso.",
+                 [(None, 1 if self.status == "sucesso" else 0)])
+        if relatorio["pico_rss_bytes"] is not None:
+            _metrica("execucao_pico_rss_bytes", "Pico de memoria residente da ultima execucao.",
+                     [(None, relatorio["pico_rss_bytes"])])
+        _metrica("execucao_timestamp_segundos", "Horario (epoch) do fim da ultima execucao.",
+                 [(None, int(time.time()))])
+        return "\n".join(linhas) + "\n"
+
+    def salvar_prometheus(self, caminho):
+        # O node exporter pode ler o arquivo a qualquer momento: grava e troca de uma vez
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        temporario = f"{caminho}.{os.getpid()}.tmp"
+        with open(temporario, 'w', encoding='utf-8', newline='\n') as f:
+            f.write(self.texto_prometheus())
+        os.replace(temporario, caminho)
+        return caminho
+
+
+# Registro único da execução, compartilhado por run.py, aut_pp_produtos.py e database.py
+registro = RegistroExecucao()
+
+
+def etapa(nome):
+    return registro.etapa(nome)
+
+
+def anotar(linhas=None, bytes=None):
+    registro.anotar(linhas=linhas, bytes=bytes)
+
+
+def medir(nome):
+    """
+    Decorador: mede cada chamada da função como a etapa 'nome'.
+    """
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            with registro.etapa(nome):
+                return funcao(*args, **kwargs)
+        return envoltorio
+    return decorador
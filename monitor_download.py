@@ -0,0 +1,136 @@
+# monitor_download.py
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+
+# Constantes do inotify (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_CLOEXEC = 0o2000000
+TAMANHO_CABECALHO_EVENTO = struct.calcsize("iIII")
+
+EXTENSOES_TEMPORARIAS = (".crdownload", ".tmp")
+INTERVALO_PENDENTES = 1.0  # com um .csv ainda instável, confere de novo pelo menos a cada segundo
+
+
+def inotify_disponivel():
+    """
+    True se estivermos no Linux e a libc expuser as funções do inotify.
+    """
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        return hasattr(libc, "inotify_init1") and hasattr(libc, "inotify_add_watch")
+    except OSError:
+        return False
+
+
+def csv_recente(caminho, desde):
+    """
+    True se o caminho for um .csv final (não temporário) modificado a partir de 'desde'.
+    Evita confundir um CSV antigo, esquecido na pasta, com o download novo.
+    """
+    if not caminho.lower().endswith(".csv"):
+        return False
+    try:
+        return os.path.getmtime(caminho) >= desde
+    except OSError:
+        return False
+
+
+def aguardar_tamanho_estavel(caminho, intervalo=0.3, tentativas=20):
+    """
+    Espera o tamanho do arquivo parar de mudar entre duas leituras seguidas.
+    """
+    tamanho_anterior = -1
+    for _ in range(tentativas):
+        try:
+            tamanho = os.path.getsize(caminho)
+        except OSError:
+            return False
+        if tamanho == tamanho_anterior and tamanho > 0:
+            return True
+        tamanho_anterior = tamanho
+        time.sleep(intervalo)
+    return False
+
+
+class MonitorInotify:
+    """
+    Observa a pasta de downloads com inotify e avisa assim que o Chrome
+    renomeia o .crdownload para o .csv final (IN_MOVED_TO) ou fecha um .csv
+    escrito diretamente (IN_CLOSE_WRITE).
+    """
+
+    def __init__(self, pasta):
+        self.pasta = pasta
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            erro = ctypes.get_errno()
+            raise OSError(erro, f"inotify_init1 falhou: {os.strerror(erro)}")
+        mascara = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(pasta), mascara)
+        if wd < 0:
+            erro = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(erro, f"inotify_add_watch falhou em '{pasta}': {os.strerror(erro)}")
+
+    def _ler_eventos(self, timeout):
+        """
+        Espera até 'timeout' segundos e retorna a lista de (mascara, nome) recebida.
+        """
+        prontos, _, _ = select.select([self.fd], [], [], timeout)
+        if not prontos:
+            return []
+        dados = os.read(self.fd, 64 * 1024)
+        eventos = []
+        posicao = 0
+        while posicao + TAMANHO_CABECALHO_EVENTO <= len(dados):
+            _, mascara, _, tamanho = struct.unpack_from("iIII", dados, posicao)
+            posicao += TAMANHO_CABECALHO_EVENTO
+            nome = dados[posicao:posicao + tamanho].rstrip(b"\0").decode(errors="replace")
+            posicao += tamanho
+            eventos.append((mascara, nome))
+        return eventos
+
+    def aguardar_csv(self, desde, timeout_segundos):
+        """
+        Bloqueia até um .csv novo aparecer na pasta (ou estourar o timeout).
+        Retorna o caminho do arquivo, ou None em caso de timeout.
+        Um .csv que ainda não estabilizou (vazio ou crescendo) fica pendente e é
+        conferido de novo a cada volta: o evento dele já foi consumido.
+        """
+        limite = time.time() + timeout_segundos
+
+        # O arquivo pode ter terminado antes de o monitor começar
+        pendentes = {os.path.join(self.pasta, nome) for nome in os.listdir(self.pasta)}
+
+        while True:
+            for caminho in sorted(pendentes):
+                if not csv_recente(caminho, desde):
+                    pendentes.discard(caminho)
+                elif aguardar_tamanho_estavel(caminho):
+                    return caminho
+            restante = limite - time.time()
+            if restante <= 0:
+                return None
+            for mascara, nome in self._ler_eventos(min(restante, INTERVALO_PENDENTES if pendentes else 5.0)):
+                if nome.lower().endswith(EXTENSOES_TEMPORARIAS):
+                    if mascara & IN_CREATE:
+                        print(f"[Sistema] ...download em andamento ({nome})...", end="\r")
+                    continue
+                if mascara & (IN_MOVED_TO | IN_CLOSE_WRITE):
+                    pendentes.add(os.path.join(self.pasta, nome))
+
+    def fechar(self):
+        if self.fd is not None and self.fd >= 0:
+            os.close(self.fd)
+            self.fd = None
@@ -0,0 +1,61 @@
+# perfil_imports.py
+
+import builtins
+import sys
+import threading
+import time
+
+_importar_original = builtins.__import__
+_tempos = {}
+_local = threading.local()
+_inicio = None
+_total = 0.0
+
+
+def _importar_medindo(nome, globals=None, locals=None, fromlist=(), level=0):
+    global _total
+    # Só mede a primeira importação de cada módulo (as outras vêm do sys.modules)
+    if level or nome in sys.modules:
+        return _importar_original(nome, globals, locals, fromlist, level)
+    pilha = _local.__dict__.setdefault("pilha", [])
+    pilha.append(0.0)
+    inicio = time.perf_counter()
+    try:
+        return _importar_original(nome, globals, locals, fromlist, level)
+    finally:
+        total = time.perf_counter() - inicio
+        filhos = pilha.pop()
+        if pilha:
+            pilha[-1] += total
+        else:
+            # Import de primeiro nível: entra no tempo total
+            _total += total
+        _tempos.setdefault(nome, (total, total - filhos))
+
+
+def instalar():
+    """
+    Passa a medir o tempo de cada 'import' feito daqui em diante.
+    Deve ser chamado antes dos demais imports do programa.
+    """
+    global _inicio
+    _inicio = time.perf_counter()
+    builtins.__import__ = _importar_medindo
+
+
+def relatorio():
+    """
+    Lista (módulo, segundos acumulados, segundos próprios), do mais lento ao
+    mais rápido. O acumulado inclui os módulos que ele importou.
+    """
+    return sorted(((nome, t[0], t[1]) for nome, t in _tempos.items()), key=lambda x: x[1], reverse=True)
+
+
+def imprimir_relatorio(limite=20):
+    itens = relatorio()
+    print(f"[Imports] {len(itens)} módulos importados em {_total * 1000:.1f} ms; "
+          f"os {min(limite, len(itens))} mais lentos (acumulado / próprio):")
+    for nome, acumulado, proprio in itens[:limite]:
+        print(f"[Imports]   {nome:<40} {acumulado * 1000:8.1f} ms / {proprio * 1000:7.1f} ms")
+    if _inicio is not None:
+        print(f"[Imports] Tempo desde o início do programa: {(time.perf_counter() - _inicio) * 1000:.1f} ms")
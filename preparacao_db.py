@@ -0,0 +1,128 @@
+# preparacao_db.py
+
+import threading
+from carregadores import BACKEND_PADRAO
+from database import conectar_db, criar_pool_db
+from tabelas import TABELA_STAGING, criar_tabela_staging
+import metricas
+
+
+class PreparacaoBanco:
+    """
+    Prepara o banco em segundo plano enquanto o servidor do PlugPharma processa
+    a exportação: valida a conexão, cria a staging vazia e aquece o pool de
+    conexões. Depois do download, 'processar_csv_para_db' recebe tudo pronto
+    via 'entregar'.
+    """
+
+    def __init__(self, db_config, carga_config):
+        self.db_config = db_config
+        self.carga_config = carga_config
+        self.conexao = None
+        self.pool = None
+        self.staging_criada = False
+        self.erro = None
+        self._thread = None
+        # 'fechar' pode ser chamado com a thread ainda rodando: quem terminar por último libera os recursos
+        self._trava = threading.Lock()
+        self._terminou = False
+        self._descartada = False
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._preparar, name="preparacao_db", daemon=True)
+        self._thread.start()
+        print("[DB] Preparando o banco em paralelo com a exportação...")
+        return self
+
+    def _preparar(self):
+        backend = self.carga_config.get("backend", BACKEND_PADRAO)
+        local_infile = (backend == "load_data")
+        workers = int(self.carga_config.get("workers", 1))
+        # Incremental usa a tabela principal; checkpoint pode retomar a staging existente
+        carga_completa = (
+            self.carga_config.get("modo", "completo") != "incremental"
+            and not self.carga_config.get("checkpoint", False)
+        )
+        try:
+            with metricas.etapa("preparacao_banco"):
+                self.conexao = conectar_db(self.db_config, local_infile=local_infile)
+                if not self.conexao:
+                    raise Exception("Conexão com o banco de dados falhou.")
+                cursor = self.conexao.cursor()
+                cursor.execute("SELECT 1")
+                cursor.fetchall()
+                if carga_completa:
+                    criar_tabela_staging(cursor)
+                    self.conexao.commit()
+                    self.staging_criada = True
+                    print(f"[DB] Tabela {TABELA_STAGING} criada antecipadamente.")
+                cursor.close()
+                if carga_completa and workers > 1:
+                    self.pool = criar_pool_db(self.db_config, workers, local_infile=local_infile)
+            print("[DB] Banco pronto para a carga.")
+        except Exception as e:
+            self.erro = e
+            print(f"[DB] Aviso: preparação antecipada do banco falhou ({e}). A carga vai conectar normalmente.")
+            # A conexão pode ter sido aberta antes da falha (ex.: no criar_pool_db)
+            self._liberar()
+        finally:
+            with self._trava:
+                self._terminou = True
+                descartada = self._descartada
+            if descartada:
+                self._liberar()
+
+    def aguardar(self, timeout_segundos=None):
+        """
+        Espera a preparação terminar. Retorna True se ela deu certo.
+        """
+        if self._thread:
+            self._thread.join(timeout_segundos)
+            if self._thread.is_alive():
+                print("[DB] Aviso: a preparação do banco ainda não terminou. Ignorando.")
+                return False
+        return self.erro is None and self.conexao is not None
+
+    def entregar(self):
+        """
+        Passa a conexão, o pool e o estado da staging para quem vai carregar
+        (que passa a ser responsável por fechá-los). Se a conexão caiu durante
+        a espera, ela é descartada e a carga conecta de novo.
+        Retorna (conexao, pool, staging_criada).
+        """
+        conexao, pool = self.conexao, self.pool
+        self.conexao = self.pool = None
+        if conexao:
+            try:
+                conexao.ping()
+            except Exception as e:
+                print(f"[DB] Aviso: a conexão preparada caiu durante a espera ({e}). Reconectando.")
+                try:
+                    conexao.close()
+                except Exception:
+                    pass
+                conexao = None
+        return conexao, pool, self.staging_criada
+
+    def _liberar(self):
+        pool, conexao = self.pool, self.conexao
+        self.conexao = self.pool = None
+        for recurso in (pool, conexao):
+            if recurso:
+                try:
+                    recurso.close()
+                except Exception as e:
+                    print(f"[DB] Aviso: erro ao fechar recurso da preparação ({e}).")
+
+    def fechar(self):
+        """
+        Libera o que foi preparado e não foi entregue (download falhou, carga
+        pulada ou preparação que não terminou a tempo). Não espera a thread:
+        se ela ainda estiver rodando, ela mesma libera tudo ao terminar.
+        Depois de 'entregar', não há nada a liberar.
+        """
+        with self._trava:
+            self._descartada = True
+            terminou = self._terminou or self._thread is None
+        if terminou:
+            self._liberar()
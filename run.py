@@ -1,35 +1,61 @@
 # run.py
 
-import argparse
 import sys
+
+# --profile-imports precisa ser ligado antes de qualquer outro import
+PERFIL_IMPORTS = "--profile-imports" in sys.argv
+if PERFIL_IMPORTS:
+    import perfil_imports
+    perfil_imports.instalar()
+
+import argparse
+import hashlib
+import re
 import os # <-- IMPORTADO
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime # <-- IMPORTADO
-from aut_pp_produtos import PlugPharmaAutomator
 from utils import carregar_config
+import manifesto
+import metricas
+
+# Os módulos pesados são importados só pelo comando que os usa: selenium e
+# webdriver-manager (aut_pp_produtos) no 'extract', pandas e mariadb
+# (database, snapshots) no 'load'. O 'verify' não usa nenhum deles.
+COMANDOS = ("all", "extract", "load", "verify", "rollback")
 
-try:
-    # A função agora espera o caminho do arquivo
-    from database import processar_csv_para_db as executar_script_database
-except ImportError:
-    print("[run.py] ERRO: Não foi possível importar 'processar_csv_para_db' do 'database.py'.")
-    print("[run.py] Verifique se 'database.py' existe e tem a função 'processar_csv_para_db(caminho_do_arquivo)'.")
-    sys.exit(1)
+
+def importar_database():
+    try:
+        import database
+        return database
+    except ImportError as e:
+        print(f"[run.py] ERRO: Não foi possível importar o 'database.py': {e}")
+        print("[run.py] Verifique se 'database.py' existe e se as dependências (pandas, mariadb) estão instaladas.")
+        finalizar(1)
 
 
-def executar_automacao_produtos(dev_mode=False):
+@metricas.medir("extracao")
+def executar_automacao_produtos(dev_mode=False, login_cfg=None, navegador_cfg=None, pasta_downloads=None, nome_arquivo=None):
     """
     Executa a automação de extração de produtos. Retorna o caminho do arquivo renomeado.
+    Sem 'login_cfg' / 'navegador_cfg', usa as seções 'login' e 'navegador' do config.json.
     """
     print("--- Iniciando 'aut_pp_produtos' ---")
     config = carregar_config()
-    login_cfg = config.get("login")
+    login_cfg = login_cfg or config.get("login")
     if not login_cfg:
         print("[run.py] Erro: Seção 'login' não encontrada no config.json")
         return None # Retorna None em caso de erro
 
     caminho_arquivo_final = None # Inicializa
     try:
-        automator = PlugPharmaAutomator(login_cfg, dev_mode=dev_mode)
+        from aut_pp_produtos import PlugPharmaAutomator
+        if navegador_cfg is None:
+            navegador_cfg = config.get("navegador", {})
+        automator = PlugPharmaAutomator(
+            login_cfg, dev_mode=dev_mode, navegador_config=navegador_cfg,
+            pasta_downloads=pasta_downloads, nome_arquivo=nome_arquivo
+        )
         caminho_arquivo_final = automator.executar_extracao() # Deve retornar o caminho renomeado
 
         if caminho_arquivo_final:
@@ -45,62 +71,571 @@ def executar_automacao_produtos(dev_mode=False):
         return None
 
 
-# --- Bloco Principal de Execução ---
-if __name__ == "__main__":
+@metricas.medir("snapshot")
+def gerar_snapshot(caminho_arquivo_csv, data_str):
+    """
+    Converte o CSV do dia em snapshot Parquet, se 'snapshots.ativo' estiver ligado
+    no config.json. Uma falha aqui não impede a carga no banco.
+    """
+    snap_cfg = carregar_config().get("snapshots", {})
+    if not snap_cfg.get("ativo", False):
+        return None
+    import snapshots
+    pasta = snap_cfg.get("pasta", snapshots.PASTA_SNAPSHOTS_PADRAO)
+    if os.path.exists(snapshots.caminho_snapshot(data_str, pasta)):
+        print(f"[run.py] Snapshot de {data_str} já existe.")
+        return None
+    try:
+        return snapshots.criar_snapshot(
+            caminho_arquivo_csv, data_str, pasta,
+            int(snap_cfg.get("manter_dias", snapshots.MANTER_DIAS_PADRAO))
+        )
+    except Exception as e:
+        print(f"[run.py] Aviso: não foi possível gerar o snapshot Parquet: {e}")
+        return None
 
-    parser = argparse.ArgumentParser(description="Orquestrador de automações.")
-    parser.add_argument(
-        "--dev",
-        action="store_true",
-        help="Executa os robôs em modo visível (não-headless) para depuração."
-    )
-    args = parser.parse_args()
 
-    print("--- Iniciando 'run.py' ---")
+def criar_coletor_indice():
+    """
+    Coletor que guarda as colunas do índice de códigos de barras durante a
+    carga (ver indice_barras.ColetorIndice), ou None se o índice estiver desligado.
+    """
+    if not carregar_config().get("indice_barras", {}).get("ativo", False):
+        return None
+    import indice_barras
+    return indice_barras.ColetorIndice()
+
+
+@metricas.medir("indice_barras")
+def gerar_indice_barras(caminho_arquivo, somente_se_faltar=False, coletor=None):
+    """
+    Gera o índice de códigos de barras (ver indice_barras.py), se
+    'indice_barras.ativo' estiver ligado no config.json. Com o 'coletor' da
+    carga, usa os dados que ela já transformou; sem ele, lê e transforma o
+    arquivo carregado. Uma falha aqui não desfaz a carga no banco.
+    """
+    indice_cfg = carregar_config().get("indice_barras", {})
+    if not indice_cfg.get("ativo", False):
+        return None
+    import indice_barras
+    caminho = indice_cfg.get("caminho", indice_barras.CAMINHO_PADRAO)
+    if somente_se_faltar and os.path.exists(caminho):
+        return None
+    try:
+        if coletor is not None:
+            print("[run.py] Gerando o índice de códigos de barras com os dados da carga...")
+            coletor.gerar(caminho)
+        else:
+            indice_barras.gerar_indice_do_arquivo(caminho_arquivo, caminho)
+        return caminho
+    except Exception as e:
+        print(f"[run.py] Aviso: não foi possível gerar o índice de códigos de barras: {e}")
+        return None
+
+
+def iniciar_preparacao_banco():
+    """
+    No modo concorrente ('orquestracao.concorrente' no config.json), começa a
+    preparar o banco em segundo plano enquanto o robô espera a exportação.
+    Retorna o objeto da preparação, ou None fora do modo concorrente.
+    """
+    config = carregar_config()
+    if not config.get("orquestracao", {}).get("concorrente", False) or destino_local():
+        return None
+    db_cfg = config.get("dbDrogamais")
+    if not db_cfg:
+        return None
+    # Importado aqui: só o modo concorrente precisa dele
+    from preparacao_db import PreparacaoBanco
+    return PreparacaoBanco(db_cfg, config.get("carga", {})).iniciar()
+
+
+def bases_multibase(config):
+    """
+    Lista (nome, login) das bases do modo multi-base. Cada item de
+    'multibase.logins' é combinado com a seção 'login' (URLs em comum) e
+    precisa ter um 'base' único, que identifica as linhas no banco.
+    """
+    login_padrao = config.get("login", {})
+    bases = []
+    for item in config.get("multibase", {}).get("logins", []):
+        login = dict(login_padrao, **item)
+        nome = login.get("base")
+        if not nome or len(nome) > 50:
+            raise ValueError(f"Login do multi-base sem 'base' válido (até 50 caracteres): {item.get('username')}")
+        if nome in [b[0] for b in bases]:
+            raise ValueError(f"Base repetida no multi-base: '{nome}'")
+        bases.append((nome, login))
+    if not bases:
+        raise ValueError("Modo multi-base ativo, mas 'multibase.logins' está vazio.")
+    return bases
+
+
+def arquivos_multibase(config, hoje_str):
+    """
+    Caminho do CSV de hoje de cada base do multi-base: {nome da base: caminho}.
+    """
+    arquivos = {}
+    for nome, _ in bases_multibase(config):
+        # O nome da base também vira nome de pasta e de arquivo
+        nome_seguro = re.sub(r"[^\w-]", "_", nome)
+        arquivos[nome] = os.path.join(os.getcwd(), "downloads", nome_seguro, f"{hoje_str}_{nome_seguro}_produtos.csv")
+    return arquivos
+
+
+def hash_multibase(arquivos):
+    """
+    O conjunto de bases é identificado no manifesto pelo hash dos hashes.
+    Retorna (sha256 do conjunto, bytes somados).
+    """
+    combinado = hashlib.sha256()
+    tamanho_total = 0
+    for nome, caminho in arquivos.items():
+        sha256_base, tamanho = manifesto.calcular_hash_arquivo(caminho)
+        combinado.update(f"{nome}:{sha256_base}\n".encode("utf-8"))
+        tamanho_total += tamanho
+    return combinado.hexdigest(), tamanho_total
+
+
+def extrair_multibase(args):
+    """
+    Baixa o CSV de cada base com até 'multibase.workers' navegadores headless
+    ao mesmo tempo, cada um com a sua pasta de downloads e o seu perfil.
+    Arquivos de hoje que já existem não são baixados de novo.
+    Retorna o código de saída.
+    """
+    config = carregar_config()
+    hoje_str = datetime.now().strftime('%Y-%m-%d')
+    try:
+        bases = bases_multibase(config)
+        arquivos = arquivos_multibase(config, hoje_str)
+    except ValueError as e:
+        print(f"[run.py] ERRO: {e}")
+        return 1
+    workers = max(1, int(config.get("multibase", {}).get("workers", 2)))
+    navegador_cfg = config.get("navegador", {})
+    perfil_raiz = navegador_cfg.get("perfil_dir", "perfil_chrome")
+
+    pendentes = []
+    for nome, login in bases:
+        if os.path.exists(arquivos[nome]):
+            print(f"[run.py] Base '{nome}': arquivo de hoje já existe. Pulando o download.")
+            continue
+        pasta, nome_arquivo = os.path.split(arquivos[nome])
+        cfg_base = dict(navegador_cfg, perfil_dir=os.path.join(perfil_raiz, os.path.basename(pasta)))
+        pendentes.append((nome, login, cfg_base, pasta, nome_arquivo))
+    if not pendentes:
+        return 0
+
+    try:
+        from aut_pp_produtos import resolver_chromedriver
+        # Resolve o chromedriver uma vez, antes de abrir os navegadores em paralelo
+        caminho_driver = resolver_chromedriver(navegador_cfg)
+    except Exception as e:
+        print(f"[run.py] ERRO: não foi possível obter o chromedriver: {e}")
+        return 1
+    print(f"[run.py] Baixando {len(pendentes)} bases com até {workers} navegadores ao mesmo tempo...")
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="base") as executor:
+        futuros = {
+            nome: executor.submit(
+                executar_automacao_produtos, args.dev, login,
+                dict(cfg_base, chromedriver_path=caminho_driver), pasta, nome_arquivo
+            )
+            for nome, login, cfg_base, pasta, nome_arquivo in pendentes
+        }
+    falhas = [nome for nome, futuro in futuros.items() if futuro.result() != os.path.abspath(arquivos[nome])]
+    if falhas:
+        print(f"[run.py] ERRO: o download falhou nas bases: {', '.join(falhas)}.")
+        print("[run.py] Os arquivos das outras bases foram mantidos; a próxima execução baixa só as que faltam.")
+        return 1
+    return 0
+
+
+def carregar_multibase(args):
+    """
+    Carrega os CSVs de hoje de todas as bases juntos, marcados pela coluna
+    'base', e registra o conjunto no manifesto. Retorna o código de saída.
+    """
+    config = carregar_config()
+    hoje_str = datetime.now().strftime('%Y-%m-%d')
+    try:
+        arquivos = arquivos_multibase(config, hoje_str)
+    except ValueError as e:
+        print(f"[run.py] ERRO: {e}")
+        return 1
+    if args.snapshot or args.arquivo:
+        print("[run.py] Aviso: --snapshot e --arquivo não são suportados no modo multi-base. Ignorando.")
+    faltando = [nome for nome, caminho in arquivos.items() if not os.path.exists(caminho)]
+    if faltando:
+        print(f"[run.py] ERRO: arquivo de hoje não encontrado para as bases: {', '.join(faltando)}.")
+        return 1
+
+    manifesto_cargas = manifesto.carregar_manifesto()
+    with metricas.etapa("hash_arquivo"):
+        sha256_conjunto, tamanho_total = hash_multibase(arquivos)
+        metricas.anotar(bytes=tamanho_total)
+    print(f"[run.py] SHA-256 do conjunto de {len(arquivos)} bases: {sha256_conjunto} ({tamanho_total} bytes)")
+    if manifesto.arquivo_ja_carregado(sha256_conjunto, manifesto_cargas) and not args.forcar_carga:
+        carga = manifesto.carga_atual(manifesto_cargas)
+        print(f"[run.py] Estas bases já foram carregadas (geração {carga['geracao']}, em {carga['carregado_em']}).")
+        print("[run.py] Pulando 'database.py'. Use --forcar-carga para carregar mesmo assim.")
+        return 0
+
+    database = importar_database()
+    registro = None
+    try:
+        with metricas.etapa("banco"):
+            resultado_carga = database.processar_multibase_para_db(arquivos)
+            metricas.anotar(linhas=resultado_carga.get("linhas_inseridas"))
+        resultado_carga["arquivos"] = {nome: os.path.basename(caminho) for nome, caminho in arquivos.items()}
+        registro = manifesto.registrar_carga(
+            manifesto_cargas, f"{hoje_str}_multibase", sha256_conjunto, tamanho_total, resultado_carga
+        )
+        print(f"[run.py] Carga registrada no manifesto (geração {registro['geracao']}).")
+        print("[run.py] Carga multi-base finalizada com sucesso.")
+        return 0
+    except Exception as e:
+        print(f"\n[run.py] ERRO FATAL durante a carga multi-base: {e}")
+        proximo_passo_falha(registro)
+        return 1
+
+
+def destino_local():
+    """
+    True quando 'carga.destino' é um destino local (sqlite, duckdb, parquet)
+    em vez do MariaDB de produção.
+    """
+    return carregar_config().get("carga", {}).get("destino", "mariadb") != "mariadb"
+
 
-    # --- LÓGICA DE VERIFICAÇÃO DO ARQUIVO ---
-    pasta_downloads = os.path.join(os.getcwd(), "downloads")
+def caminho_arquivo_hoje():
+    """
+    (data de hoje, caminho esperado do CSV de hoje em 'downloads').
+    """
     hoje_str = datetime.now().strftime('%Y-%m-%d')
     nome_arquivo_esperado = f"{hoje_str}_produtos.csv" # Formato alterado
-    caminho_arquivo_hoje = os.path.join(pasta_downloads, nome_arquivo_esperado)
+    return hoje_str, os.path.join(os.getcwd(), "downloads", nome_arquivo_esperado)
 
-    caminho_arquivo_usar = None # Variável para guardar o caminho a ser usado no DB
-    sucesso_etapa_anterior = False # Flag para saber se podemos ir para o DB
 
+def extrair(args, preparar_banco=False):
+    """
+    Garante o CSV de hoje: usa o arquivo se ele já existe ou roda o robô.
+    Com 'preparar_banco' (comando 'all'), o banco é preparado em paralelo com a
+    exportação no modo concorrente. Retorna (caminho do CSV ou None, preparação).
+    """
+    _, caminho_hoje = caminho_arquivo_hoje()
+    nome_arquivo_esperado = os.path.basename(caminho_hoje)
     print(f"[run.py] Verificando se o arquivo de hoje já existe: {nome_arquivo_esperado}")
-    if os.path.exists(caminho_arquivo_hoje):
+    if os.path.exists(caminho_hoje):
         print(f"[run.py] Arquivo encontrado! Pulando etapa de download.")
-        caminho_arquivo_usar = caminho_arquivo_hoje
-        sucesso_etapa_anterior = True # Consideramos sucesso, pois temos o arquivo
-    else:
-        print("[run.py] Arquivo de hoje não encontrado. Iniciando processo de download...")
-        caminho_arquivo_usar = executar_automacao_produtos(dev_mode=args.dev)
-        if caminho_arquivo_usar:
-            # Verifica se o arquivo renomeado tem o nome esperado (segurança extra)
-            if os.path.basename(caminho_arquivo_usar) == nome_arquivo_esperado:
-                sucesso_etapa_anterior = True
-            else:
-                print(f"[run.py] ERRO: O arquivo baixado foi renomeado para '{os.path.basename(caminho_arquivo_usar)}' em vez de '{nome_arquivo_esperado}'.")
-                sucesso_etapa_anterior = False
-                caminho_arquivo_usar = None # Não usar o arquivo com nome errado
-        else:
-            sucesso_etapa_anterior = False
+        return caminho_hoje, None
 
+    print("[run.py] Arquivo de hoje não encontrado. Iniciando processo de download...")
+    preparacao = iniciar_preparacao_banco() if preparar_banco else None
+    caminho_arquivo = executar_automacao_produtos(dev_mode=args.dev)
+    if caminho_arquivo and os.path.basename(caminho_arquivo) != nome_arquivo_esperado:
+        # Verifica se o arquivo renomeado tem o nome esperado (segurança extra)
+        print(f"[run.py] ERRO: O arquivo baixado foi renomeado para '{os.path.basename(caminho_arquivo)}' em vez de '{nome_arquivo_esperado}'.")
+        caminho_arquivo = None # Não usar o arquivo com nome errado
+    if not caminho_arquivo and preparacao:
+        preparacao.fechar()
+        preparacao = None
+    return caminho_arquivo, preparacao
 
-    # --- CHAMADA CONDICIONAL PARA O DATABASE ---
-    if sucesso_etapa_anterior and caminho_arquivo_usar:
-        print(f"\n[run.py] Etapa anterior concluída. Iniciando 'database.py' com o arquivo: {os.path.basename(caminho_arquivo_usar)}...")
-        try:
-            executar_script_database(caminho_arquivo_usar)
-            print("\n[run.py] 'database.py' concluído com sucesso.")
-            print("[run.py] Orquestração finalizada com sucesso.")
-            sys.exit(0)
 
+def proximo_passo_falha(registro):
+    """
+    Diz ao operador o que fazer depois de uma falha no 'load': rodar o 'load'
+    de novo ou usar o 'rollback', conforme o ponto em que a carga parou.
+    'registro' é o registro do manifesto, ou None se a carga não foi registrada.
+    """
+    if registro:
+        print(f"[run.py] A carga foi concluída e registrada no manifesto (geração {registro['geracao']}); "
+              "falhou só o que vem depois dela.")
+        print("[run.py] Próximo passo: rode 'python run.py load' de novo. A carga não é repetida; "
+              "o snapshot e o índice de códigos de barras que faltarem são gerados.")
+        return
+    print("[run.py] O manifesto não registrou este arquivo como carregado.")
+    print("[run.py] Próximo passo: corrija a causa (veja os erros acima) e rode 'python run.py load' de novo "
+          "com o mesmo arquivo (no modo checkpoint, a carga continua do último bloco confirmado).")
+    print("[run.py] Não use o 'rollback' para isso: ele desfaz a carga anterior, que já estava registrada. "
+          "Use-o só se for a carga anterior que está errada.")
+
+
+def carregar(args, caminho_arquivo, preparacao=None):
+    """
+    Carrega 'caminho_arquivo' no banco, a menos que o manifesto mostre que ele
+    já é o que está carregado. Gera o snapshot Parquet e o índice de códigos de
+    barras, se configurados. Retorna o código de saída.
+    """
+    hoje_str = datetime.now().strftime('%Y-%m-%d')
+    # No modo concorrente o snapshot fica para depois da carga: a leitura começa logo após o download
+    if not args.snapshot and not preparacao:
+        gerar_snapshot(caminho_arquivo, hoje_str)
+
+    if destino_local():
+        # O manifesto descreve o MariaDB: uma carga local não o consulta nem o altera
+        print("[run.py] Destino local configurado em 'carga.destino': o manifesto não é usado.")
+        database = importar_database()
+        try:
+            with metricas.etapa("banco"):
+                resultado_carga = database.processar_csv_para_db(caminho_arquivo)
+                metricas.anotar(linhas=resultado_carga.get("linhas_inseridas"))
+            print(f"\n[run.py] Carga local concluída: {resultado_carga['tabela']}.")
+            return 0
         except Exception as e:
-            print(f"\n[run.py] ERRO FATAL durante a execução do 'database.py': {e}")
-            print("[run.py] Verifique o log e o arquivo CSV.")
-            sys.exit(1)
+            print(f"\n[run.py] ERRO FATAL durante a carga local: {e}")
+            return 1
+
+    # --- MANIFESTO: pula a carga se este arquivo já é o que está no banco ---
+    manifesto_cargas = manifesto.carregar_manifesto()
+    with metricas.etapa("hash_arquivo"):
+        sha256_arquivo, tamanho_arquivo = manifesto.calcular_hash_arquivo(caminho_arquivo)
+        metricas.anotar(bytes=tamanho_arquivo)
+    print(f"[run.py] SHA-256 do arquivo: {sha256_arquivo} ({tamanho_arquivo} bytes)")
+    if manifesto.arquivo_ja_carregado(sha256_arquivo, manifesto_cargas) and not args.forcar_carga:
+        carga = manifesto.carga_atual(manifesto_cargas)
+        print(f"[run.py] Este arquivo já foi carregado (geração {carga['geracao']}, em {carga['carregado_em']}).")
+        print("[run.py] Pulando 'database.py'. Use --forcar-carga para carregar mesmo assim.")
+        if preparacao:
+            preparacao.fechar()
+        gerar_indice_barras(caminho_arquivo, somente_se_faltar=True)
+        return 0
+
+    print(f"\n[run.py] Iniciando 'database.py' com o arquivo: {os.path.basename(caminho_arquivo)}...")
+    database = importar_database()
+    coletor_indice = criar_coletor_indice()
+    registro = None
+    try:
+        with metricas.etapa("banco"):
+            resultado_carga = database.processar_csv_para_db(
+                caminho_arquivo, sha256_arquivo, preparacao, coletor_indice
+            )
+            metricas.anotar(linhas=resultado_carga.get("linhas_inseridas"))
+        registro = manifesto.registrar_carga(
+            manifesto_cargas, caminho_arquivo, sha256_arquivo, tamanho_arquivo, resultado_carga
+        )
+        print(f"[run.py] Carga registrada no manifesto (geração {registro['geracao']}).")
+        if preparacao:
+            gerar_snapshot(caminho_arquivo, hoje_str)
+        # Uma carga retomada do checkpoint não transformou os blocos já confirmados: lê o arquivo
+        if resultado_carga.get("retomada"):
+            coletor_indice = None
+        gerar_indice_barras(caminho_arquivo, coletor=coletor_indice)
+        print("\n[run.py] 'database.py' concluído com sucesso.")
+        return 0
+
+    except Exception as e:
+        print(f"\n[run.py] ERRO FATAL durante a execução do 'database.py': {e}")
+        proximo_passo_falha(registro)
+        return 1
+
+
+def arquivo_para_carga(args):
+    """
+    Arquivo que o comando 'load' vai carregar: o snapshot de '--snapshot', o
+    '--arquivo' informado ou o CSV de hoje. Retorna None se ele não existir.
+    """
+    if args.snapshot:
+        import snapshots
+        pasta_snapshots = carregar_config().get("snapshots", {}).get("pasta", snapshots.PASTA_SNAPSHOTS_PADRAO)
+        caminho = snapshots.caminho_snapshot(args.snapshot, pasta_snapshots)
+        print(f"[run.py] Modo snapshot: usando {caminho}")
+        if not os.path.exists(caminho):
+            print(f"[run.py] ERRO: Snapshot não encontrado. Disponíveis: {', '.join(snapshots.listar_snapshots(pasta_snapshots)) or 'nenhum'}")
+            return None
+        return caminho
+    caminho = args.arquivo or caminho_arquivo_hoje()[1]
+    if not os.path.exists(caminho):
+        print(f"[run.py] ERRO: Arquivo não encontrado: {caminho}")
+        return None
+    return caminho
+
+
+def multibase_ativo():
+    return carregar_config().get("multibase", {}).get("ativo", False)
 
+
+def comando_extract(args):
+    """Só baixa o(s) CSV(s) de hoje."""
+    if multibase_ativo():
+        return extrair_multibase(args)
+    caminho_arquivo, _ = extrair(args)
+    return 0 if caminho_arquivo else 1
+
+
+def comando_load(args):
+    """Só carrega no banco um arquivo que já está no disco."""
+    if multibase_ativo():
+        return carregar_multibase(args)
+    caminho_arquivo = arquivo_para_carga(args)
+    if not caminho_arquivo:
+        return 1
+    return carregar(args, caminho_arquivo)
+
+
+def comando_verify(args):
+    """
+    Confere, sem navegador nem banco, se o CSV de hoje existe e se ele é o
+    que está carregado segundo o manifesto. Retorna 0 só nesse caso.
+    """
+    manifesto_cargas = manifesto.carregar_manifesto()
+    carga = manifesto.carga_atual(manifesto_cargas)
+    if carga:
+        print(f"[run.py] Carga atual: geração {carga['geracao']}, arquivo {carga['arquivo']}, "
+              f"{carga.get('linhas_inseridas')} linhas, em {carga['carregado_em']}.")
+    else:
+        print("[run.py] Nenhuma carga registrada no manifesto.")
+
+    if multibase_ativo():
+        try:
+            arquivos = arquivos_multibase(carregar_config(), datetime.now().strftime('%Y-%m-%d'))
+        except ValueError as e:
+            print(f"[run.py] ERRO: {e}")
+            return 1
+        faltando = [nome for nome, caminho in arquivos.items() if not os.path.exists(caminho)]
+        if faltando:
+            print(f"[run.py] Arquivo de hoje ausente para as bases: {', '.join(faltando)}.")
+            print("[run.py] Próximo passo: rode 'python run.py extract' (ou 'all') para baixar os arquivos.")
+            return 1
+        sha256_atual, _ = hash_multibase(arquivos)
+        descricao = f"os arquivos de hoje das {len(arquivos)} bases"
     else:
+        caminho_arquivo = args.arquivo or caminho_arquivo_hoje()[1]
+        if not os.path.exists(caminho_arquivo):
+            print(f"[run.py] Arquivo de hoje ausente: {caminho_arquivo}")
+            if not args.arquivo:
+                print("[run.py] Próximo passo: rode 'python run.py extract' (ou 'all') para baixar o arquivo.")
+            return 1
+        sha256_atual, _ = manifesto.calcular_hash_arquivo(caminho_arquivo)
+        descricao = f"o arquivo {os.path.basename(caminho_arquivo)}"
+
+    if manifesto.arquivo_ja_carregado(sha256_atual, manifesto_cargas):
+        print(f"[run.py] OK: {descricao} é o que está carregado.")
+        return 0
+    print(f"[run.py] Pendente: {descricao} ainda não foi carregado.")
+    opcao_arquivo = f" --arquivo {args.arquivo}" if args.arquivo else ""
+    print(f"[run.py] Próximo passo: rode 'python run.py load{opcao_arquivo}' para carregá-lo. O 'rollback' não ajuda aqui: "
+          "ele só volta a tabela para a geração anterior à carga atual.")
+    return 1
+
+
+def comando_rollback(args):
+    """
+    Volta a tabela principal para a geração anterior, sem navegador nem
+    arquivo, e atualiza o manifesto.
+    """
+    if destino_local():
+        print("[run.py] ERRO: o rollback só vale para o MariaDB ('carga.destino' está configurado como destino local).")
+        return 1
+    atual = manifesto.carga_atual(manifesto.carregar_manifesto())
+    if atual and atual.get("modo") == "incremental":
+        # A carga incremental altera a tabela no lugar: a geração anterior é de antes da última carga completa
+        print(
+            f"[run.py] ERRO: a última carga (geração {atual['geracao']}, arquivo {atual['arquivo']}) foi incremental "
+            "e não guardou geração anterior. Reverter agora descartaria também a última carga completa."
+        )
+        print("[run.py] Para voltar a tabela, rode o 'load' no modo completo com o arquivo desejado.")
+        return 1
+    database = importar_database()
+    try:
+        restantes = database.reverter_geracao()
+    except Exception as e:
+        print(f"[run.py] ERRO: não foi possível reverter a tabela: {e}")
+        return 1
+    revertida = manifesto.registrar_reversao(manifesto.carregar_manifesto())
+    if revertida:
+        print(f"[run.py] Carga revertida no manifesto: geração {revertida['geracao']}, arquivo {revertida['arquivo']}.")
+    print(f"[run.py] Tabela restaurada. Gerações anteriores restantes: {restantes}.")
+    return 0
+
+
+def comando_all(args):
+    """Fluxo completo: baixa (se preciso) e carrega."""
+    if multibase_ativo():
+        if args.snapshot:
+            print("[run.py] Aviso: --snapshot não é suportado no modo multi-base. Ignorando.")
+        codigo = extrair_multibase(args)
+        return codigo if codigo else carregar_multibase(args)
+    if args.snapshot or args.arquivo:
+        return comando_load(args)
+    caminho_arquivo, preparacao = extrair(args, preparar_banco=True)
+    if not caminho_arquivo:
         print("\n[run.py] Orquestração finalizada com falhas (Arquivo CSV não está disponível ou download/renomeação falhou).")
-        sys.exit(1)
\ No newline at end of file
+        return 1
+    return carregar(args, caminho_arquivo, preparacao)
+
+
+def finalizar(codigo_saida):
+    """
+    Grava o relatório de métricas da execução (JSON e, se configurado, o
+    arquivo do textfile collector do Prometheus) e encerra com 'codigo_saida'.
+    """
+    metricas.registro.status = "sucesso" if codigo_saida == 0 else "falha"
+    metricas_cfg = carregar_config().get("metricas", {})
+    try:
+        pasta_relatorios = metricas_cfg.get("pasta_relatorios", "relatorios")
+        if pasta_relatorios:
+            nome_relatorio = f"{datetime.now().strftime('%Y-%m-%d_%H%M%S')}_execucao.json"
+            caminho = metricas.registro.salvar_json(os.path.join(pasta_relatorios, nome_relatorio))
+            print(f"[run.py] Relatório de métricas salvo em: {caminho}")
+        textfile = metricas_cfg.get("prometheus_textfile")
+        if textfile:
+            metricas.registro.salvar_prometheus(textfile)
+            print(f"[run.py] Métricas do Prometheus salvas em: {textfile}")
+    except Exception as e:
+        print(f"[run.py] Aviso: não foi possível salvar o relatório de métricas: {e}")
+    if PERFIL_IMPORTS:
+        perfil_imports.imprimir_relatorio()
+    sys.exit(codigo_saida)
+
+
+# --- Bloco Principal de Execução ---
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Orquestrador de automações.")
+    parser.add_argument(
+        "comando",
+        nargs="?",
+        choices=COMANDOS,
+        default="all",
+        help="'extract' só baixa, 'load' só carrega o arquivo já baixado, 'verify' confere se o "
+             "arquivo de hoje está carregado, 'rollback' restaura a geração anterior da tabela e "
+             "'all' (padrão) faz o fluxo completo."
+    )
+    parser.add_argument(
+        "--dev",
+        action="store_true",
+        help="Executa os robôs em modo visível (não-headless) para depuração."
+    )
+    parser.add_argument(
+        "--forcar-carga",
+        action="store_true",
+        help="Carrega o CSV no banco mesmo que o manifesto indique que ele já foi carregado."
+    )
+    parser.add_argument(
+        "--snapshot",
+        metavar="AAAA-MM-DD",
+        help="Recarrega o banco a partir do snapshot Parquet dessa data, sem baixar nada."
+    )
+    parser.add_argument(
+        "--arquivo",
+        metavar="CAMINHO",
+        help="Nos comandos 'load' e 'verify', usa este CSV em vez do arquivo de hoje."
+    )
+    parser.add_argument(
+        "--profile-imports",
+        action="store_true",
+        help="Mostra no final o tempo de importação de cada módulo."
+    )
+    args = parser.parse_args()
+
+    print(f"--- Iniciando 'run.py' ({args.comando}) ---")
+    comandos = {
+        "all": comando_all, "extract": comando_extract, "load": comando_load, "verify": comando_verify,
+        "rollback": comando_rollback,
+    }
+    codigo_saida = comandos[args.comando](args)
+    if codigo_saida == 0:
+        print("[run.py] Orquestração finalizada com sucesso.")
+    finalizar(codigo_saida)
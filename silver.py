@@ -0,0 +1,153 @@
+# silver.py
+
+import pandas as pd
+import geracoes
+from carregadores import criar_carregador
+from checkpoint import contar_linhas, tabela_existe
+from transformacao import COLUNAS_DB_TODAS
+
+# Colunas de texto repetidas (baixa cardinalidade) que viram tabelas de dimensão
+COLUNAS_DIMENSAO = ["fabricante", "tipo_produto", "grupo_principal", "ncm_descricao", "substancia_nome", "farmacologico"]
+TABELA_FATO = "silver_plugpharma_produtos"
+SUFIXO_STAGING = "_staging"
+
+# Fato: as colunas do bronze, trocando cada coluna de dimensão pela sua chave
+COLUNAS_FATO = [f"{c}_id" if c in COLUNAS_DIMENSAO else c for c in COLUNAS_DB_TODAS]
+
+TIPOS_FATO = {
+    "codigo_interno": "VARCHAR(14)", "codigo_barras": "VARCHAR(14)",
+    "codigo_barras_normalizado": "VARCHAR(14)", "codigo_principal": "TINYINT",
+    "descricao": "VARCHAR(255)", "apresentacao": "VARCHAR(255)", "produto": "VARCHAR(255)", "status": "VARCHAR(20)",
+    "codigo_fabricante": "VARCHAR(50)", "cnpj_fabricante": "VARCHAR(20)",
+    "codigo_tipo_produto": "VARCHAR(50)", "codigo_grupo_principal": "VARCHAR(50)",
+    "ncm": "VARCHAR(20)", "preco_controlado": "VARCHAR(10)",
+    "codigo_ms": "VARCHAR(255)", "portaria": "TEXT", "forma_apresentacao": "TEXT",
+    "codigo_unidade_medida": "VARCHAR(50)", "fracao": "VARCHAR(50)", "concentracao": "TEXT",
+    "data_cadastro": "DATETIME", "ultima_alteracao": "DATETIME", "associado": "TEXT",
+    "data_insercao": "DATETIME",
+}
+
+
+def tabela_dimensao(coluna):
+    return f"silver_plugpharma_dim_{coluna}"
+
+
+def codificar_dimensoes(df_transformado):
+    """
+    Interna os valores das colunas de dimensão (codificação por dicionário).
+    Retorna (fato, dimensoes): o fato com as colunas '<coluna>_id' no lugar do
+    texto e, para cada coluna, um DataFrame (id, valor) com chaves a partir de 1,
+    atribuídas em ordem alfabética.
+    """
+    fato = pd.DataFrame(index=df_transformado.index)
+    dimensoes = {}
+    for col in COLUNAS_DB_TODAS:
+        if col not in COLUNAS_DIMENSAO:
+            fato[col] = df_transformado[col]
+            continue
+        codigos, valores = pd.factorize(df_transformado[col], sort=True, use_na_sentinel=False)
+        fato[f"{col}_id"] = codigos + 1
+        dimensoes[col] = pd.DataFrame({"id": range(1, len(valores) + 1), col: valores})
+    return fato[COLUNAS_FATO], dimensoes
+
+
+def _criar_tabelas_staging(cursor):
+    for col in COLUNAS_DIMENSAO:
+        staging = tabela_dimensao(col) + SUFIXO_STAGING
+        cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+        cursor.execute(f"CREATE TABLE {staging} (id INT UNSIGNED PRIMARY KEY, {col} TEXT) CHARSET=utf8mb4")
+
+    staging = TABELA_FATO + SUFIXO_STAGING
+    definicoes = ", ".join(
+        f"{c} INT UNSIGNED" if c.endswith("_id") else f"{c} {TIPOS_FATO[c]}" for c in COLUNAS_FATO
+    )
+    cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+    cursor.execute(f"CREATE TABLE {staging} ({definicoes}) CHARSET=utf8mb4")
+
+
+def _criar_indices_fato(cursor):
+    # Como no bronze: índices criados depois da carga, em um único ALTER TABLE
+    staging = TABELA_FATO + SUFIXO_STAGING
+    indices = [
+        "ADD INDEX idx_cod_barras_norm (codigo_barras_normalizado)",
+        "ADD INDEX idx_cod_interno (codigo_interno)",
+    ] + [f"ADD INDEX idx_{col} ({col}_id)" for col in COLUNAS_DIMENSAO]
+    cursor.execute(f"ALTER TABLE {staging} {', '.join(indices)}")
+
+
+def _verificar_staging(cursor, linhas_bronze):
+    linhas = contar_linhas(cursor, TABELA_FATO + SUFIXO_STAGING)
+    if linhas != linhas_bronze:
+        raise Exception(
+            f"Verificação falhou: a staging de {TABELA_FATO} tem {linhas} linhas e a do bronze {linhas_bronze}."
+        )
+
+
+def tabelas_silver():
+    return [tabela_dimensao(col) for col in COLUNAS_DIMENSAO] + [TABELA_FATO]
+
+
+def acompanhantes_promocao():
+    """
+    (tabela, staging) da silver. Entram no mesmo RENAME TABLE da troca do
+    bronze e guardam gerações com a mesma numeração (ver geracoes.promover),
+    então quem lê nunca encontra o bronze de uma carga com a silver de outra.
+    """
+    return [(tabela, tabela + SUFIXO_STAGING) for tabela in tabelas_silver()]
+
+
+def _data_carga(cursor, tabela):
+    # Todas as linhas de uma carga têm o mesmo data_insercao, no bronze e na silver
+    cursor.execute(f"SELECT MAX(data_insercao) FROM {tabela}")
+    return cursor.fetchone()[0]
+
+
+def tabelas_para_reverter(cursor, tabela_bronze):
+    """
+    Tabelas da silver que o rollback restaura junto com o bronze: a geração
+    anterior da silver, se ela for da mesma carga que a geração anterior do
+    bronze (mesmo data_insercao), ou nenhuma, se a silver no ar já for dessa
+    carga (ou não existir). Fora isso, levanta exceção: reverter só o bronze
+    deixaria as duas camadas com dados de cargas diferentes.
+    """
+    if not tabela_existe(cursor, TABELA_FATO):
+        return []
+    data_bronze = _data_carga(cursor, geracoes.tabela_geracao(tabela_bronze, 1))
+    if _data_carga(cursor, TABELA_FATO) == data_bronze:
+        return []
+    tabelas = tabelas_silver()
+    anteriores = [geracoes.tabela_geracao(tabela, 1) for tabela in tabelas]
+    if (all(tabela_existe(cursor, anterior) for anterior in anteriores)
+            and _data_carga(cursor, anteriores[-1]) == data_bronze):
+        return tabelas
+    raise Exception(
+        f"A camada silver não tem geração anterior da mesma carga que {geracoes.tabela_geracao(tabela_bronze, 1)}: "
+        "reverter só o bronze deixaria as camadas com dados de cargas diferentes. "
+        "Para voltar as duas, rode o 'load' completo (com 'carga.silver' ligado) com o arquivo desejado."
+    )
+
+
+def carregar_silver(cursor, df_transformado, backend):
+    """
+    Carrega as stagings da camada silver a partir do DataFrame já transformado
+    do bronze: uma tabela de dimensão (id, valor) por coluna de COLUNAS_DIMENSAO
+    e a tabela fato 'silver_plugpharma_produtos', que guarda só as chaves.
+    Confere o fato com o bronze, mas não publica nada: a troca é feita junto
+    com a do bronze (ver 'acompanhantes_promocao'). Retorna as contagens carregadas.
+    """
+    fato, dimensoes = codificar_dimensoes(df_transformado)
+    _criar_tabelas_staging(cursor)
+
+    contagens = {}
+    for col, dimensao in dimensoes.items():
+        staging = tabela_dimensao(col) + SUFIXO_STAGING
+        carregador = criar_carregador(backend, cursor, staging, ["id", col])
+        contagens[f"dim_{col}"] = carregador.carregar(carregador.preparar(dimensao))
+        print(f"[Silver] {tabela_dimensao(col)}: {len(dimensao)} valores distintos")
+
+    carregador = criar_carregador(backend, cursor, TABELA_FATO + SUFIXO_STAGING, COLUNAS_FATO)
+    contagens["fato"] = carregador.carregar(carregador.preparar(fato))
+    _criar_indices_fato(cursor)
+    _verificar_staging(cursor, len(df_transformado))
+    print(f"[Silver] {TABELA_FATO}: {contagens['fato']} linhas na staging")
+    return contagens
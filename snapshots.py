@@ -0,0 +1,135 @@
+# snapshots.py
+
+import os
+import re
+import shutil
+from datetime import datetime
+import pandas as pd
+from transformacao import COLUNAS_CSV_NECESSARIAS, COLUNAS_DATA, FORMATO_DATA_BR, normalizar_coluna
+from utils import detectar_encoding
+
+PASTA_SNAPSHOTS_PADRAO = "snapshots"
+MANTER_DIAS_PADRAO = 7
+NOME_ARQUIVO = "produtos.parquet"
+LINHAS_POR_GRUPO = 100000
+PADRAO_PARTICAO = re.compile(r"^data=(\d{4}-\d{2}-\d{2})$")
+
+
+def _importar_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        return pa, pq
+    except ImportError:
+        raise ImportError("O pacote 'pyarrow' é necessário para os snapshots Parquet (pip install pyarrow).")
+
+
+def caminho_snapshot(data_str, pasta=PASTA_SNAPSHOTS_PADRAO):
+    """
+    Caminho do snapshot de uma data ('AAAA-MM-DD'), particionado por data.
+    """
+    return os.path.join(pasta, f"data={data_str}", NOME_ARQUIVO)
+
+
+def _tipar_bloco(bloco):
+    # Cabeçalho normalizado como no preparar_dataframe; datas viram timestamp e o resto continua texto
+    bloco = bloco.rename(columns=normalizar_coluna)
+    for col in COLUNAS_DATA:
+        if col in bloco.columns:
+            bloco[col] = pd.to_datetime(bloco[col], format=FORMATO_DATA_BR, errors='coerce')
+    return bloco
+
+
+def criar_snapshot(caminho_arquivo_csv, data_str=None, pasta=PASTA_SNAPSHOTS_PADRAO,
+                   manter_dias=MANTER_DIAS_PADRAO):
+    """
+    Converte o CSV exportado em um snapshot Parquet (zstd), com as datas já
+    tipadas, em 'pasta/data=AAAA-MM-DD/produtos.parquet'. O CSV é lido em
+    blocos, então a memória não cresce com o tamanho do arquivo.
+    Depois apaga os snapshots mais antigos, mantendo os últimos 'manter_dias'.
+    Retorna o caminho do snapshot.
+    """
+    pa, pq = _importar_pyarrow()
+    data_str = data_str or datetime.now().strftime('%Y-%m-%d')
+    destino = caminho_snapshot(data_str, pasta)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    temporario = f"{destino}.tmp"
+
+    encoding, _ = detectar_encoding(caminho_arquivo_csv)
+    print(f"[Snapshot] Convertendo '{os.path.basename(caminho_arquivo_csv)}' ({encoding}) para Parquet...")
+
+    escritor = None
+    linhas = 0
+    try:
+        leitor = pd.read_csv(
+            caminho_arquivo_csv, sep=';', encoding=encoding, dtype=str, chunksize=LINHAS_POR_GRUPO
+        )
+        with leitor:
+            for bloco in leitor:
+                tabela = pa.Table.from_pandas(_tipar_bloco(bloco), preserve_index=False)
+                if escritor is None:
+                    # O esquema do primeiro bloco vale para o arquivo todo
+                    esquema = pa.schema([
+                        pa.field(campo.name, pa.timestamp('us') if campo.name in COLUNAS_DATA else pa.string())
+                        for campo in tabela.schema
+                    ])
+                    escritor = pq.ParquetWriter(temporario, esquema, compression='zstd')
+                escritor.write_table(tabela.cast(esquema))
+                linhas += len(bloco)
+    except Exception:
+        if escritor:
+            escritor.close()
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+    if escritor is None:
+        raise ValueError(f"O arquivo '{caminho_arquivo_csv}' não tem linhas para o snapshot.")
+    escritor.close()
+    os.replace(temporario, destino)
+
+    tamanho_csv = os.path.getsize(caminho_arquivo_csv)
+    tamanho_parquet = os.path.getsize(destino)
+    print(f"[Snapshot] {linhas} linhas gravadas em {destino} ({tamanho_csv} -> {tamanho_parquet} bytes)")
+
+    limpar_snapshots_antigos(pasta, manter_dias)
+    return destino
+
+
+def listar_snapshots(pasta=PASTA_SNAPSHOTS_PADRAO):
+    """
+    Datas ('AAAA-MM-DD') com snapshot disponível, da mais antiga para a mais nova.
+    """
+    if not os.path.isdir(pasta):
+        return []
+    datas = []
+    for nome in os.listdir(pasta):
+        particao = PADRAO_PARTICAO.match(nome)
+        if particao and os.path.exists(os.path.join(pasta, nome, NOME_ARQUIVO)):
+            datas.append(particao.group(1))
+    return sorted(datas)
+
+
+def limpar_snapshots_antigos(pasta=PASTA_SNAPSHOTS_PADRAO, manter_dias=MANTER_DIAS_PADRAO):
+    datas = listar_snapshots(pasta)
+    for data_str in datas[:-manter_dias] if manter_dias > 0 else []:
+        print(f"[Snapshot] Removendo snapshot antigo: {data_str}")
+        shutil.rmtree(os.path.join(pasta, f"data={data_str}"), ignore_errors=True)
+
+
+def ler_snapshot(caminho_parquet, colunas=COLUNAS_CSV_NECESSARIAS):
+    """
+    Lê o snapshot inteiro, apenas com as colunas pedidas.
+    """
+    _, pq = _importar_pyarrow()
+    return pq.read_table(caminho_parquet, columns=colunas).to_pandas()
+
+
+def ler_snapshot_em_blocos(caminho_parquet, linhas_por_bloco, colunas=COLUNAS_CSV_NECESSARIAS):
+    """
+    Gera o snapshot em DataFrames de até 'linhas_por_bloco' linhas, apenas com as colunas pedidas.
+    """
+    _, pq = _importar_pyarrow()
+    arquivo = pq.ParquetFile(caminho_parquet)
+    for lote in arquivo.iter_batches(batch_size=linhas_por_bloco, columns=colunas):
+        yield lote.to_pandas()
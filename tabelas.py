@@ -0,0 +1,107 @@
+# tabelas.py
+
+import re
+import time
+import geracoes
+import metricas
+from transformacao import COLUNAS_DB_TODAS
+
+# DDL da tabela bronze e da staging, compartilhado pela carga no MariaDB
+# (database.py, destinos.py) e pela preparação antecipada (preparacao_db.py).
+# Não importa o conector 'mariadb': recebe sempre um cursor pronto.
+TABELA_PRINCIPAL = "bronze_plugpharma_produtos"
+SUFIXO_STAGING = "_staging"
+TABELA_STAGING = TABELA_PRINCIPAL + SUFIXO_STAGING
+
+# Índices secundários da tabela principal: nome -> colunas (aceita prefixo, ex.: "fabricante(50)")
+INDICES_PADRAO = {
+    "idx_produto": ["produto"],
+    "idx_cod_barras_norm": ["codigo_barras_normalizado"],
+    "idx_cod_interno": ["codigo_interno"],
+}
+PADRAO_COLUNA_INDICE = re.compile(r"^(\w+)(\(\d+\))?$")
+
+# Modo multi-base: coluna que identifica de qual base do PlugPharma veio cada linha
+COLUNA_BASE = "base"
+INDICE_BASE = {"idx_base": [COLUNA_BASE]}
+
+
+def validar_indices(indices, coluna_base=False):
+    """
+    Confere a seção 'carga.indices' do config.json: nomes simples e colunas
+    existentes na tabela. Retorna o dicionário de índices.
+    'coluna_base' aceita também a coluna 'base' (modo multi-base).
+    """
+    colunas_validas = [COLUNA_BASE] + COLUNAS_DB_TODAS if coluna_base else COLUNAS_DB_TODAS
+    for nome, colunas in indices.items():
+        if not re.fullmatch(r"\w+", nome):
+            raise ValueError(f"Nome de índice inválido: '{nome}'")
+        if not colunas:
+            raise ValueError(f"O índice '{nome}' não tem colunas.")
+        for coluna in colunas:
+            coluna_ok = PADRAO_COLUNA_INDICE.match(coluna)
+            if not coluna_ok or coluna_ok.group(1) not in colunas_validas:
+                raise ValueError(f"Coluna inválida no índice '{nome}': '{coluna}'")
+    return indices
+
+
+def criar_tabela(cursor, tabela, indices=INDICES_PADRAO, coluna_base=False):
+    definicoes_indices = "".join(
+        f",\n        INDEX {nome} ({', '.join(colunas)})" for nome, colunas in indices.items()
+    )
+    definicao_base = f"{COLUNA_BASE} VARCHAR(50) NOT NULL, " if coluna_base else ""
+    create_query = f"""
+    CREATE TABLE {tabela} (
+        {definicao_base}codigo_interno VARCHAR(14), codigo_barras VARCHAR(14),
+        codigo_barras_normalizado VARCHAR(14), codigo_principal TINYINT,
+        descricao VARCHAR(255), apresentacao VARCHAR(255), produto VARCHAR(255), status VARCHAR(20),
+        codigo_fabricante VARCHAR(50), fabricante TEXT, cnpj_fabricante VARCHAR(20),
+        codigo_tipo_produto VARCHAR(50), tipo_produto VARCHAR(255),
+        codigo_grupo_principal VARCHAR(50), grupo_principal VARCHAR(255),
+        ncm VARCHAR(20), ncm_descricao TEXT, preco_controlado VARCHAR(10),
+        codigo_ms VARCHAR(255), portaria TEXT, forma_apresentacao TEXT,
+        codigo_unidade_medida VARCHAR(50), fracao VARCHAR(50), substancia_nome TEXT,
+        concentracao TEXT, farmacologico TEXT, data_cadastro DATETIME,
+        ultima_alteracao DATETIME, associado TEXT,
+        data_insercao DATETIME{definicoes_indices}
+    ) CHARSET=utf8mb4;
+    """
+    cursor.execute(create_query)
+
+
+def criar_tabela_staging(cursor, staging=TABELA_STAGING, coluna_base=False):
+    # Sem índices secundários: eles são criados de uma vez depois da carga (criar_indices)
+    cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+    criar_tabela(cursor, staging, indices={}, coluna_base=coluna_base)
+
+
+@metricas.medir("criacao_indices")
+def criar_indices(cursor, tabela, indices):
+    """
+    Cria todos os índices secundários em um único ALTER TABLE, depois que a
+    tabela já está carregada. Retorna os segundos gastos.
+    """
+    if not indices:
+        print(f"[Database] Nenhum índice secundário configurado para {tabela}.")
+        return 0.0
+    inicio = time.perf_counter()
+    definicoes = ", ".join(f"ADD INDEX {nome} ({', '.join(colunas)})" for nome, colunas in indices.items())
+    print(f"[Database] Criando {len(indices)} índices em {tabela}: {', '.join(indices)}...")
+    cursor.execute(f"ALTER TABLE {tabela} {definicoes}")
+    segundos = time.perf_counter() - inicio
+    print(f"[Database] Índices criados em {segundos:.1f}s")
+    return segundos
+
+
+@metricas.medir("troca_tabela")
+def promover_staging(cursor, tabela=TABELA_PRINCIPAL, staging=TABELA_STAGING, politica_geracoes=None, linhas=None,
+                     acompanhantes=(), linhas_csv=None, coluna_base=False):
+    """
+    Verifica a staging e a troca pela tabela principal, guardando a tabela
+    atual como geração anterior (ver geracoes.py). 'acompanhantes'
+    [(tabela, staging)] são publicadas no mesmo RENAME TABLE, com gerações.
+    """
+    politica_geracoes = politica_geracoes or geracoes.politica()
+    chave_produto = f"{COLUNA_BASE}, codigo_interno" if coluna_base else "codigo_interno"
+    geracoes.verificar_staging(cursor, tabela, staging, politica_geracoes, linhas, linhas_csv, chave_produto)
+    geracoes.promover(cursor, tabela, staging, politica_geracoes["manter"], acompanhantes)
@@ -0,0 +1,38 @@
+# tests/test_benchmark.py
+
+import importlib
+import sys
+import pandas as pd
+import pytest
+from benchmark.gerador import gerar_csv
+from transformacao import COLUNAS_CSV_NECESSARIAS
+
+
+def test_benchmark_importa_sem_mariadb(monkeypatch):
+    # None em sys.modules faz qualquer 'import mariadb' falhar
+    monkeypatch.setitem(sys.modules, "mariadb", None)
+    for modulo in ("carregadores", "tabelas", "destinos", "database", "benchmark.executar"):
+        monkeypatch.delitem(sys.modules, modulo, raising=False)
+    importlib.import_module("benchmark.executar")
+
+
+@pytest.mark.parametrize("encoding", ["utf-8-sig", "latin-1"])
+def test_gerador_csv(tmp_path, encoding):
+    caminho = tmp_path / "produtos.csv"
+    gerar_csv(str(caminho), 200, encoding, semente=1)
+    df = pd.read_csv(caminho, sep=";", encoding=encoding, dtype=str)
+    assert len(df) == 200
+    assert set(COLUNAS_CSV_NECESSARIAS) <= set(df.columns)
+
+
+@pytest.mark.parametrize("destino", ["sqlite", "parquet"])
+def test_benchmark_em_destino_local(tmp_path, destino):
+    from benchmark.executar import executar_benchmark
+    resultado = executar_benchmark([300], destino, pasta_dados=str(tmp_path), semente=7)
+    medicao, = resultado["resultados"]
+    assert resultado["destino"] == destino and resultado["backend"] is None
+    assert medicao["linhas_csv"] == 300
+    assert medicao["linhas_inseridas"] > 0
+    assert set(medicao["segundos"]) == {"leitura", "transformacao", "insercao"}
+    if destino == "parquet":
+        assert any(arquivo.suffix == ".parquet" for arquivo in tmp_path.iterdir())
@@ -0,0 +1,107 @@
+# tests/test_carregadores.py
+
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from carregadores import (
+    BYTES_POR_CAMPO, BYTES_VALOR_FIXO, MAX_ALLOWED_PACKET_PADRAO, CargaComAvisos, CarregadorLoadData,
+    bytes_utf8, estimar_bytes_linhas,
+)
+
+
+def test_textos_acentuados_contam_bytes_utf8():
+    serie = pd.Series(["AÇÃO", "abc", None, "dipirona sódica 500mg"], dtype=object)
+    esperado = [len(v.encode("utf-8")) if v else 0 for v in serie]
+    assert bytes_utf8(serie).tolist() == esperado
+    assert esperado[0] == 6
+
+
+def test_bytes_utf8_sem_pyarrow(monkeypatch):
+    import builtins
+    importar = builtins.__import__
+
+    def sem_pyarrow(nome, *args, **kwargs):
+        if nome.startswith("pyarrow"):
+            raise ImportError(nome)
+        return importar(nome, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "__import__", sem_pyarrow)
+    serie = pd.Series(["AÇÃO", np.nan, "ü"], dtype=object)
+    assert bytes_utf8(serie).tolist() == [6, 0, 2]
+
+
+def test_estimativa_por_linha():
+    df = pd.DataFrame({"descricao": ["Ótimo", "x"], "data_cadastro": pd.to_datetime(["2024-01-01", None])})
+    tamanhos = estimar_bytes_linhas(df, ["descricao", "data_cadastro"])
+    base = 2 * BYTES_POR_CAMPO + BYTES_VALOR_FIXO
+    assert tamanhos.tolist() == [base + 6, base + 1]
+
+
+class CursorLoadData:
+    """Cursor falso: responde ao LOAD DATA com 'gravadas' linhas e ao SHOW WARNINGS com 'avisos'."""
+
+    def __init__(self, gravadas, avisos=(), erro=None):
+        self.gravadas = gravadas
+        self.avisos = list(avisos)
+        self.erro = erro
+        self.rowcount = -1
+        self.consultas = []
+        self.lotes = []
+
+    def execute(self, consulta):
+        self.consultas.append(consulta)
+        if consulta.startswith("LOAD DATA"):
+            if self.erro:
+                raise self.erro
+            self.rowcount = self.gravadas
+
+    def executemany(self, consulta, linhas):
+        self.lotes.append(list(linhas))
+
+    def fetchall(self):
+        return self.avisos
+
+    def fetchone(self):
+        return (MAX_ALLOWED_PACKET_PADRAO,)
+
+
+def _df_produtos(linhas=3):
+    return pd.DataFrame({col: ["x"] * linhas for col in ["codigo_interno", "descricao"]})
+
+
+def _carregar(cursor, df):
+    carregador = CarregadorLoadData(cursor, "staging", ["codigo_interno", "descricao"])
+    preparado = carregador.preparar(df)
+    try:
+        return carregador.carregar(preparado)
+    finally:
+        assert not os.path.exists(preparado[1])
+
+
+def test_load_data_sem_avisos():
+    cursor = CursorLoadData(gravadas=3, avisos=[("Note", 1265, "informativo")])
+    assert _carregar(cursor, _df_produtos()) == 3
+    assert cursor.consultas[-1] == "SHOW WARNINGS"
+
+
+def test_load_data_com_avisos_falha():
+    cursor = CursorLoadData(gravadas=3, avisos=[("Warning", 1265, "Data truncated for column 'ncm' at row 2")])
+    with pytest.raises(CargaComAvisos, match="Data truncated"):
+        _carregar(cursor, _df_produtos())
+
+
+def test_load_data_com_linhas_a_menos_falha():
+    cursor = CursorLoadData(gravadas=2)
+    with pytest.raises(CargaComAvisos, match="gravou 2 de 3 linhas"):
+        _carregar(cursor, _df_produtos())
+
+
+def test_load_data_recusado_usa_executemany():
+    class LocalInfileRecusado(Exception):
+        errno = 1148
+
+    cursor = CursorLoadData(gravadas=3, erro=LocalInfileRecusado("The used command is not allowed"))
+    assert _carregar(cursor, _df_produtos()) == 3
+    assert sum(len(lote) for lote in cursor.lotes) == 3
+    assert "SHOW WARNINGS" not in cursor.consultas
@@ -0,0 +1,30 @@
+# tests/test_database.py
+
+import pandas as pd
+import pytest
+from database import _ler_blocos
+from transformacao import COLUNAS_CSV_NECESSARIAS, preparar_dataframe
+
+
+def _escrever_csv(caminho, linhas, encoding):
+    # Descrições com quebra de linha: um registro ocupa mais de uma linha física
+    df = pd.DataFrame(
+        [{col: f"{col.lower()} {i}" for col in COLUNAS_CSV_NECESSARIAS} for i in range(linhas)],
+        columns=COLUNAS_CSV_NECESSARIAS,
+    )
+    df["DESCRIÇÃO"] = [f"produto {i}\nlinha extra" if i % 3 == 0 else f"produto {i}" for i in range(linhas)]
+    with open(caminho, "wb") as f:
+        f.write(b"\xef\xbb\xbf")  # BOM, mesmo quando o restante é lido como latin-1
+        f.write(df.to_csv(sep=";", index=False).encode(encoding.replace("-sig", "")))
+
+
+@pytest.mark.parametrize("encoding", ["utf-8-sig", "latin-1"])
+def test_retomada_pula_registros_e_nao_linhas(tmp_path, encoding):
+    caminho = tmp_path / "produtos.csv"
+    _escrever_csv(caminho, 25, encoding)
+    completo = pd.concat(preparar_dataframe(b) for b in _ler_blocos(str(caminho), encoding, 10))
+    assert len(completo) == 25
+
+    retomado = [preparar_dataframe(b) for b in _ler_blocos(str(caminho), encoding, 10, pular_linhas=10)]
+    assert sum(len(b) for b in retomado) == 15
+    pd.testing.assert_frame_equal(pd.concat(retomado), completo.iloc[10:])
@@ -0,0 +1,123 @@
+# tests/test_download_http.py
+
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import requests
+import download_http
+from download_http import DownloadIncompleto, baixar_em_stream
+
+# Maior que alguns blocos de download_http.TAMANHO_BLOCO: a queda acontece depois de blocos já gravados
+CONTEUDO = bytes(range(256)) * 16000  # ~4 MB
+
+
+class ServidorStub(BaseHTTPRequestHandler):
+    """
+    Servidor de arquivo local. Cada requisição consome um passo de 'roteiro':
+      "completo"      - responde 200 ou, com Range, 206 com o restante
+      "cortado"       - como "completo", mas a conexão cai no meio do corpo
+      "curto"         - como "completo", em chunked, e termina antes do fim sem erro
+      "ignora_range"  - responde sempre 200 com o arquivo inteiro
+    """
+    protocol_version = "HTTP/1.1"
+    roteiro = []
+    ranges = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        passo = self.roteiro.pop(0) if self.roteiro else "completo"
+        faixa = self.headers.get("Range")
+        self.ranges.append(faixa)
+        inicio = int(re.match(r"bytes=(\d+)-", faixa).group(1)) if faixa and passo != "ignora_range" else 0
+        corpo = CONTEUDO[inicio:]
+
+        self.send_response(206 if inicio else 200)
+        if inicio:
+            self.send_header("Content-Range", f"bytes {inicio}-{len(CONTEUDO) - 1}/{len(CONTEUDO)}")
+        if passo == "curto":
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            metade = corpo[:len(corpo) // 2]
+            self.wfile.write(f"{len(metade):x}\r\n".encode() + metade + b"\r\n0\r\n\r\n")
+            return
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        if passo == "cortado":
+            self.wfile.write(corpo[:len(corpo) // 3])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(corpo)
+
+
+@pytest.fixture
+def servidor(monkeypatch):
+    monkeypatch.setattr(download_http.time, "sleep", lambda segundos: None)
+    ServidorStub.roteiro = []
+    ServidorStub.ranges = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), ServidorStub)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/produtos.csv"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _baixar(url, destino, tentativas=5):
+    with requests.Session() as sessao:
+        return baixar_em_stream(sessao, url, str(destino), tentativas=tentativas, timeout=5)
+
+
+def test_download_completo(servidor, tmp_path):
+    destino = tmp_path / "produtos.csv"
+    assert _baixar(servidor, destino) == len(CONTEUDO)
+    assert destino.read_bytes() == CONTEUDO
+    assert ServidorStub.ranges == [None]
+    assert not (tmp_path / "produtos.csv.part").exists()
+
+
+def test_retoma_com_range_depois_de_queda(servidor, tmp_path):
+    ServidorStub.roteiro = ["cortado", "completo"]
+    destino = tmp_path / "produtos.csv"
+    assert _baixar(servidor, destino) == len(CONTEUDO)
+    assert destino.read_bytes() == CONTEUDO
+    assert ServidorStub.ranges[0] is None
+    retomado_em = int(re.match(r"bytes=(\d+)-$", ServidorStub.ranges[1]).group(1))
+    assert 0 < retomado_em <= len(CONTEUDO) // 3
+
+
+def test_servidor_que_ignora_range_recomeca(servidor, tmp_path):
+    ServidorStub.roteiro = ["cortado", "ignora_range"]
+    destino = tmp_path / "produtos.csv"
+    assert _baixar(servidor, destino) == len(CONTEUDO)
+    # Sem anexar o arquivo inteiro depois do pedaço já baixado
+    assert destino.read_bytes() == CONTEUDO
+    assert ServidorStub.ranges[1] is not None
+
+
+def test_resposta_curta_sem_erro_e_retomada(servidor, tmp_path):
+    ServidorStub.roteiro = ["cortado", "curto", "completo"]
+    destino = tmp_path / "produtos.csv"
+    assert _baixar(servidor, destino) == len(CONTEUDO)
+    assert destino.read_bytes() == CONTEUDO
+    assert len(ServidorStub.ranges) == 3
+    assert all(faixa is not None for faixa in ServidorStub.ranges[1:])
+
+
+def test_arquivo_truncado_nao_e_sucesso(servidor, tmp_path):
+    ServidorStub.roteiro = ["cortado"] + ["curto"] * 2
+    destino = tmp_path / "produtos.csv"
+    with pytest.raises(DownloadIncompleto):
+        _baixar(servidor, destino, tentativas=3)
+    assert not destino.exists()
+
+
+def test_parcial_de_outra_execucao_e_descartado(servidor, tmp_path):
+    (tmp_path / "produtos.csv.part").write_bytes(b"sobra de outra exportacao" * 1000)
+    destino = tmp_path / "produtos.csv"
+    assert _baixar(servidor, destino) == len(CONTEUDO)
+    assert destino.read_bytes() == CONTEUDO
+    assert ServidorStub.ranges == [None]
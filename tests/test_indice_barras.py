@@ -0,0 +1,32 @@
+# tests/test_indice_barras.py
+
+from datetime import datetime
+import pytest
+from benchmark.gerador import gerar_csv
+from database import _blocos_transformados
+from indice_barras import ColetorIndice, IndiceBarras, gerar_indice_do_arquivo
+
+
+@pytest.mark.parametrize("colunas_derivadas", [True, False])
+def test_indice_da_carga_igual_ao_do_arquivo(tmp_path, colunas_derivadas):
+    csv = tmp_path / "produtos.csv"
+    gerar_csv(str(csv), 3000, "utf-8-sig", 0.4, semente=11)
+
+    # Os blocos passam pelo coletor enquanto a carga os consome
+    coletor = ColetorIndice()
+    contador = {"linhas_csv": 0}
+    blocos = _blocos_transformados(
+        str(csv), "utf-8-sig", 700, datetime(2024, 5, 17), contador, colunas_derivadas, coletor
+    )
+    for _ in blocos:
+        pass
+    assert contador["linhas_csv"] == 3000
+
+    da_carga = tmp_path / "carga.idx"
+    do_arquivo = tmp_path / "arquivo.idx"
+    n = coletor.gerar(str(da_carga))
+    assert gerar_indice_do_arquivo(str(csv), str(do_arquivo), linhas_por_bloco=1000) == n
+    assert da_carga.read_bytes() == do_arquivo.read_bytes()
+
+    with IndiceBarras(str(da_carga)) as indice:
+        assert len(indice) == n > 3000
@@ -0,0 +1,67 @@
+# tests/test_monitor_download.py
+
+import os
+import threading
+import time
+import pytest
+import monitor_download
+from monitor_download import MonitorInotify, inotify_disponivel
+
+pytestmark = pytest.mark.skipif(not inotify_disponivel(), reason="inotify só existe no Linux")
+
+
+@pytest.fixture
+def estabilidade_rapida(monkeypatch):
+    original = monitor_download.aguardar_tamanho_estavel
+    monkeypatch.setattr(
+        monitor_download, "aguardar_tamanho_estavel",
+        lambda caminho: original(caminho, intervalo=0.05, tentativas=3)
+    )
+
+
+def _aguardar(pasta, desde, timeout=10):
+    monitor = MonitorInotify(str(pasta))
+    try:
+        inicio = time.time()
+        return monitor.aguardar_csv(desde, timeout), time.time() - inicio
+    finally:
+        monitor.fechar()
+
+
+def _mais_tarde(segundos, acao):
+    thread = threading.Thread(target=lambda: (time.sleep(segundos), acao()), daemon=True)
+    thread.start()
+    return thread
+
+
+def test_csv_vazio_no_inicio_e_conferido_de_novo(tmp_path, estabilidade_rapida):
+    desde = time.time() - 1
+    caminho = tmp_path / "produtos.csv"
+    caminho.write_bytes(b"")
+    # truncate não gera IN_CLOSE_WRITE nem IN_MOVED_TO: só a nova conferência encontra o arquivo
+    _mais_tarde(0.5, lambda: os.truncate(caminho, 1000))
+    encontrado, segundos = _aguardar(tmp_path, desde)
+    assert encontrado == str(caminho)
+    assert segundos < 5
+
+
+def test_evento_de_csv_ainda_crescendo(tmp_path, estabilidade_rapida):
+    desde = time.time() - 1
+    caminho = tmp_path / "produtos.csv"
+
+    def escrever():
+        caminho.write_bytes(b"")  # IN_CLOSE_WRITE com o arquivo ainda vazio
+        time.sleep(0.5)
+        os.truncate(caminho, 1000)
+
+    _mais_tarde(0.2, escrever)
+    encontrado, segundos = _aguardar(tmp_path, desde)
+    assert encontrado == str(caminho)
+    assert segundos < 5
+
+
+def test_csv_antigo_e_ignorado(tmp_path, estabilidade_rapida):
+    antigo = tmp_path / "antigo.csv"
+    antigo.write_bytes(b"x" * 100)
+    encontrado, _ = _aguardar(tmp_path, time.time() + 1, timeout=1)
+    assert encontrado is None
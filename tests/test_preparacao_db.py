@@ -0,0 +1,73 @@
+# tests/test_preparacao_db.py
+
+import threading
+import pytest
+import preparacao_db
+from preparacao_db import PreparacaoBanco
+
+
+class Recurso:
+    """Conexão / pool falsos: só registram o close."""
+
+    def __init__(self):
+        self.fechado = False
+
+    def cursor(self):
+        return Recurso()
+
+    def execute(self, consulta):
+        pass
+
+    def fetchall(self):
+        return []
+
+    def commit(self):
+        pass
+
+    def close(self):
+        self.fechado = True
+
+
+@pytest.fixture
+def recursos(monkeypatch):
+    abertos = {"conexao": Recurso(), "pool": Recurso(), "liberar_pool": threading.Event(), "erro_pool": None}
+    abertos["liberar_pool"].set()
+
+    def criar_pool(*args, **kwargs):
+        abertos["liberar_pool"].wait(5)
+        if abertos["erro_pool"]:
+            raise abertos["erro_pool"]
+        return abertos["pool"]
+
+    monkeypatch.setattr(preparacao_db, "conectar_db", lambda *args, **kwargs: abertos["conexao"])
+    monkeypatch.setattr(preparacao_db, "criar_pool_db", criar_pool)
+    monkeypatch.setattr(preparacao_db, "criar_tabela_staging", lambda cursor: None)
+    return abertos
+
+
+def test_falha_depois_de_conectar_fecha_a_conexao(recursos):
+    recursos["erro_pool"] = Exception("pool recusado")
+    preparacao = PreparacaoBanco({}, {"workers": 4}).iniciar()
+    assert preparacao.aguardar() is False
+    assert recursos["conexao"].fechado
+
+
+def test_fechar_com_a_thread_rodando_libera_ao_terminar(recursos):
+    recursos["liberar_pool"].clear()
+    preparacao = PreparacaoBanco({}, {"workers": 4}).iniciar()
+    assert preparacao.aguardar(0.1) is False
+    preparacao.fechar()
+    assert not recursos["conexao"].fechado
+    recursos["liberar_pool"].set()
+    preparacao._thread.join(5)
+    assert recursos["conexao"].fechado and recursos["pool"].fechado
+
+
+def test_recursos_entregues_nao_sao_fechados(recursos):
+    preparacao = PreparacaoBanco({}, {"workers": 4}).iniciar()
+    assert preparacao.aguardar() is True
+    recursos["conexao"].ping = lambda: None
+    conexao, pool, staging_criada = preparacao.entregar()
+    preparacao.fechar()
+    assert conexao is recursos["conexao"] and pool is recursos["pool"] and staging_criada
+    assert not conexao.fechado and not pool.fechado
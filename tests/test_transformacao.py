@@ -0,0 +1,230 @@
+# tests/test_transformacao.py
+
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pytest
+import re
+import sqlite3
+from transformacao import (
+    COLUNAS_CSV_DADOS, COLUNAS_CSV_NECESSARIAS, COLUNAS_DB_ORIGEM, COLUNAS_DB_TODAS, EXPRESSOES_DERIVADAS_SQL,
+    linhas_para_insercao, preparar_dataframe, transformar_produtos
+)
+
+AGORA = datetime(2024, 5, 17, 3, 0, 0)
+
+
+def _transformar_com_iterrows(df, agora):
+    """
+    O loop original do database.py (antes da versão vetorizada), usado como
+    referência: uma tupla por código de barras, na ordem de COLUNAS_DB_TODAS.
+    """
+    df = df[COLUNAS_CSV_NECESSARIAS].fillna('')
+    formato_data_br = '%d/%m/%Y %H:%M:%S'
+    df['DATA CADASTRO'] = pd.to_datetime(df['DATA CADASTRO'], format=formato_data_br, errors='coerce')
+    df['ULTIMA ALTERAÇÃO'] = pd.to_datetime(df['ULTIMA ALTERAÇÃO'], format=formato_data_br, errors='coerce')
+
+    data_to_insert = []
+    for _, row in df.iterrows():
+        cod_interno_raw = row["CODIGO INTERNO"].strip()
+        cod_principal_raw = row["CODIGO BARRAS PRINCIPAL"].strip()
+        cod_adicional_raw = row["CODIGO BARRAS ADICIONAL"].strip()
+
+        if not cod_interno_raw: continue
+
+        cod_interno_trunc = cod_interno_raw[:14]
+        descricao = (row["DESCRIÇÃO"] or "").strip()
+        apresentacao = (row["APRESENTAÇÃO"] or "").strip()
+
+        dados_base_csv = [
+            row[col].strip() if isinstance(row[col], str) else row[col]
+            for col in COLUNAS_CSV_DADOS
+        ]
+
+        if cod_principal_raw:
+            cod_norm = cod_principal_raw.zfill(14)[:14]
+            prod_concat = f"{cod_principal_raw} - {descricao} {apresentacao}"
+            lista_val = dados_base_csv.copy()
+            lista_val.insert(2, prod_concat)
+            data_to_insert.append((cod_interno_trunc, cod_principal_raw, cod_norm, 1) + tuple(lista_val) + (agora,))
+
+        if cod_adicional_raw:
+            for cod_ad in cod_adicional_raw.split("+"):
+                cod_ad_limpo = cod_ad.strip()
+                if not cod_ad_limpo: continue
+                cod_norm_ad = cod_ad_limpo.zfill(14)[:14]
+                prod_concat_ad = f"{cod_ad_limpo} - {descricao} {apresentacao}"
+                lista_val_ad = dados_base_csv.copy()
+                lista_val_ad.insert(2, prod_concat_ad)
+                data_to_insert.append((cod_interno_trunc, cod_ad_limpo, cod_norm_ad, 0) + tuple(lista_val_ad) + (agora,))
+    return data_to_insert
+
+
+def _normalizar(linhas):
+    # NaT != NaT: compara datas inválidas como None
+    return [tuple(None if valor is pd.NaT else valor for valor in linha) for linha in linhas]
+
+
+def _vetorizado(df, agora=AGORA):
+    return _normalizar(linhas_para_insercao(transformar_produtos(preparar_dataframe(df), agora)))
+
+
+def _csv(*produtos):
+    """DataFrame como o lido do CSV (tudo texto), com valores padrão para as colunas não informadas."""
+    linhas = []
+    for numero, produto in enumerate(produtos, start=1):
+        linha = {col: f"{col.lower()} {numero}" for col in COLUNAS_CSV_NECESSARIAS}
+        linha["CODIGO BARRAS PRINCIPAL"] = f"78910000{numero:05d}"
+        linha["CODIGO BARRAS ADICIONAL"] = f"78920000{numero:05d}"
+        linha["DATA CADASTRO"] = "01/02/2020 10:00:00"
+        linha["ULTIMA ALTERAÇÃO"] = "03/04/2021 11:30:00"
+        linha.update(produto)
+        linhas.append(linha)
+    return pd.DataFrame(linhas, columns=COLUNAS_CSV_NECESSARIAS, dtype=object)
+
+
+def test_codigos_adicionais_multiplos():
+    df = _csv(
+        {"CODIGO INTERNO": "10", "CODIGO BARRAS PRINCIPAL": "7891000000011",
+         "CODIGO BARRAS ADICIONAL": "7891000000028+7891000000035 + 7891000000042"},
+        {"CODIGO INTERNO": "11", "CODIGO BARRAS PRINCIPAL": "7891000000059", "CODIGO BARRAS ADICIONAL": "++ 123 ++"},
+    )
+    esperado = _normalizar(_transformar_com_iterrows(df, AGORA))
+    assert _vetorizado(df) == esperado
+    assert [linha[1] for linha in esperado] == [
+        "7891000000011", "7891000000028", "7891000000035", "7891000000042", "7891000000059", "123"
+    ]
+    assert [linha[3] for linha in esperado] == [1, 0, 0, 0, 1, 0]
+
+
+def test_codigos_vazios():
+    df = _csv(
+        {"CODIGO INTERNO": "20", "CODIGO BARRAS PRINCIPAL": "", "CODIGO BARRAS ADICIONAL": "7891000000066"},
+        {"CODIGO INTERNO": "21", "CODIGO BARRAS PRINCIPAL": "  ", "CODIGO BARRAS ADICIONAL": ""},
+        {"CODIGO INTERNO": "22", "CODIGO BARRAS PRINCIPAL": np.nan, "CODIGO BARRAS ADICIONAL": np.nan},
+        {"CODIGO INTERNO": "  ", "CODIGO BARRAS PRINCIPAL": "7891000000073", "CODIGO BARRAS ADICIONAL": ""},
+        {"CODIGO INTERNO": np.nan, "CODIGO BARRAS PRINCIPAL": "7891000000080", "CODIGO BARRAS ADICIONAL": ""},
+    )
+    esperado = _normalizar(_transformar_com_iterrows(df, AGORA))
+    assert _vetorizado(df) == esperado
+    # Só o produto 20 tem código de barras e código interno
+    assert [(linha[0], linha[1]) for linha in esperado] == [("20", "7891000000066")]
+
+
+def test_codigos_curtos_e_longos():
+    df = _csv(
+        {"CODIGO INTERNO": "123456789012345678", "CODIGO BARRAS PRINCIPAL": "789",
+         "CODIGO BARRAS ADICIONAL": " 42 +123456789012345678"},
+        {"CODIGO INTERNO": " 30 ", "CODIGO BARRAS PRINCIPAL": "-12", "CODIGO BARRAS ADICIONAL": ""},
+    )
+    esperado = _normalizar(_transformar_com_iterrows(df, AGORA))
+    obtido = _vetorizado(df)
+    # O código longo é gravado cortado (VARCHAR(14)) e o 'produto' passa a usar o código gravado
+    longo = esperado[2]
+    assert longo[1] == "123456789012345678"
+    esperado[2] = (longo[0], "12345678901234", longo[2], longo[3],
+                   longo[4], longo[5], longo[6].replace("123456789012345678", "12345678901234", 1)) + longo[7:]
+    assert obtido == esperado
+    assert [linha[2] for linha in esperado] == [
+        "00000000000789", "00000000000042", "12345678901234", "-0000000000012"
+    ]
+    assert {linha[0] for linha in esperado} == {"12345678901234", "30"}
+
+
+def test_textos_datas_e_produto():
+    df = _csv(
+        {"CODIGO INTERNO": "40", "CODIGO BARRAS PRINCIPAL": "7891000000097", "DESCRIÇÃO": "  DIPIRONA ",
+         "APRESENTAÇÃO": " 500MG ", "FABRICANTE": np.nan, "DATA CADASTRO": "31/02/2020 10:00:00",
+         "ULTIMA ALTERAÇÃO": ""},
+    )
+    esperado = _normalizar(_transformar_com_iterrows(df, AGORA))
+    assert _vetorizado(df) == esperado
+    linha = dict(zip(COLUNAS_DB_TODAS, esperado[0]))
+    assert linha["produto"] == "7891000000097 - DIPIRONA 500MG"
+    assert linha["fabricante"] == ""
+    assert linha["data_cadastro"] is None and linha["ultima_alteracao"] is None
+    assert linha["data_insercao"] == AGORA
+
+
+def test_sem_colunas_derivadas():
+    df = _csv(
+        {"CODIGO INTERNO": "50", "CODIGO BARRAS PRINCIPAL": "7891000000103", "CODIGO BARRAS ADICIONAL": "9+8"},
+    )
+    completo = transformar_produtos(preparar_dataframe(df), AGORA)
+    origem = transformar_produtos(preparar_dataframe(df), AGORA, colunas_derivadas=False)
+    assert list(origem.columns) == COLUNAS_DB_ORIGEM
+    pd.testing.assert_frame_equal(origem, completo[COLUNAS_DB_ORIGEM])
+
+
+
+def _sqlite_como_mariadb():
+    """
+    SQLite com as funções usadas em EXPRESSOES_DERIVADAS_SQL, com a semântica
+    do MariaDB (LPAD corta o que passar do tamanho; CONCAT com NULL dá NULL).
+    IF e LEFT são palavras reservadas no SQLite: as funções ganham um prefixo
+    e '_traduzir' ajusta as expressões.
+    """
+    banco = sqlite3.connect(":memory:")
+
+    def lpad(texto, tamanho, preenchimento):
+        if texto is None:
+            return None
+        return texto[:tamanho] if len(texto) >= tamanho else (preenchimento * tamanho + texto)[-tamanho:]
+
+    banco.create_function("mariadb_LPAD", 3, lpad)
+    banco.create_function("mariadb_LEFT", 2, lambda texto, n: None if texto is None else texto[:n])
+    banco.create_function("mariadb_SUBSTRING", 2, lambda texto, inicio: None if texto is None else texto[inicio - 1:])
+    banco.create_function("mariadb_IF", 3, lambda condicao, sim, nao: sim if condicao else nao)
+    banco.create_function("mariadb_CONCAT", -1, lambda *partes: None if None in partes else "".join(partes))
+    return banco
+
+
+def _traduzir(expressao):
+    return re.sub(r"\b(LPAD|LEFT|SUBSTRING|IF|CONCAT)\(", r"mariadb_\1(", expressao)
+
+
+def test_expressoes_sql_iguais_ao_python():
+    df = _csv(
+        {"CODIGO INTERNO": "70", "CODIGO BARRAS PRINCIPAL": "7891000000127",
+         "CODIGO BARRAS ADICIONAL": "789+-12+ 5 +-+123456789012345678+-123456789012345678"},
+        {"CODIGO INTERNO": "71", "CODIGO BARRAS PRINCIPAL": "+5", "DESCRIÇÃO": "AÇÚCAR ",
+         "APRESENTAÇÃO": np.nan},
+    )
+    saida = transformar_produtos(preparar_dataframe(df), AGORA)
+    banco = _sqlite_como_mariadb()
+    banco.execute("CREATE TABLE produtos (codigo_barras TEXT, descricao TEXT, apresentacao TEXT)")
+    # Grava como o MariaDB gravaria nas colunas VARCHAR(14)/VARCHAR(255)
+    banco.executemany(
+        "INSERT INTO produtos VALUES (?, ?, ?)",
+        [(codigo[:14], descricao[:255], apresentacao[:255])
+         for codigo, descricao, apresentacao in saida[["codigo_barras", "descricao", "apresentacao"]].values],
+    )
+    # Código vazio não vira linha no transformar_produtos, mas a expressão precisa dar o mesmo que o zfill
+    banco.execute("INSERT INTO produtos VALUES ('', 'X', 'Y')")
+    colunas = list(EXPRESSOES_DERIVADAS_SQL)
+    expressoes = ", ".join(_traduzir(EXPRESSOES_DERIVADAS_SQL[col]) for col in colunas)
+    calculado = banco.execute(f"SELECT {expressoes} FROM produtos ORDER BY rowid").fetchall()
+
+    esperado = [tuple(linha) for linha in saida[colunas].values] + [("".zfill(14)[:14], " - X Y")]
+    assert calculado == esperado
+    assert "-0000000000012" in saida["codigo_barras_normalizado"].values
+    assert "+0000000000005" in saida["codigo_barras_normalizado"].values
+    assert "-0000000000000" in saida["codigo_barras_normalizado"].values
+    assert "-1234567890123 - descrição 1 apresentação 1" in saida["produto"].values
+
+@pytest.mark.parametrize("encoding", ["utf-8-sig", "latin-1"])
+def test_csv_sintetico(tmp_path, encoding):
+    from benchmark.gerador import gerar_csv
+    caminho = tmp_path / "produtos.csv"
+    gerar_csv(str(caminho), 2000, encoding, 0.4, semente=7)
+    df = pd.read_csv(caminho, sep=";", encoding=encoding, low_memory=False, dtype=str)
+    assert _vetorizado(df) == _normalizar(_transformar_com_iterrows(df, AGORA))
+
+
+@pytest.mark.parametrize("marca", ["\ufeff", "ï»¿"])
+def test_cabecalho_com_bom_e_espacos(marca):
+    df = _csv({"CODIGO INTERNO": "60", "CODIGO BARRAS PRINCIPAL": "7891000000110"})
+    # BOM decodificado (utf-8) ou lido como latin-1, e espaços em volta dos nomes
+    variado = df.rename(columns={col: f" {col} " for col in df.columns})
+    variado = variado.rename(columns={variado.columns[0]: marca + variado.columns[0]})
+    assert _vetorizado(variado) == _vetorizado(df)
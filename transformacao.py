@@ -0,0 +1,170 @@
+# transformacao.py
+
+import pandas as pd
+
+# --- Constantes ---
+COLUNAS_CSV_BASE = ["CODIGO INTERNO", "CODIGO BARRAS PRINCIPAL", "CODIGO BARRAS ADICIONAL"]
+COLUNAS_CSV_DADOS = [
+    "DESCRIÇÃO", "APRESENTAÇÃO", "STATUS", "CODIGO FABRICANTE", "FABRICANTE",
+    "CNPJ FABRICANTE", "CODIGO TIPO PRODUTO", "TIPO PRODUTO",
+    "CODIGO GRUPO PRINCIPAL", "GRUPO PRINCIPAL", "NCM", "NCM DESCRIÇÃO",
+    "PREÇO CONTROLADO", "CODIGO MS", "PORTARIA", "FORMA APRESENTAÇÃO",
+    "CODIGO UNIDADE MEDIDA", "FRAÇÃO", "SUBSTANCIA NOME", "CONCENTRAÇÃO",
+    "FARMACOLOGICO", "DATA CADASTRO", "ULTIMA ALTERAÇÃO", "ASSOCIADO"
+]
+COLUNAS_DB_DADOS = [
+    "descricao", "apresentacao", "produto", "status", "codigo_fabricante", "fabricante",
+    "cnpj_fabricante", "codigo_tipo_produto", "tipo_produto",
+    "codigo_grupo_principal", "grupo_principal", "ncm", "ncm_descricao",
+    "preco_controlado", "codigo_ms", "portaria", "forma_apresentacao",
+    "codigo_unidade_medida", "fracao", "substancia_nome", "concentracao",
+    "farmacologico", "data_cadastro", "ultima_alteracao", "associado"
+]
+COLUNAS_DB_BASE = ["codigo_interno", "codigo_barras", "codigo_barras_normalizado", "codigo_principal"]
+COLUNAS_CSV_NECESSARIAS = COLUNAS_CSV_BASE + COLUNAS_CSV_DADOS
+COLUNAS_DB_TODAS = COLUNAS_DB_BASE + COLUNAS_DB_DADOS + ["data_insercao"]
+
+# Colunas derivadas de outras colunas da mesma linha. Com 'carga.derivadas_no_banco'
+# elas não são montadas no Python nem enviadas: o MariaDB as calcula na inserção
+# com as expressões abaixo, que dão o mesmo resultado do transformar_produtos
+# (as duas partem do codigo_barras já cortado em 14 caracteres).
+EXPRESSOES_DERIVADAS_SQL = {
+    # str.zfill(14).str[:14]: o zfill mantém um sinal (+/-) inicial antes dos zeros
+    "codigo_barras_normalizado": (
+        "IF(LEFT(codigo_barras, 1) IN ('+', '-'), "
+        "CONCAT(LEFT(codigo_barras, 1), LPAD(SUBSTRING(codigo_barras, 2), 13, '0')), "
+        "LPAD(codigo_barras, 14, '0'))"
+    ),
+    "produto": "CONCAT(codigo_barras, ' - ', descricao, ' ', apresentacao)",
+}
+COLUNAS_DB_ORIGEM = [c for c in COLUNAS_DB_TODAS if c not in EXPRESSOES_DERIVADAS_SQL]
+
+COLUNAS_DATA = ["DATA CADASTRO", "ULTIMA ALTERAÇÃO"]
+FORMATO_DATA_BR = '%d/%m/%Y %H:%M:%S'
+
+# BOM UTF-8 no início do cabeçalho: já decodificado ou lido como latin-1
+MARCAS_BOM = ("\ufeff", "ï»¿")
+
+# Mapeia cada coluna do CSV para a coluna do banco ('produto' é derivada e não vem do CSV)
+MAPA_CSV_DB = dict(zip(COLUNAS_CSV_DADOS, [c for c in COLUNAS_DB_DADOS if c != "produto"]))
+
+
+def normalizar_coluna(nome):
+    """
+    Nome de coluna do cabeçalho sem BOM e sem espaços nas pontas. Usado por
+    todo código que lê o cabeçalho do CSV, para que todos vejam as mesmas colunas.
+    """
+    nome = str(nome)
+    for marca in MARCAS_BOM:
+        if nome.startswith(marca):
+            nome = nome[len(marca):]
+    return nome.strip()
+
+
+def preparar_dataframe(df):
+    """
+    Seleciona as colunas usadas, troca vazios por '' e converte as datas.
+    Datas que já chegam tipadas (snapshot Parquet) são mantidas como estão.
+    """
+    df = df.rename(columns=normalizar_coluna)[COLUNAS_CSV_NECESSARIAS].copy()
+    for col in COLUNAS_CSV_NECESSARIAS:
+        if col in COLUNAS_DATA:
+            if not pd.api.types.is_datetime64_any_dtype(df[col]):
+                df[col] = pd.to_datetime(df[col].fillna(''), format=FORMATO_DATA_BR, errors='coerce')
+        else:
+            df[col] = df[col].fillna('')
+    return df
+
+
+def transformar_produtos(df, agora, colunas_derivadas=True):
+    """
+    Expande cada produto em uma linha por código de barras (principal + adicionais).
+    Recebe o DataFrame já preparado (ver 'preparar_dataframe') e retorna um
+    DataFrame com as colunas de COLUNAS_DB_TODAS, na mesma ordem de linhas
+    que o antigo loop com iterrows produzia. Com 'colunas_derivadas=False',
+    não monta as colunas de EXPRESSOES_DERIVADAS_SQL e retorna só as de
+    COLUNAS_DB_ORIGEM.
+    """
+    df = df.reset_index(drop=True)
+
+    cod_interno = df["CODIGO INTERNO"].str.strip()
+    validos = cod_interno != ''
+    df = df[validos].reset_index(drop=True)
+    cod_interno = cod_interno[validos].reset_index(drop=True)
+
+    # --- Colunas de dados (strip vetorizado; datas ficam como estão) ---
+    dados = pd.DataFrame(index=df.index)
+    for col in COLUNAS_CSV_DADOS:
+        if col in COLUNAS_DATA:
+            dados[MAPA_CSV_DB[col]] = df[col]
+        else:
+            dados[MAPA_CSV_DB[col]] = df[col].str.strip()
+
+    # --- Códigos principais (ordem 0) ---
+    cod_principal = df["CODIGO BARRAS PRINCIPAL"].str.strip()
+    cod_principal = cod_principal[cod_principal != '']
+    principais = pd.DataFrame({
+        "posicao": cod_principal.index,
+        "ordem": 0,
+        "codigo_barras": cod_principal.values,
+        "codigo_principal": 1,
+    })
+
+    # --- Códigos adicionais (ordem 1..n, separados por '+') ---
+    cod_adicional = df["CODIGO BARRAS ADICIONAL"].str.strip()
+    cod_adicional = cod_adicional[cod_adicional != '']
+    explodidos = cod_adicional.str.split('+', regex=False).explode().str.strip()
+    ordem = explodidos.groupby(level=0).cumcount() + 1
+    manter = explodidos != ''
+    adicionais = pd.DataFrame({
+        "posicao": explodidos.index[manter],
+        "ordem": ordem[manter].values,
+        "codigo_barras": explodidos[manter].values,
+        "codigo_principal": 0,
+    })
+
+    codigos = pd.concat([principais, adicionais], ignore_index=True)
+    codigos = codigos.sort_values(["posicao", "ordem"], kind="stable").reset_index(drop=True)
+    posicoes = codigos["posicao"].to_numpy(dtype="int64")
+
+    linhas = dados.take(posicoes).reset_index(drop=True)
+    # Cortado no tamanho da coluna (VARCHAR(14)), como o codigo_interno: o 'produto' usa o
+    # código como ele fica gravado, igual às EXPRESSOES_DERIVADAS_SQL
+    codigo_barras = codigos["codigo_barras"].astype(object).str[:14]
+
+    saida = pd.DataFrame({
+        "codigo_interno": cod_interno.take(posicoes).str[:14].reset_index(drop=True),
+        "codigo_barras": codigo_barras,
+        "codigo_principal": codigos["codigo_principal"].astype("int64"),
+    })
+    for col in COLUNAS_DB_DADOS:
+        if col not in EXPRESSOES_DERIVADAS_SQL:
+            saida[col] = linhas[col]
+    saida["data_insercao"] = agora
+    if colunas_derivadas:
+        saida = completar_derivadas(saida)
+
+    return saida[COLUNAS_DB_TODAS if colunas_derivadas else COLUNAS_DB_ORIGEM]
+
+
+def completar_derivadas(df_transformado):
+    """
+    Acrescenta as colunas de EXPRESSOES_DERIVADAS_SQL que faltarem (ex.: num
+    bloco transformado com 'colunas_derivadas=False'), com as mesmas contas.
+    """
+    codigo_barras = df_transformado["codigo_barras"]
+    novas = {}
+    if "codigo_barras_normalizado" not in df_transformado.columns:
+        # zfill mantém um sinal (+/-) inicial antes dos zeros
+        novas["codigo_barras_normalizado"] = codigo_barras.str.zfill(14).str[:14]
+    if "produto" not in df_transformado.columns:
+        novas["produto"] = codigo_barras + " - " + df_transformado["descricao"] + " " + df_transformado["apresentacao"]
+    return df_transformado.assign(**novas) if novas else df_transformado
+
+
+def linhas_para_insercao(df_transformado, colunas=COLUNAS_DB_TODAS):
+    """
+    Converte o DataFrame transformado em uma lista de tuplas para o executemany.
+    """
+    valores = [df_transformado[col].tolist() for col in colunas]
+    return list(zip(*valores))
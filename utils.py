@@ -1,7 +1,9 @@
 # utils.py
 
+import codecs
 import json
 import sys
+import time
 
 def carregar_config(arquivo="config.json"):
     """
@@ -15,4 +17,28 @@ def carregar_config(arquivo="config.json"):
         sys.exit(1) # Termina o script se a config não existe
     except json.JSONDecodeError:
         print(f"[Sistema] Erro: O arquivo '{arquivo}' não é um JSON válido.")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
+
+def detectar_encoding(caminho_arquivo, tamanho_amostra=64 * 1024, tamanho_bloco=1024 * 1024):
+    """
+    Decide o encoding do CSV (utf-8-sig ou latin-1) sem parsear o arquivo.
+    A decisão sai de uma amostra do início do arquivo e é confirmada
+    decodificando o restante em blocos, sem o pandas.
+    Retorna (encoding, segundos_gastos).
+    """
+    inicio = time.perf_counter()
+    decodificador = codecs.getincrementaldecoder('utf-8')()
+    encoding = 'utf-8-sig'
+    try:
+        with open(caminho_arquivo, 'rb') as f:
+            # Amostra inicial: se já não for UTF-8, nem lê o resto
+            decodificador.decode(f.read(tamanho_amostra), final=False)
+            while True:
+                bloco = f.read(tamanho_bloco)
+                if not bloco:
+                    break
+                decodificador.decode(bloco, final=False)
+            decodificador.decode(b'', final=True)
+    except UnicodeDecodeError:
+        encoding = 'latin-1'
+    return encoding, time.perf_counter() - inicio